@@ -0,0 +1,102 @@
+"""Concurrency benchmark: async RAG pipeline vs the thread-pool fallback.
+
+Runs the retrieval + generation path of ``pipeline.chat`` against a local
+stub Gemini server and an in-memory Chroma stand-in, first on the sync
+clients via ``run_in_executor`` and then on the async clients, and prints a
+JSON summary per mode.
+
+    cd backend && python -m benchmarks.async_pipeline --concurrency 200 --requests 600
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from functools import partial
+
+from benchmarks.stubs import Latency, StubGeminiServer, install_stub_chroma
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def _run_mode(mode: str, questions: list[str], concurrency: int) -> dict:
+    from src.rag import pipeline
+
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    loop = asyncio.get_running_loop()
+
+    async def one(q: str):
+        async with sem:
+            t0 = time.perf_counter()
+            if mode == "async":
+                await pipeline._retrieve_and_generate_async(q, "No previous messages.")
+            else:
+                await loop.run_in_executor(
+                    None, partial(pipeline._sync_retrieve_and_generate, q, "No previous messages.")
+                )
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in questions))
+    wall = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "requests": len(questions),
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "rps": round(len(questions) / wall, 1),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--embed-ms", type=float, default=50.0)
+    parser.add_argument("--generate-ms", type=float, default=800.0)
+    parser.add_argument("--chroma-ms", type=float, default=5.0)
+    parser.add_argument("--modes", default="sync,async")
+    args = parser.parse_args()
+
+    with StubGeminiServer(
+        embed_latency=Latency(args.embed_ms, args.embed_ms / 5),
+        generate_latency=Latency(args.generate_ms, args.generate_ms / 5, seed=1),
+    ) as server:
+        tmp = tempfile.mkdtemp()
+        os.environ["GEMINI_BASE_URL"] = server.base_url
+        os.environ["GEMINI_API_KEY"] = "stub"
+        os.environ["EMBEDDING_CACHE_PATH"] = f"{tmp}/embeddings.db"
+        os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+
+        from src.rag.pipeline import ingest_document
+
+        install_stub_chroma(Latency(args.chroma_ms, args.chroma_ms / 5, seed=2))
+        topics = ["vpn", "password", "printer", "laptop", "email", "wifi", "badge", "mfa"]
+        for i, topic in enumerate(topics):
+            body = "\n\n".join(f"How to fix {topic} issue number {n}: restart and retry." for n in range(20))
+            ingest_document(f"bench{i}", f"{topic}.md", body)
+
+        questions = [f"how do I fix my {topics[i % len(topics)]} problem {i}" for i in range(args.requests)]
+        results = [
+            asyncio.run(_run_mode(mode, questions, args.concurrency))
+            for mode in args.modes.split(",")
+        ]
+
+    print(json.dumps({"results": results, "stub_requests": server.requests}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Per-message guardrail cost as the rule set grows.
+
+Compares the compiled single-pass ``GuardrailEngine`` with scanning each rule
+separately (the previous middleware's approach), over the built-in rules
+plus N synthetic keyword/identifier rules, and checks both report the same
+hits.
+
+    cd backend && python -m benchmarks.guardrails --sizes 0,50,100,250,500
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+
+from src.guardrails.engine import DEFAULT_RULES, GuardrailEngine, Rule
+
+_WORDS = (
+    "my laptop cannot connect to the vpn after the update and outlook keeps asking "
+    "for a password the printer on floor three shows an error and teams crashes"
+).split()
+
+
+def synthetic_rules(n: int) -> list[Rule]:
+    rules = []
+    for i in range(n):
+        if i % 2:
+            rules.append(Rule(f"custom_phrase_{i}", "custom", rf"\bforbidden\s+phrase\s+{i}\b", "flag", True))
+        else:
+            rules.append(Rule(f"custom_id_{i}", "custom", rf"\bSECRET-{i}-\d{{4}}\b"))
+    return rules
+
+
+def messages(count: int, n_rules: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(count):
+        text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(15, 60)))
+        if i % 10 == 0:
+            text += " contact me at jane.doe@example.com or 555-123-4567"
+        if i % 25 == 0 and n_rules:
+            text += f" forbidden phrase {rng.randrange(1, n_rules, 2) if n_rules > 1 else 1}"
+        out.append(text)
+    return out
+
+
+def scan_separately(rules: list[tuple[Rule, object]], text: str) -> list[str]:
+    seen, hits = set(), []
+    for rule, pattern in rules:
+        if rule.name not in seen and pattern.search(text):
+            seen.add(rule.name)
+            hits.append(rule.name)
+    return hits
+
+
+def bench(n_extra: int, count: int, repeat: int) -> dict:
+    rules = DEFAULT_RULES + synthetic_rules(n_extra)
+    engine = GuardrailEngine(rules)
+    compiled = [(r, r.compile()) for r in rules]
+    texts = messages(count, n_extra)
+
+    mismatches = sum(
+        1 for t in texts
+        if sorted(r.name for r in engine.scan(t)) != sorted(scan_separately(compiled, t))
+    )
+
+    def timed(fn) -> float:
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for t in texts:
+                fn(t)
+            best = min(best, time.perf_counter() - t0)
+        return best / len(texts) * 1e6
+
+    return {
+        "rules": len(rules),
+        "separate_us_per_msg": round(timed(lambda t: scan_separately(compiled, t)), 2),
+        "engine_us_per_msg": round(timed(engine.scan), 2),
+        "mismatches": mismatches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="0,50,100,250,500", help="synthetic rules added to the built-ins")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [bench(int(n), args.messages, args.repeat) for n in args.sizes.split(",")]
+    print(json.dumps({"messages": args.messages, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""End-to-end load test of the service against local stand-ins.
+
+Starts the app under uvicorn in a child process, with Chroma replaced by the
+in-memory stand-in and ``GEMINI_BASE_URL`` pointed at ``StubGeminiServer``
+(running in this process), so no API quota or Chroma server is needed.
+After uploading a few seed documents it drives each scenario with
+``--concurrency`` clients:
+
+- ``chat``: ``POST /api/chat`` with a new session per question
+- ``chat_stream``: ``POST /api/chat/stream`` read to the end; the time to
+  the first byte is reported too
+- ``upload``: ``POST /api/documents/upload``; also reports how long the
+  queued ingestion jobs take to drain
+- ``analytics``: the summary, audit-log and token-usage endpoints in turn
+
+The result is printed as JSON (and written to ``--output``): p50/p95/p99
+latency and requests/s per scenario, plus the server's peak RSS after each.
+``--compare`` adds the change against an earlier result file.
+
+    cd backend && python -m benchmarks.load --requests 500 --concurrency 50 --output before.json
+    cd backend && python -m benchmarks.load --requests 500 --concurrency 50 --compare before.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import resource
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.stubs import Latency, StubGeminiServer, _free_port, install_stub_chroma
+
+SCENARIOS = ("chat", "chat_stream", "upload", "analytics")
+TOPICS = ["vpn", "password", "printer", "laptop", "email", "wifi", "badge", "mfa"]
+ANALYTICS_PATHS = ["/api/analytics/summary", "/api/analytics/audit?page_size=50", "/api/analytics/tokens"]
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _document(topic: str, n: int, paragraphs: int = 20) -> bytes:
+    body = "\n\n".join(
+        f"How to fix {topic} issue {n}.{i}: check the cable, restart the device and retry the login."
+        for i in range(paragraphs)
+    )
+    return f"# {topic.title()} troubleshooting {n}\n\n{body}\n".encode()
+
+
+def _question(i: int) -> str:
+    return f"how do I fix my {TOPICS[i % len(TOPICS)]} problem {i}"
+
+
+# ── Server process ────────────────────────────────────────────────────
+def serve(port: int, chroma_latency: Latency):
+    """Child process: the app with the Chroma stand-in installed."""
+    import uvicorn
+
+    install_stub_chroma(chroma_latency)
+    uvicorn.run("src.main:app", host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+
+def _server_env(tmp: str, gemini_url: str, args) -> dict[str, str]:
+    env = {
+        **os.environ,
+        "GEMINI_BASE_URL": gemini_url,
+        "GEMINI_API_KEY": "stub",
+        "VECTOR_BACKEND": "chroma",
+        "SQLITE_PATH": f"{tmp}/audit.db",
+        "EMBEDDING_CACHE_PATH": f"{tmp}/embeddings.db",
+        "INGEST_UPLOAD_DIR": f"{tmp}/uploads",
+        "RATE_LIMIT_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": str(args.semantic_cache).lower(),
+        "TRACE_SAMPLE_RATE": str(args.trace_sample_rate),
+        "EMBEDDING_PROVIDER": args.embedding_provider,
+        "WORKERS": "1",
+    }
+    # prometheus_client turns on multiprocess mode when either is set, even to "".
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    env.pop("prometheus_multiproc_dir", None)
+    return env
+
+
+def _start_server(port: int, env: dict[str, str], log_path: str, args) -> subprocess.Popen:
+    cmd = [
+        sys.executable, "-m", "benchmarks.load", "--serve", "--port", str(port),
+        "--chroma-ms", str(args.chroma_ms), "--jitter", str(args.jitter),
+    ]
+    with open(log_path, "w") as log:
+        proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}; see {log_path}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"server did not start; see {log_path}")
+
+
+def _peak_rss_mb(pid: int) -> float | None:
+    """High-water RSS of a live process (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def _children_peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 1024), 1)
+
+
+# ── Load generation ───────────────────────────────────────────────────
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _latency_summary(samples: list[float], prefix: str = "") -> dict:
+    if not samples:
+        return {}
+    return {
+        f"{prefix}p50_ms": round(_percentile(samples, 0.50) * 1000, 2),
+        f"{prefix}p95_ms": round(_percentile(samples, 0.95) * 1000, 2),
+        f"{prefix}p99_ms": round(_percentile(samples, 0.99) * 1000, 2),
+        f"{prefix}mean_ms": round(statistics.fmean(samples) * 1000, 2),
+        f"{prefix}max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+async def _drive(request, requests: int, concurrency: int) -> dict:
+    """Run ``request(i)`` for ``i`` in ``range(requests)`` on ``concurrency`` workers.
+
+    ``request`` returns ``(ok, ttfb)``; ``ttfb`` may be ``None``.
+    """
+    latencies: list[float] = []
+    ttfbs: list[float] = []
+    errors = 0
+    todo = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in todo:
+            t0 = time.perf_counter()
+            try:
+                ok, ttfb = await request(i)
+            except httpx.HTTPError:
+                ok, ttfb = False, None
+            if not ok:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+            if ttfb is not None:
+                ttfbs.append(ttfb - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "rps": round(len(latencies) / wall, 1),
+        **_latency_summary(latencies),
+        **_latency_summary(ttfbs, "ttfb_"),
+    }
+
+
+async def _wait_for_jobs(client: httpx.AsyncClient, job_ids: list[str], timeout: float = 600) -> dict:
+    pending, failed = set(job_ids), 0
+    deadline = time.monotonic() + timeout
+    while pending and time.monotonic() < deadline:
+        for job_id in list(pending):
+            job = (await client.get(f"/api/documents/jobs/{job_id}")).json()
+            if job["status"] in ("done", "failed"):
+                pending.discard(job_id)
+                failed += job["status"] == "failed"
+        if pending:
+            await asyncio.sleep(0.1)
+    return {"jobs": len(job_ids), "jobs_failed": failed, "jobs_unfinished": len(pending)}
+
+
+async def _upload(client: httpx.AsyncClient, name: str, content: bytes) -> httpx.Response:
+    return await client.post("/api/documents/upload", files={"file": (name, content, "text/markdown")})
+
+
+async def _seed(client: httpx.AsyncClient, docs: int):
+    job_ids = []
+    for n in range(docs):
+        r = await _upload(client, f"seed-{n}.md", _document(TOPICS[n % len(TOPICS)], n))
+        r.raise_for_status()
+        job_ids.append(r.json()["id"])
+    status = await _wait_for_jobs(client, job_ids)
+    if status["jobs_failed"] or status["jobs_unfinished"]:
+        raise RuntimeError(f"seeding failed: {status}")
+
+
+async def _scenario(name: str, client: httpx.AsyncClient, requests: int, concurrency: int) -> dict:
+    if name == "chat":
+        async def request(i):
+            r = await client.post("/api/chat", json={"message": _question(i)})
+            return r.status_code == 200, None
+        return await _drive(request, requests, concurrency)
+
+    if name == "chat_stream":
+        async def request(i):
+            first = None
+            async with client.stream("POST", "/api/chat/stream", json={"message": _question(i)}) as r:
+                async for _ in r.aiter_bytes():
+                    first = first or time.perf_counter()
+            return r.status_code == 200, first
+        return await _drive(request, requests, concurrency)
+
+    if name == "upload":
+        job_ids: list[str] = []
+
+        async def request(i):
+            r = await _upload(client, f"load-{i}.md", _document(TOPICS[i % len(TOPICS)], i, paragraphs=5))
+            if r.status_code == 202:
+                job_ids.append(r.json()["id"])
+            return r.status_code == 202, None
+
+        start = time.perf_counter()
+        result = await _drive(request, requests, concurrency)
+        result.update(await _wait_for_jobs(client, job_ids))
+        result["drain_s"] = round(time.perf_counter() - start, 3)
+        return result
+
+    if name == "analytics":
+        async def request(i):
+            r = await client.get(ANALYTICS_PATHS[i % len(ANALYTICS_PATHS)])
+            return r.status_code == 200, None
+        return await _drive(request, requests, concurrency)
+
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+async def run(base_url: str, pid: int, args) -> list[dict]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        await _seed(client, args.seed_docs)
+        for i in range(args.warmup):
+            (await client.post("/api/chat", json={"message": f"warm up {i}"})).raise_for_status()
+
+        results = []
+        for name in args.scenarios.split(","):
+            result = {"scenario": name, **await _scenario(name, client, args.requests, args.concurrency)}
+            result["server_peak_rss_mb"] = _peak_rss_mb(pid)
+            results.append(result)
+            print(f"{name}: {result['rps']} req/s, p99 {result.get('p99_ms')} ms", file=sys.stderr)
+        return results
+
+
+# ── Reporting ─────────────────────────────────────────────────────────
+_COMPARED = ("rps", "p50_ms", "p95_ms", "p99_ms", "ttfb_p95_ms", "server_peak_rss_mb")
+
+
+def compare(before: dict, after: dict) -> dict:
+    """Per-scenario ``{metric: {before, after, change_pct}}`` for scenarios in both runs."""
+    old = {r["scenario"]: r for r in before["results"]}
+    out = {}
+    for result in after["results"]:
+        prev = old.get(result["scenario"])
+        if prev is None:
+            continue
+        out[result["scenario"]] = {
+            key: {
+                "before": prev[key],
+                "after": result[key],
+                "change_pct": round((result[key] - prev[key]) / prev[key] * 100, 1) if prev[key] else None,
+            }
+            for key in _COMPARED
+            if prev.get(key) is not None and result.get(key) is not None
+        }
+    return out
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed-docs", type=int, default=16)
+    parser.add_argument("--embed-ms", type=float, default=50.0)
+    parser.add_argument("--generate-ms", type=float, default=800.0)
+    parser.add_argument("--chroma-ms", type=float, default=5.0)
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency stddev as a fraction of the mean")
+    parser.add_argument("--semantic-cache", action="store_true", help="leave the semantic answer cache on")
+    parser.add_argument("--trace-sample-rate", type=float, default=1.0)
+    parser.add_argument("--embedding-provider", default="gemini", choices=["gemini", "local"])
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, Latency(args.chroma_ms, args.chroma_ms * args.jitter, seed=2))
+        return
+
+    logging.disable(logging.INFO)
+    with StubGeminiServer(
+        embed_latency=Latency(args.embed_ms, args.embed_ms * args.jitter),
+        generate_latency=Latency(args.generate_ms, args.generate_ms * args.jitter, seed=1),
+    ) as gemini, tempfile.TemporaryDirectory() as tmp:
+        port = _free_port()
+        proc = _start_server(port, _server_env(tmp, gemini.base_url, args), f"{tmp}/server.log", args)
+        try:
+            results = asyncio.run(run(f"http://127.0.0.1:{port}", proc.pid, args))
+        finally:
+            proc.send_signal(signal.SIGINT)
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("serve", "port", "output", "compare")},
+        "results": results,
+        "server_peak_rss_mb": _children_peak_rss_mb(),
+        "driver_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                                    / (2**20 if sys.platform == "darwin" else 1024), 1),
+        "stub_requests": gemini.requests,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(json.load(f), report)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
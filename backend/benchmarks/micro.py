@@ -0,0 +1,162 @@
+"""Micro-benchmarks of the request path's CPU-bound helpers.
+
+Each case is a zero-argument callable timed over ``--rounds`` rounds (after
+a short warm-up, with enough iterations per round to make each round
+about ``--round-ms`` milliseconds), reported pytest-benchmark style: min,
+max, mean, stddev and median per call, plus operations per second. The
+result is JSON; ``--compare`` adds the change in median per case against
+an earlier result file.
+
+    cd backend && python -m benchmarks.micro --output micro.json
+    cd backend && python -m benchmarks.micro -k chunk,scan --compare micro.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.load import TOPICS, _git_commit
+from src.guardrails.engine import GuardrailEngine
+from src.guardrails.rate_limit import Budget, MemoryRateLimiter
+from src.observability.spans import finish_trace, span, start_trace
+from src.observability.tracer import route_template
+from src.rag.chunker import chunk_text, iter_csv_chunks, iter_json_chunks
+from src.rag.embedders import HashingEmbedder
+from src.rag.lexical import BM25Index
+from src.rag.pipeline import _build_system_prompt
+
+_WORDS = (
+    "my laptop cannot connect to the vpn after the update and outlook keeps asking "
+    "for a password the printer on floor three shows an error and teams crashes"
+).split()
+
+
+def _text(words: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(words // 12):
+        sentences.append(" ".join(rng.choice(_WORDS) for _ in range(12)).capitalize() + ".")
+    return "\n\n".join(" ".join(sentences[i : i + 5]) for i in range(0, len(sentences), 5))
+
+
+def _cases() -> dict[str, Callable[[], object]]:
+    text = _text(30_000)
+    csv_text = "id,topic,summary\n" + "\n".join(f"{i},{TOPICS[i % 8]},{_text(24, i)}" for i in range(2000))
+    json_text = json.dumps([{"id": i, "topic": TOPICS[i % 8], "summary": _text(24, i)} for i in range(2000)])
+
+    index = BM25Index()
+    ids = [f"doc{i // 20}_chunk_{i % 20}" for i in range(5000)]
+    index.add(ids, [_text(60, i) for i in range(5000)],
+              [{"source": f"doc{i // 20}.md", "chunk_index": i % 20, "doc_id": f"doc{i // 20}"} for i in range(5000)])
+
+    embedder = HashingEmbedder()
+    chunks = chunk_text(text)[:100]
+
+    engine = GuardrailEngine()
+    message = "my laptop cannot connect to the vpn after the update, email me at jane.doe@example.com"
+    limiter, budget = MemoryRateLimiter(), Budget("chat", 1_000_000_000, 60)
+    # Three neighbouring chunks of one document (merged) and two of others.
+    context = [{"source": "doc0.md", "score": 0.8, "text": chunk, "doc_id": "doc0", "chunk_index": i}
+               for i, chunk in enumerate(chunks[:3])]
+    context += [{"source": f"doc{i}.md", "score": 0.7, "text": _text(80, i), "doc_id": f"doc{i}", "chunk_index": 0}
+                for i in (1, 2)]
+    scope = {"path": "/api/chat/history/abc123", "route": type("R", (), {"path": "/chat/history/{session_id}"})()}
+
+    def spans(traced: bool):
+        def run():
+            token = start_trace("bench", "bench", sampled=traced)
+            for name in ("guardrails", "embed_query", "retrieve", "llm", "persist"):
+                with span(name):
+                    pass
+            finish_trace(token)
+        return run
+
+    return {
+        "chunk_text_200k": lambda: chunk_text(text),
+        "chunk_csv_2000_rows": lambda: list(iter_csv_chunks([csv_text])),
+        "chunk_json_2000_records": lambda: list(iter_json_chunks([json_text])),
+        "local_embed_query": lambda: embedder.embed(["how do I reset my vpn password"]),
+        "local_embed_100_chunks": lambda: embedder.vectors(chunks),
+        "bm25_search_5000_chunks": lambda: index.search("vpn password printer error", 5),
+        "guardrail_scan": lambda: engine.scan(message),
+        "rate_limit_acquire": lambda: limiter.acquire("127.0.0.1", budget),
+        "route_template": lambda: route_template(scope),
+        "build_system_prompt": lambda: _build_system_prompt(context, "user: hi\nassistant: hello"),
+        "spans_5_untraced": spans(False),
+        "spans_5_traced": spans(True),
+    }
+
+
+def bench(fn: Callable[[], object], rounds: int, round_ms: float) -> dict:
+    for _ in range(3):
+        fn()
+    t0 = time.perf_counter()
+    fn()
+    per_call = max(time.perf_counter() - t0, 1e-7)
+    iterations = max(1, int(round_ms / 1000 / per_call))
+
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        samples.append((time.perf_counter() - t0) / iterations)
+
+    def us(seconds: float) -> float:
+        return round(seconds * 1e6, 3)
+
+    median = statistics.median(samples)
+    return {
+        "rounds": rounds,
+        "iterations": iterations,
+        "min_us": us(min(samples)),
+        "max_us": us(max(samples)),
+        "mean_us": us(statistics.fmean(samples)),
+        "stddev_us": us(statistics.stdev(samples)) if rounds > 1 else 0.0,
+        "median_us": us(median),
+        "ops": round(1 / median, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="select", default="", help="comma-separated substrings of case names to run")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--round-ms", type=float, default=50.0)
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    patterns = [p for p in args.select.split(",") if p]
+    results = {
+        name: bench(fn, args.rounds, args.round_ms)
+        for name, fn in _cases().items()
+        if not patterns or any(p in name for p in patterns)
+    }
+    report = {"commit": _git_commit(), "results": results}
+    if args.compare:
+        with open(args.compare) as f:
+            before = json.load(f)["results"]
+        report["comparison"] = {
+            name: {
+                "before_median_us": before[name]["median_us"],
+                "after_median_us": result["median_us"],
+                "change_pct": round((result["median_us"] - before[name]["median_us"])
+                                    / before[name]["median_us"] * 100, 1),
+            }
+            for name, result in results.items() if name in before
+        }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
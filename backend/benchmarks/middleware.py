@@ -0,0 +1,135 @@
+"""Middleware overhead: ``BaseHTTPMiddleware`` stack vs the pure ASGI one.
+
+Serves a trivial ``POST /api/chat`` (no retrieval or generation) behind the
+tracing and guardrails middleware, first as the previous
+``BaseHTTPMiddleware`` implementations (reproduced below, endpoint parsing
+the body again) and then as the current ASGI classes with the
+``chat_request`` dependency, and prints requests/s and latency per stack.
+Requests are driven in-process through ``httpx.ASGITransport`` so the
+numbers are the framework + middleware cost only.
+
+    cd backend && python -m benchmarks.middleware --concurrency 50 --requests 5000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+import uuid
+
+import httpx
+from fastapi import APIRouter, Depends, FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+
+from src.api.chat import chat_request
+from src.guardrails.engine import get_guardrail_engine
+from src.guardrails.middleware import GuardrailsMiddleware
+from src.models.chat import ChatRequest
+from src.observability.tracer import TracingMiddleware
+
+
+class LegacyTracingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        request_id = request.headers.get("X-Request-ID", uuid.uuid4().hex[:16])
+        start = time.perf_counter()
+        request.state.request_id = request_id
+        request.state.start_time = start
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-Latency-Ms"] = str(round((time.perf_counter() - start) * 1000, 2))
+        return response
+
+
+class LegacyGuardrailsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if request.method == "POST" and "/chat" in request.url.path:
+            body = await request.body()
+            message = json.loads(body).get("message", "") if body else ""
+            hits = get_guardrail_engine().scan(message)
+            if any(rule.action == "block" for rule in hits):
+                return JSONResponse(status_code=400, content={"detail": "blocked"})
+            request.state.guardrails_triggered = [rule.name for rule in hits]
+        else:
+            request.state.guardrails_triggered = []
+        return await call_next(request)
+
+
+def build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+    router = APIRouter()
+
+    if stack == "base_http":
+        @router.post("/chat")
+        async def chat(body: ChatRequest, request: Request):
+            return {"response": body.message, "guardrails": request.state.guardrails_triggered}
+
+        app.add_middleware(LegacyTracingMiddleware)
+        app.add_middleware(LegacyGuardrailsMiddleware)
+    else:
+        @router.post("/chat")
+        async def chat(request: Request, body: ChatRequest = Depends(chat_request)):
+            return {"response": body.message, "guardrails": request.state.guardrails_triggered}
+
+        app.add_middleware(TracingMiddleware)
+        app.add_middleware(GuardrailsMiddleware)
+
+    app.include_router(router, prefix="/api")
+    return app
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run(stack: str, requests: int, concurrency: int) -> dict:
+    app = build_app(stack)
+    transport = httpx.ASGITransport(app=app)
+    latencies: list[float] = []
+    payload = {"message": "my laptop cannot connect to the vpn after the update, email me at a@b.com"}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(50):
+            (await client.post("/api/chat", json=payload)).raise_for_status()
+
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with sem:
+                t0 = time.perf_counter()
+                r = await client.post("/api/chat", json=payload)
+                latencies.append(time.perf_counter() - t0)
+                r.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        wall = time.perf_counter() - start
+
+    return {
+        "stack": stack,
+        "requests": requests,
+        "concurrency": concurrency,
+        "rps": round(requests / wall, 1),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = [asyncio.run(run(stack, args.requests, args.concurrency)) for stack in ("base_http", "asgi")]
+    print(json.dumps({"results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
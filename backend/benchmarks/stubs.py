@@ -0,0 +1,287 @@
+"""Local stand-ins for the Gemini API and Chroma, used by the benchmarks.
+
+``StubGeminiServer`` speaks enough of the Gemini REST API (embed, generate,
+stream-generate) for ``genai.Client`` pointed at it via ``GEMINI_BASE_URL``.
+Latencies are drawn from a normal distribution so runs are comparable but not
+lock-step. The Chroma stand-ins are in-memory and installed straight into
+``src.db.chroma``.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+
+import numpy as np
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+def fake_embedding(text: str, dim: int = 256) -> list[float]:
+    """Deterministic bag-of-words embedding: similar texts get similar vectors."""
+    vec = np.zeros(dim, dtype=np.float32)
+    for word in text.lower().split():
+        h = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+        vec[h % dim] += 1.0
+    if not vec.any():
+        vec[0] = 1.0
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+class Latency:
+    def __init__(self, mean_ms: float, stddev_ms: float = 0.0, seed: int = 0):
+        self.mean = mean_ms / 1000
+        self.stddev = stddev_ms / 1000
+        self._rng = random.Random(seed)
+
+    def sample(self) -> float:
+        return max(0.0, self._rng.gauss(self.mean, self.stddev))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class StubGeminiServer:
+    def __init__(self, embed_latency: Latency, generate_latency: Latency,
+                 dim: int = 256, stream_chunks: int = 8, port: int | None = None):
+        self.embed_latency = embed_latency
+        self.generate_latency = generate_latency
+        self.dim = dim
+        self.stream_chunks = stream_chunks
+        self.port = port or _free_port()
+        self.requests = {"embed": 0, "generate": 0}
+        self._server: uvicorn.Server | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _answer(self, body: dict) -> str:
+        question = body["contents"][-1]["parts"][0]["text"]
+        return f"Stub answer to: {question}"
+
+    async def _handle(self, request: Request):
+        path = request.url.path
+        body = await request.json()
+
+        if path.endswith(":batchEmbedContents") or path.endswith(":embedContent"):
+            self.requests["embed"] += 1
+            await asyncio.sleep(self.embed_latency.sample())
+            if path.endswith(":embedContent"):
+                text = body["content"]["parts"][0]["text"]
+                return JSONResponse({"embedding": {"values": fake_embedding(text, self.dim)}})
+            return JSONResponse({"embeddings": [
+                {"values": fake_embedding(r["content"]["parts"][0]["text"], self.dim)}
+                for r in body["requests"]
+            ]})
+
+        self.requests["generate"] += 1
+        answer = self._answer(body)
+        usage = {"promptTokenCount": len(json.dumps(body)) // 4,
+                 "candidatesTokenCount": len(answer) // 4}
+
+        if path.endswith(":streamGenerateContent"):
+            async def events():
+                words = answer.split(" ")
+                step = max(1, len(words) // self.stream_chunks)
+                delay = self.generate_latency.sample() / max(1, len(words) // step)
+                for i in range(0, len(words), step):
+                    await asyncio.sleep(delay)
+                    piece = " ".join(words[i : i + step]) + " "
+                    chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": piece}]}}]}
+                    if i + step >= len(words):
+                        chunk["usageMetadata"] = usage
+                    yield f"data: {json.dumps(chunk)}\r\n\r\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(self.generate_latency.sample())
+        return JSONResponse({
+            "candidates": [{"content": {"role": "model", "parts": [{"text": answer}]}}],
+            "usageMetadata": usage,
+        })
+
+    def start(self) -> StubGeminiServer:
+        app = Starlette(routes=[Route("/{path:path}", self._handle, methods=["POST"])])
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port,
+                                log_level="warning", backlog=4096, limit_concurrency=10_000)
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ── Chroma stand-ins ─────────────────────────────────────────────────
+class _Store:
+    """Brute-force cosine store shared by the sync and async stand-ins."""
+
+    def __init__(self):
+        self.ids: list[str] = []
+        self.documents: list[str] = []
+        self.metadatas: list[dict] = []
+        self.vectors: list[np.ndarray] = []
+        self._matrix: np.ndarray | None = None
+        self._lock = threading.Lock()
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def add(self, ids, embeddings, documents, metadatas):
+        with self._lock:
+            index = {id_: i for i, id_ in enumerate(self.ids)}
+            for id_, emb, doc, meta in zip(ids, embeddings, documents, metadatas):
+                vec = np.asarray(emb, dtype=np.float32)
+                vec = vec / (np.linalg.norm(vec) or 1.0)
+                if id_ in index:
+                    i = index[id_]
+                    self.documents[i], self.metadatas[i], self.vectors[i] = doc, meta, vec
+                else:
+                    index[id_] = len(self.ids)
+                    self.ids.append(id_)
+                    self.documents.append(doc)
+                    self.metadatas.append(meta)
+                    self.vectors.append(vec)
+            self._matrix = None
+
+    upsert = add
+
+    def _matches(self, meta: dict, where: dict | None) -> bool:
+        if not where:
+            return True
+        for key, cond in where.items():
+            if isinstance(cond, dict) and "$in" in cond:
+                if meta.get(key) not in cond["$in"]:
+                    return False
+            elif meta.get(key) != cond:
+                return False
+        return True
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            keep = [
+                i for i, (id_, meta) in enumerate(zip(self.ids, self.metadatas))
+                if not ((ids is not None and id_ in ids) or (where and self._matches(meta, where)))
+            ]
+            self.ids = [self.ids[i] for i in keep]
+            self.documents = [self.documents[i] for i in keep]
+            self.metadatas = [self.metadatas[i] for i in keep]
+            self.vectors = [self.vectors[i] for i in keep]
+            self._matrix = None
+
+    def get(self, ids=None, where=None, include=None, limit=None, offset=None):
+        rows = [
+            i for i, (id_, meta) in enumerate(zip(self.ids, self.metadatas))
+            if (ids is None or id_ in ids) and self._matches(meta, where)
+        ]
+        rows = rows[offset or 0:][:limit] if limit else rows[offset or 0:]
+        return {
+            "ids": [self.ids[i] for i in rows],
+            "documents": [self.documents[i] for i in rows],
+            "metadatas": [self.metadatas[i] for i in rows],
+        }
+
+    def query(self, query_embeddings, n_results=10, include=None, where=None):
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.stack(self.vectors) if self.vectors else np.zeros((0, 1), np.float32)
+            matrix = self._matrix
+        q = np.asarray(query_embeddings[0], dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        scores = matrix @ q if len(matrix) else np.zeros(0)
+        top = np.argsort(-scores)[:n_results]
+        return {
+            "ids": [[self.ids[i] for i in top]],
+            "documents": [[self.documents[i] for i in top]],
+            "metadatas": [[self.metadatas[i] for i in top]],
+            "distances": [[float(1.0 - scores[i]) for i in top]],
+        }
+
+
+class StubCollection:
+    def __init__(self, store: _Store, latency: Latency):
+        self._store = store
+        self._latency = latency
+        self.metadata = {"hnsw:space": "cosine"}
+
+    def __getattr__(self, name):
+        op = getattr(self._store, name)
+
+        def call(*args, **kwargs):
+            time.sleep(self._latency.sample())
+            return op(*args, **kwargs)
+        return call
+
+
+class AsyncStubCollection:
+    def __init__(self, store: _Store, latency: Latency):
+        self._store = store
+        self._latency = latency
+        self.metadata = {"hnsw:space": "cosine"}
+
+    def __getattr__(self, name):
+        op = getattr(self._store, name)
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(self._latency.sample())
+            return op(*args, **kwargs)
+        return call
+
+
+class _StubClient:
+    def __init__(self, collection, latency: Latency):
+        self._collection = collection
+        self._latency = latency
+
+    def get_or_create_collection(self, name, metadata=None, **kwargs):
+        time.sleep(self._latency.sample())
+        return self._collection
+
+    def heartbeat(self):
+        return time.time_ns()
+
+
+class _AsyncStubClient:
+    def __init__(self, collection, latency: Latency):
+        self._collection = collection
+        self._latency = latency
+
+    async def get_or_create_collection(self, name, metadata=None, **kwargs):
+        await asyncio.sleep(self._latency.sample())
+        return self._collection
+
+    async def heartbeat(self):
+        return time.time_ns()
+
+
+def install_stub_chroma(latency: Latency) -> _Store:
+    """Point ``src.db.chroma`` at an in-memory store; returns the store."""
+    from src.db import chroma
+
+    store = _Store()
+    chroma._client = _StubClient(StubCollection(store, latency), latency)
+    chroma._async_client = _AsyncStubClient(AsyncStubCollection(store, latency), latency)
+    chroma.collection_manager.invalidate()
+    return store
@@ -0,0 +1,135 @@
+"""Retrieval latency and memory: in-process NumPy store vs Chroma over HTTP.
+
+For each corpus size, fills a store with random unit vectors and times
+``query`` for ``--queries`` random query vectors, reporting p50/p99 latency
+and the memory held by the index. The Chroma run needs a reachable server
+(``--chroma-host/--chroma-port``); it is reported as skipped otherwise.
+
+    cd backend && python -m benchmarks.vector_store --sizes 10000,100000,1000000 --dim 768
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import time
+import uuid
+
+import numpy as np
+
+from src.db.vector_store import NumpyVectorStore
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * 4096 / 2**20
+
+
+def _latency_summary(samples: list[float]) -> dict:
+    arr = np.asarray(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        "mean_ms": round(float(arr.mean()), 3),
+    }
+
+
+def _corpus(size: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for start in range(0, size, 5000):
+        n = min(5000, size - start)
+        yield (
+            [f"doc{i // 10}_chunk_{i % 10}" for i in range(start, start + n)],
+            rng.standard_normal((n, dim), dtype=np.float32),
+            [{"source": f"doc{i // 10}.md", "chunk_index": i % 10, "doc_id": f"doc{i // 10}"}
+             for i in range(start, start + n)],
+        )
+
+
+def bench_numpy(size: int, dim: int, queries: np.ndarray, top_k: int) -> dict:
+    gc.collect()
+    rss_before = _rss_mb()
+    store = NumpyVectorStore()
+    for ids, vectors, metas in _corpus(size, dim):
+        store.add(ids=ids, embeddings=vectors, documents=[""] * len(ids), metadatas=metas)
+
+    samples = []
+    for q in queries:
+        t0 = time.perf_counter()
+        store.query(query_embeddings=[q], n_results=top_k)
+        samples.append(time.perf_counter() - t0)
+
+    result = {
+        "backend": "numpy",
+        "chunks": size,
+        **_latency_summary(samples),
+        "matrix_mb": round(store._matrix.nbytes / 2**20, 1),
+        "rss_delta_mb": round(_rss_mb() - rss_before, 1),
+    }
+    del store
+    gc.collect()
+    return result
+
+
+def bench_chroma(size: int, dim: int, queries: np.ndarray, top_k: int, host: str, port: int) -> dict:
+    try:
+        import chromadb
+
+        client = chromadb.HttpClient(host=host, port=port)
+        client.heartbeat()
+    except Exception as e:
+        return {"backend": "chroma", "chunks": size, "skipped": f"Chroma unreachable: {e}"}
+
+    name = f"bench_{uuid.uuid4().hex[:8]}"
+    collection = client.get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
+    try:
+        for ids, vectors, metas in _corpus(size, dim):
+            collection.add(ids=ids, embeddings=vectors.tolist(), documents=[""] * len(ids), metadatas=metas)
+
+        samples = []
+        for q in queries:
+            t0 = time.perf_counter()
+            collection.query(query_embeddings=[q.tolist()], n_results=top_k,
+                             include=["documents", "metadatas", "distances"])
+            samples.append(time.perf_counter() - t0)
+    finally:
+        client.delete_collection(name)
+
+    # Chroma's memory lives in the server process; report the raw vector size for reference.
+    return {
+        "backend": "chroma",
+        "chunks": size,
+        **_latency_summary(samples),
+        "vectors_mb": round(size * dim * 4 / 2**20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--backends", default="numpy,chroma")
+    parser.add_argument("--chroma-host", default="localhost")
+    parser.add_argument("--chroma-port", type=int, default=8000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    backends = args.backends.split(",")
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        if "numpy" in backends:
+            results.append(bench_numpy(size, args.dim, queries, args.top_k))
+        if "chroma" in backends:
+            results.append(bench_chroma(size, args.dim, queries, args.top_k,
+                                        args.chroma_host, args.chroma_port))
+
+    print(json.dumps({"dim": args.dim, "top_k": args.top_k, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
-from fastapi import APIRouter
+import re
+from dataclasses import asdict
+
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from src.db.sqlite import get_guardrail_config, set_guardrail_config
 from src.config import get_settings
+from src.guardrails.engine import Rule, get_guardrail_engine
+from src.rag.embedders import get_embedder
 
 router = APIRouter(tags=["admin"])
 
@@ -30,6 +35,42 @@ async def update_guardrail(body: GuardrailUpdate):
     return {"status": "updated", "key": body.key, "value": body.value}
 
 
+class GuardrailRule(BaseModel):
+    name: str
+    category: str
+    pattern: str
+    action: str = "flag"
+    ignore_case: bool = False
+
+
+@router.get("/admin/guardrails/rules")
+async def list_guardrail_rules():
+    return {"rules": [asdict(r) for r in get_guardrail_engine().rules]}
+
+
+@router.post("/admin/guardrails/rules")
+async def add_guardrail_rules(body: list[GuardrailRule]):
+    """Add rules to the running engine. Not persisted: put permanent rules in
+    the ``guardrails_rules_path`` file."""
+    rules = [Rule(**r.model_dump()) for r in body]
+    for rule in rules:
+        if rule.action not in ("flag", "block"):
+            raise HTTPException(status_code=400, detail=f"Invalid action for rule {rule.name}: {rule.action}")
+    try:
+        get_guardrail_engine().add_rules(rules)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid pattern: {e}")
+    return {"status": "added", "count": len(rules)}
+
+
+@router.delete("/admin/guardrails/rules/{name}")
+async def delete_guardrail_rules(name: str):
+    removed = get_guardrail_engine().remove_rules(name)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    return {"status": "deleted", "name": name, "count": removed}
+
+
 @router.get("/admin/settings")
 async def get_app_settings():
     settings = get_settings()
@@ -37,9 +78,15 @@ async def get_app_settings():
         "app_name": settings.app_name,
         "app_version": settings.app_version,
         "gemini_model": settings.gemini_model,
+        "embedding_provider": settings.embedding_provider,
+        "embedding_model": get_embedder().model,
+        "embedding_dim": get_embedder().dimension,
         "rag_top_k": settings.rag_top_k,
         "rag_min_score": settings.rag_min_score,
         "chunk_size": settings.chunk_size,
         "chunk_overlap": settings.chunk_overlap,
+        "context_token_budget": settings.context_token_budget,
         "rate_limit_rpm": settings.rate_limit_rpm,
+        "rate_limit_ingest_rpm": settings.rate_limit_ingest_rpm,
+        "rate_limit_window": settings.rate_limit_window,
     }
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Query
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Query
 
 from src.models.audit import AuditLog, AuditEntry, AnalyticsSummary, TokenUsageTimeSeries, TokenUsagePoint
 from src.db.sqlite import get_audit_logs, get_analytics_summary, get_token_usage_timeseries
@@ -13,13 +15,28 @@ async def summary():
 
 
 @router.get("/analytics/audit", response_model=AuditLog)
-async def audit_log(page: int = Query(1, ge=1), page_size: int = Query(50, ge=1, le=200)):
-    entries, total = await get_audit_logs(page, page_size)
+async def audit_log(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(None, description="next_cursor from the previous page; overrides page"),
+    session_id: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    guardrail: str | None = Query(None, description='Guardrail name, or "any" for all flagged entries'),
+):
+    try:
+        entries, total, next_cursor = await get_audit_logs(
+            page, page_size, cursor=cursor, session_id=session_id,
+            since=since, until=until, guardrail=guardrail,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return AuditLog(
         entries=[AuditEntry(**e) for e in entries],
         total=total,
         page=page,
         page_size=page_size,
+        next_cursor=next_cursor,
     )
 
 
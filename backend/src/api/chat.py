@@ -1,14 +1,64 @@
-from fastapi import APIRouter, Request, HTTPException
+import json
+
+from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
 from src.models.chat import ChatRequest, ChatResponse, ConversationHistory, ConversationMessage
-from src.rag.pipeline import chat as rag_chat
+from src.rag.pipeline import chat as rag_chat, chat_stream as rag_chat_stream
 from src.db.sqlite import get_conversation, delete_conversation
+from src.guardrails.rate_limit import limit_chat
+from src.observability.logger import get_logger
 
 router = APIRouter(tags=["chat"])
+log = get_logger(__name__)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def chat_request(request: Request) -> ChatRequest:
+    """The chat body, reusing the JSON the guardrails middleware already decoded."""
+    if "chat_payload" in request.scope.get("state", {}):
+        payload = request.state.chat_payload
+        if payload is None:
+            raise RequestValidationError([
+                {"type": "json_invalid", "loc": ("body",), "msg": "JSON decode error", "input": {}},
+            ])
+    else:
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError as e:
+            raise RequestValidationError([
+                {"type": "json_invalid", "loc": ("body", e.pos), "msg": "JSON decode error", "input": {}},
+            ])
+    try:
+        return ChatRequest.model_validate(payload)
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)
+        ])
+
 
+# The body is read by ``chat_request`` rather than declared as a parameter,
+# so it is documented here instead.
+_CHAT_BODY_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": ChatRequest.model_json_schema()}},
+    },
+}
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(request: Request, body: ChatRequest):
+
+@router.post(
+    "/chat",
+    response_model=ChatResponse,
+    dependencies=[Depends(limit_chat)],
+    openapi_extra=_CHAT_BODY_SCHEMA,
+)
+async def chat(request: Request, body: ChatRequest = Depends(chat_request)):
     triggered = getattr(request.state, "guardrails_triggered", [])
     try:
         return await rag_chat(
@@ -20,6 +70,29 @@ async def chat(request: Request, body: ChatRequest):
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
 
+@router.post("/chat/stream", dependencies=[Depends(limit_chat)], openapi_extra=_CHAT_BODY_SCHEMA)
+async def chat_stream(request: Request, body: ChatRequest = Depends(chat_request)):
+    triggered = getattr(request.state, "guardrails_triggered", [])
+
+    async def events():
+        try:
+            async for event, data in rag_chat_stream(
+                message=body.message,
+                session_id=body.session_id,
+                guardrails_triggered=triggered,
+            ):
+                yield _sse(event, data)
+        except Exception as e:
+            log.exception("Streaming chat failed")
+            yield _sse("error", {"detail": f"Chat error: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/chat/history/{session_id}", response_model=ConversationHistory)
 async def get_history(session_id: str):
     rows = await get_conversation(session_id)
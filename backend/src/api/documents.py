@@ -1,14 +1,22 @@
 import uuid
+import shutil
 import asyncio
 from pathlib import Path
 from functools import partial
-
-from fastapi import APIRouter, UploadFile, File, HTTPException
-
-from src.models.documents import DocumentMetadata, DocumentList, IngestResult, IngestSampleResult
-from src.rag.pipeline import ingest_document, delete_document_chunks
-from src.db.sqlite import save_document_meta, get_documents, delete_document_meta
+from typing import BinaryIO
+
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+
+from src.models.documents import DocumentMetadata, DocumentList, IngestJob, IngestResult, IngestSampleResult
+from src.config import get_settings
+from src.rag.chunker import READ_SIZE
+from src.rag.jobs import get_ingest_job_runner
+from src.rag.pipeline import delete_document_chunks, delete_document_chunks_async
+from src.rag.ingest import ingest_directories
+from src.guardrails.rate_limit import limit_ingest
+from src.db.sqlite import create_ingest_job, get_ingest_job, get_documents, delete_document_meta
 from src.observability.logger import get_logger
+from src.observability.spans import span
 
 router = APIRouter(tags=["documents"])
 log = get_logger(__name__)
@@ -22,56 +30,53 @@ SAMPLE_DIRS = [
 ]
 
 
-async def _ingest_in_thread(doc_id: str, filename: str, content: str) -> int:
-    """Run sync embedding/ingestion in a thread pool to avoid blocking the event loop."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, partial(ingest_document, doc_id, filename, content))
+def _save_upload(source: BinaryIO, path: Path):
+    with open(path, "wb") as dest:
+        shutil.copyfileobj(source, dest, READ_SIZE)
 
 
-@router.post("/documents/upload", response_model=IngestResult)
+@router.post(
+    "/documents/upload", response_model=IngestJob, status_code=202, dependencies=[Depends(limit_ingest)],
+)
 async def upload_document(file: UploadFile = File(...)):
+    """Queue an upload for background ingestion; poll ``/documents/jobs/{id}`` for progress."""
     ext = Path(file.filename or "").suffix.lower()
     if ext not in ALLOWED_TYPES:
         raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
 
-    content = (await file.read()).decode("utf-8")
+    upload_dir = Path(get_settings().ingest_upload_dir)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    job_id = uuid.uuid4().hex
     doc_id = uuid.uuid4().hex[:12]
+    path = upload_dir / f"{job_id}{ext}"
+    with span("save_upload"):
+        await asyncio.to_thread(_save_upload, file.file, path)
 
-    chunks_created = await _ingest_in_thread(doc_id, file.filename, content)
-    await save_document_meta(doc_id, file.filename, ext, chunks_created, len(content))
+    await create_ingest_job(job_id, doc_id, file.filename, ext, str(path))
+    get_ingest_job_runner().notify()
+    return IngestJob(**await get_ingest_job(job_id))
 
-    return IngestResult(
-        document_id=doc_id,
-        filename=file.filename,
-        chunks_created=chunks_created,
-    )
+
+@router.get("/documents/jobs/{job_id}", response_model=IngestJob)
+async def get_job(job_id: str):
+    job = await get_ingest_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return IngestJob(**job)
 
 
-@router.post("/documents/ingest-samples", response_model=IngestSampleResult)
+@router.post(
+    "/documents/ingest-samples", response_model=IngestSampleResult, dependencies=[Depends(limit_ingest)],
+)
 async def ingest_samples():
-    details = []
-    total_chunks = 0
-
-    for p in SAMPLE_DIRS:
-        if not p.exists():
-            continue
-        for file in p.iterdir():
-            if file.suffix.lower() not in ALLOWED_TYPES:
-                continue
-            content = file.read_text(encoding="utf-8")
-            doc_id = uuid.uuid4().hex[:12]
-            chunks = await _ingest_in_thread(doc_id, file.name, content)
-            await save_document_meta(doc_id, file.name, file.suffix, chunks, len(content))
-            total_chunks += chunks
-            details.append(IngestResult(
-                document_id=doc_id,
-                filename=file.name,
-                chunks_created=chunks,
-            ))
+    results = await ingest_directories(SAMPLE_DIRS, ALLOWED_TYPES)
+    details = [IngestResult(**r) for r in results]
+    ingested = [d for d in details if d.status == "success"]
 
     return IngestSampleResult(
-        documents_ingested=len(details),
-        total_chunks=total_chunks,
+        documents_ingested=len(ingested),
+        total_chunks=sum(d.chunks_created for d in ingested),
+        documents_skipped=len(details) - len(ingested),
         details=details,
     )
 
@@ -85,7 +90,10 @@ async def list_documents():
 
 @router.delete("/documents/{doc_id}")
 async def delete_document(doc_id: str):
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, partial(delete_document_chunks, doc_id))
+    if get_settings().async_pipeline:
+        await delete_document_chunks_async(doc_id)
+    else:
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, partial(delete_document_chunks, doc_id))
     await delete_document_meta(doc_id)
     return {"status": "deleted", "document_id": doc_id}
@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 
 from src.db.sqlite import get_db
-from src.db.chroma import get_collection
+from src.db.chroma import collection_manager
 
 router = APIRouter(tags=["health"])
 
@@ -15,11 +15,11 @@ async def health_check():
     except Exception:
         checks["sqlite"] = "error"
 
-    try:
-        col = get_collection()
-        checks["chroma_docs"] = col.count()
-    except Exception:
+    # Served from the collection manager's background refresh, not a live round trip.
+    if collection_manager.last_error or collection_manager.count is None:
         checks["chroma"] = "error"
+    else:
+        checks["chroma_docs"] = collection_manager.count
 
     status = "healthy" if all(v == "ok" or isinstance(v, int) for v in checks.values()) else "degraded"
     return {"status": status, **checks}
@@ -1,3 +1,4 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -13,29 +14,131 @@ class Settings(BaseSettings):
     gemini_embedding_model: str = "gemini-embedding-001"
     gemini_temperature: float = 0.1
     gemini_max_tokens: int = 2048
+    gemini_base_url: str = ""  # override for proxies / local stand-ins
 
     # ChromaDB
     chroma_host: str = "localhost"
     chroma_port: int = 8000
     chroma_collection: str = "helpdesk_docs"
+    chroma_count_refresh_interval: float = 30.0
+
+    # Vector store: "chroma" (HTTP server) or "numpy" (in-process matrix)
+    vector_backend: str = "chroma"
+    numpy_store_path: str = "data/vectors"
+    numpy_store_mmap: bool = False
 
     # SQLite
     sqlite_path: str = "data/audit.db"
+    sqlite_read_pool_size: int = Field(4, ge=1)  # read-only connections beside the single writer
+    # Chat messages and audit records are group-committed by a write-behind
+    # queue. "flush": callers wait for their batch to commit (and see its
+    # errors); "async": callers return immediately, and a crash or a failed
+    # flush loses those records with only a log line.
+    sqlite_write_durability: str = "flush"
+    sqlite_flush_interval_ms: float = 20.0
+    sqlite_flush_max_records: int = 256
+    audit_count_cache_ttl: float = 30.0  # seconds a filtered audit-log count is reused
+
+    # Embeddings (src/rag/embedders.py): "gemini" (gemini_embedding_model) or
+    # "local" (in-process hashed n-gram vectors; no API calls). Collections
+    # record the model and dimension they were built with.
+    embedding_provider: str = "gemini"
+    gemini_embedding_dim: int = 0  # output_dimensionality; 0 = the model's default
+    local_embedding_dim: int = 768
+
+    # Embedding cache
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: str = "data/embeddings.db"
+
+    # Query embedding micro-batching
+    embedding_batching_enabled: bool = True
+    embedding_batch_window_ms: float = 5.0
+    embedding_batch_max_size: int = 32
 
     # RAG
     rag_top_k: int = 5
     rag_min_score: float = 0.3
     chunk_size: int = 500
     chunk_overlap: int = 50
+    # Context sent to the LLM (src/rag/context.py): adjacent chunks are merged,
+    # near-duplicates dropped and passages packed into this many estimated
+    # tokens (0 = no limit)
+    context_token_budget: int = 1500
+    context_dedup_threshold: float = 0.8  # share of a passage's word 3-grams found in a better one
+    # Run retrieval/generation on the async genai + Chroma clients; set false
+    # to fall back to the sync clients on the default thread pool.
+    async_pipeline: bool = True
+    # "vector", "hybrid" (vector + BM25 fused by reciprocal rank) or
+    # "lexical_first" (hybrid, but skip the query embedding - and with it the
+    # semantic cache - when the BM25 top hit is decisive)
+    retrieval_mode: str = "vector"
+    hybrid_candidate_factor: int = 4
+    rrf_k: int = 60
+    lexical_first_min_score: float = 0.35
+    lexical_first_margin: float = 1.25
+
+    # Bulk ingestion
+    ingest_read_concurrency: int = 16
+    ingest_embed_concurrency: int = 4
+    ingest_upsert_batch: int = 1000
+    ingest_group_files: int = 32  # files read, embedded and stored together; bounds memory
+
+    # Background ingestion of uploads (src/rag/jobs.py)
+    ingest_upload_dir: str = "data/uploads"
+    ingest_job_concurrency: int = 2
+    ingest_job_poll_interval: float = 1.0  # seconds between checks for jobs queued by other workers
+    ingest_job_stale_after: float = 60.0  # a running job without a heartbeat this long is re-queued
 
-    # Rate limiting
-    rate_limit_rpm: int = 30
-    rate_limit_window: int = 60
+    # Semantic answer cache
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.95
+    semantic_cache_max_entries: int = 1000
+    semantic_cache_ttl: int = 3600
+
+    # Single-flight (src/rag/singleflight.py): concurrent chats asking the same
+    # question share one embedding, retrieval and generation; each still gets
+    # its own messages and audit entry. "standalone" shares questions that
+    # open a conversation, "query" also follow-ups (answered with the first
+    # asker's history), "off" disables it.
+    chat_coalesce_policy: str = "standalone"
+
+    # Conversation history
+    history_window: int = 10  # messages of history sent with each turn
+    history_cache_sessions: int = 1000  # 0 disables the cache (src.serve does with workers > 1)
+
+    # Rate limiting: requests per window per client, separately for chat and
+    # document ingestion. "memory" limits each worker on its own; "sqlite"
+    # shares the budgets between all workers on the host.
+    rate_limit_enabled: bool = True
+    rate_limit_rpm: int = Field(30, gt=0)
+    rate_limit_ingest_rpm: int = Field(10, gt=0)
+    rate_limit_window: int = Field(60, gt=0)
+    rate_limit_backend: str = "memory"
+    rate_limit_sqlite_path: str = "data/ratelimit.db"
+    # "ip", or "session" to key chat by the request's session_id (requests
+    # without one fall back to the IP; clients choose their session ids)
+    rate_limit_key: str = "ip"
 
     # Guardrails
     guardrails_pii_enabled: bool = True
     guardrails_injection_enabled: bool = True
     guardrails_content_filter_enabled: bool = True
+    guardrails_rules_path: str = ""  # JSON file of extra rules loaded at startup
+
+    # Request tracing (src/observability/spans.py): share of requests whose
+    # stages are timed (Server-Timing header, audit "stages"), and an optional
+    # file that gets each traced request as an OTLP/JSON line.
+    trace_sample_rate: float = 1.0
+    trace_export_path: str = ""
+
+    # Workers (src/serve.py). With more than one, metrics are aggregated
+    # across workers through files in prometheus_multiproc_dir (wiped at
+    # launch; defaults to data/prometheus when workers > 1).
+    workers: int = 1
+    prometheus_multiproc_dir: str = ""
+    # Proxies (comma-separated IPs/networks, or "*") whose X-Forwarded-For
+    # header is trusted for the client address rate limits are keyed on.
+    forwarded_allow_ips: str = "127.0.0.1"
 
     # CORS
     cors_origins: list[str] = ["http://localhost:5173", "http://localhost:3000"]
@@ -0,0 +1,28 @@
+"""Rebuild the analytics rollup tables from ``audit_log``.
+
+Needed once after upgrading a database that predates the rollups (or to
+repair them). Safe to run while the app is serving: the rebuild is a single
+transaction.
+
+    cd backend && python -m src.db.backfill
+"""
+import asyncio
+
+from src.db.sqlite import init_db, close_db, rebuild_rollups
+from src.observability.logger import get_logger, setup_logging
+
+log = get_logger(__name__)
+
+
+async def main():
+    setup_logging()
+    await init_db()
+    try:
+        await rebuild_rollups()
+        log.info("Analytics rollups rebuilt")
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,20 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+import time
+
 import chromadb
+from chromadb.api import AsyncClientAPI
 from src.config import get_settings
+from src.db.vector_store import NumpyVectorStore, AsyncVectorStore
+from src.rag.embedders import check_embedding_space, collection_suffix, embedding_space
+from src.observability.logger import get_logger
+
+log = get_logger(__name__)
 
 _client: chromadb.HttpClient | None = None
+_async_client: AsyncClientAPI | None = None
 
 
 def get_chroma_client() -> chromadb.HttpClient:
@@ -17,10 +28,140 @@ def get_chroma_client() -> chromadb.HttpClient:
     return _client
 
 
+async def get_async_chroma_client() -> AsyncClientAPI:
+    global _async_client
+    if _async_client is None:
+        settings = get_settings()
+        _async_client = await chromadb.AsyncHttpClient(
+            host=settings.chroma_host,
+            port=settings.chroma_port,
+        )
+    return _async_client
+
+
+def collection_name() -> str:
+    return get_settings().chroma_collection + collection_suffix()
+
+
+def collection_metadata() -> dict:
+    return {"hnsw:space": "cosine", **embedding_space()}
+
+
+class CollectionManager:
+    """Caches the collection handles and an in-process chunk count.
+
+    ``get_or_create_collection`` and ``count`` are each an HTTP round trip;
+    the handles are fetched once and the count is refreshed after every
+    ingest/delete and on a background interval instead of per request.
+
+    With ``vector_backend = "numpy"`` the handles are an in-process
+    ``NumpyVectorStore`` instead of a Chroma collection; callers see the same
+    collection API either way.
+
+    Either way the collection is created with the embedding model and
+    dimension in its metadata, and opening one built by a different
+    embedding provider raises ``EmbeddingSpaceMismatch``.
+    """
+
+    def __init__(self):
+        self._collection = None
+        self._async_collection = None
+        self._local_store: NumpyVectorStore | None = None
+        self._lock = threading.Lock()
+        self.count: int | None = None
+        self.refreshed_at: float | None = None
+        self.last_error: str | None = None
+
+    def _local(self) -> NumpyVectorStore | None:
+        settings = get_settings()
+        if settings.vector_backend != "numpy":
+            return None
+        if self._local_store is None:
+            with self._lock:
+                if self._local_store is None:
+                    store = NumpyVectorStore(
+                        settings.numpy_store_path + collection_suffix(),
+                        mmap=settings.numpy_store_mmap, metadata=embedding_space(),
+                    )
+                    check_embedding_space(store.metadata, str(store.path))
+                    self._local_store = store
+        return self._local_store
+
+    def collection(self):
+        local = self._local()
+        if local is not None:
+            return local
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    name = collection_name()
+                    collection = get_chroma_client().get_or_create_collection(
+                        name=name, metadata=collection_metadata(),
+                    )
+                    check_embedding_space(collection.metadata, name)
+                    self._collection = collection
+        return self._collection
+
+    async def async_collection(self):
+        local = self._local()
+        if local is not None:
+            if self._async_collection is None:
+                self._async_collection = AsyncVectorStore(local)
+            return self._async_collection
+        if self._async_collection is None:
+            name = collection_name()
+            client = await get_async_chroma_client()
+            collection = await client.get_or_create_collection(name=name, metadata=collection_metadata())
+            check_embedding_space(collection.metadata, name)
+            self._async_collection = collection
+        return self._async_collection
+
+    def invalidate(self):
+        """Drop cached handles, e.g. after the collection was recreated server-side."""
+        self._collection = None
+        self._async_collection = None
+        self.count = None
+
+    def _record(self, count: int):
+        self.count = count
+        self.refreshed_at = time.time()
+        self.last_error = None
+
+    def refresh_count(self) -> int:
+        self._record(self.collection().count())
+        return self.count
+
+    async def refresh_count_async(self) -> int:
+        collection = await self.async_collection()
+        self._record(await collection.count())
+        return self.count
+
+    def snapshot(self):
+        """Persist the local store, if one is in use and has unsaved changes."""
+        if self._local_store is not None:
+            self._local_store.snapshot_if_dirty()
+
+    async def run_refresher(self, interval: float):
+        while True:
+            try:
+                if get_settings().async_pipeline:
+                    await self.refresh_count_async()
+                else:
+                    await asyncio.to_thread(self.refresh_count)
+                await asyncio.to_thread(self.snapshot)
+            except Exception as e:
+                self.last_error = str(e)
+                self.invalidate()
+                log.warning("Vector store refresh failed: %s", e)
+            await asyncio.sleep(interval)
+
+
+collection_manager = CollectionManager()
+
+
 def get_collection():
-    client = get_chroma_client()
-    settings = get_settings()
-    return client.get_or_create_collection(
-        name=settings.chroma_collection,
-        metadata={"hnsw:space": "cosine"},
-    )
+    return collection_manager.collection()
+
+
+async def get_async_collection():
+    return await collection_manager.async_collection()
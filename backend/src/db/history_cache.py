@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+
+from src.config import get_settings
+
+
+class SessionHistoryCache:
+    """Bounded LRU of the last ``window`` messages of recently active sessions.
+
+    ``save_message`` appends to a cached session, so a chat turn normally
+    reads its history without touching SQLite. Only used from the event loop.
+
+    A miss is filled from the database; a write that lands while that read is
+    in flight marks the load stale so it is not cached (it may predate the
+    write).
+    """
+
+    def __init__(self, window: int, max_sessions: int):
+        self.window = window
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, deque[dict]] = OrderedDict()
+        self._loading: dict[str, bool] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> list[dict] | None:
+        messages = self._sessions.get(session_id)
+        if messages is None:
+            return None
+        self._sessions.move_to_end(session_id)
+        return list(messages)
+
+    def begin_load(self, session_id: str):
+        self._loading[session_id] = False
+
+    def finish_load(self, session_id: str, messages: list[dict]):
+        stale = self._loading.pop(session_id, True)
+        if not stale:
+            self._put(session_id, deque(messages, maxlen=self.window))
+
+    def _put(self, session_id: str, messages: deque[dict]):
+        self._sessions[session_id] = messages
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def append(self, session_id: str, message: dict, new_session: bool = False):
+        """Record a persisted message. ``new_session`` means it is the session's first."""
+        if session_id in self._loading:
+            self._loading[session_id] = True
+        messages = self._sessions.get(session_id)
+        if messages is not None:
+            messages.append(message)
+            self._sessions.move_to_end(session_id)
+        elif new_session:
+            self._put(session_id, deque([message], maxlen=self.window))
+
+    def discard(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        if session_id in self._loading:
+            self._loading[session_id] = True
+
+
+_history_cache: SessionHistoryCache | None = None
+
+
+def get_history_cache() -> SessionHistoryCache:
+    global _history_cache
+    if _history_cache is None:
+        settings = get_settings()
+        _history_cache = SessionHistoryCache(
+            window=settings.history_window,
+            max_sessions=settings.history_cache_sessions,
+        )
+    return _history_cache
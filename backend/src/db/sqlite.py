@@ -1,9 +1,158 @@
 import json
+import time
+import base64
+import asyncio
+import binascii
+import contextlib
+from datetime import datetime, timezone
+
 import aiosqlite
 from pathlib import Path
 from src.config import get_settings
+from src.db.history_cache import get_history_cache
+from src.observability.logger import get_logger
+from src.observability.metrics import (
+    HISTORY_CACHE_LOOKUPS, HISTORY_FETCH_LATENCY, SQLITE_WRITE_QUEUE_DEPTH, SQLITE_FLUSH_LATENCY,
+)
+
+log = get_logger(__name__)
+
+_db: aiosqlite.Connection | None = None  # the single writer connection
+_write_lock: asyncio.Lock | None = None  # one transaction at a time on _db, see transaction()
+_readers: asyncio.Queue[aiosqlite.Connection] | None = None
+_writer: "WriteBehindQueue | None" = None
+
+# Statements run by the write-behind queue, in flush order: session upserts
+# first so the message foreign key always resolves.
+_WRITE_STATEMENTS = {
+    "session": """INSERT INTO sessions (id) VALUES (?)
+                  ON CONFLICT(id) DO UPDATE SET updated_at = CURRENT_TIMESTAMP""",
+    "message": """INSERT INTO conversation_history
+                  (session_id, role, content, citations, confidence)
+                  VALUES (?, ?, ?, ?, ?)""",
+    "audit": """INSERT INTO audit_log
+                (session_id, query, response, tokens_used, latency_ms,
+                 sources, guardrails_triggered, confidence, stages)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+    # Analytics rollups, committed in the same transaction as their audit rows.
+    "audit_daily": """INSERT INTO audit_daily (day, queries, latency_ms_sum, confidence_sum, tokens)
+                      VALUES (date('now'), 1, ?, ?, ?)
+                      ON CONFLICT(day) DO UPDATE SET
+                          queries = queries + 1,
+                          latency_ms_sum = latency_ms_sum + excluded.latency_ms_sum,
+                          confidence_sum = confidence_sum + excluded.confidence_sum,
+                          tokens = tokens + excluded.tokens""",
+    "guardrail_count": """INSERT INTO audit_guardrail_counts (guardrail, count) VALUES (?, 1)
+                          ON CONFLICT(guardrail) DO UPDATE SET count = count + 1""",
+}
+
+
+class WriteBehindQueue:
+    """Group-commits chat writes off the request path.
+
+    Message, audit and session-touch records are queued and written in one
+    transaction. A record arriving at an idle queue is committed at once;
+    records arriving within ``interval`` seconds of the previous flush wait
+    for the rest of that interval (or until ``max_records`` are pending), so
+    under load there is at most one commit per ``interval``. With
+    ``wait=True`` a caller's ``submit`` returns once its batch is committed;
+    otherwise it returns immediately and a crash can lose the last
+    ``interval`` worth of records.
+    """
+
+    def __init__(self, interval: float, max_records: int):
+        self.interval = interval
+        self.max_records = max_records
+        self._pending: list[tuple[str, tuple, asyncio.Future | None]] = []
+        self._has_items = asyncio.Event()
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._last_flush = float("-inf")  # time.monotonic() when the last flush started
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, records: list[tuple[str, tuple]], wait: bool):
+        future = asyncio.get_running_loop().create_future() if wait else None
+        for i, (kind, params) in enumerate(records):
+            # Only the last record of a group carries the future; the whole
+            # group lands in the same batch.
+            self._pending.append((kind, params, future if i == len(records) - 1 else None))
+        SQLITE_WRITE_QUEUE_DEPTH.set(len(self._pending))
+        self._has_items.set()
+        if len(self._pending) >= self.max_records:
+            self._full.set()
+        if future is not None:
+            await future
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+            delay = self._last_flush + self.interval - time.monotonic()
+            if delay > 0:
+                # Not wait_for: on Python 3.11 it drops a cancellation that
+                # arrives just as the queue fills, and close() then hangs.
+                with contextlib.suppress(asyncio.TimeoutError):
+                    async with asyncio.timeout(delay):
+                        await self._full.wait()
+            try:
+                await self.flush()
+            except Exception:
+                pass  # logged and reported to waiters in flush
+
+    async def flush(self):
+        async with self._flush_lock:
+            self._last_flush = time.monotonic()
+            batch, self._pending = self._pending, []
+            self._has_items.clear()
+            self._full.clear()
+            SQLITE_WRITE_QUEUE_DEPTH.set(0)
+            if not batch:
+                return
+
+            start = time.perf_counter()
+            try:
+                async with transaction() as db:
+                    for kind, sql in _WRITE_STATEMENTS.items():
+                        rows = [params for k, params, _ in batch if k == kind]
+                        if rows:
+                            await db.executemany(sql, rows)
+            except Exception as e:
+                log.error("Write-behind flush of %d records failed: %s", len(batch), e)
+                for _, _, future in batch:
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                raise
+            finally:
+                SQLITE_FLUSH_LATENCY.observe(time.perf_counter() - start)
+
+            for _, _, future in batch:
+                if future is not None and not future.done():
+                    future.set_result(None)
+
+
+async def _write(records: list[tuple[str, tuple]]):
+    if _writer is None:
+        raise RuntimeError("Database not initialized")
+    await _writer.submit(records, wait=get_settings().sqlite_write_durability == "flush")
 
-_db: aiosqlite.Connection | None = None
+
+async def flush_writes():
+    """Wait until every queued chat write is committed."""
+    if _writer is not None:
+        await _writer.flush()
 
 
 async def get_db() -> aiosqlite.Connection:
@@ -13,15 +162,37 @@ async def get_db() -> aiosqlite.Connection:
     return _db
 
 
+@contextlib.asynccontextmanager
+async def transaction():
+    """The writer connection for one transaction, committed on exit and rolled back on error.
+
+    Every write goes through here: the connection is shared, so an
+    unserialised commit elsewhere would commit half of another coroutine's
+    transaction (or one a failed caller was told had been rolled back).
+    """
+    db = await get_db()
+    async with _write_lock:
+        try:
+            yield db
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+
+
 async def init_db():
-    global _db
+    global _db, _write_lock
     settings = get_settings()
+    _write_lock = asyncio.Lock()
     db_path = Path(settings.sqlite_path)
     db_path.parent.mkdir(parents=True, exist_ok=True)
     _db = await aiosqlite.connect(str(db_path))
     _db.row_factory = aiosqlite.Row
     await _db.execute("PRAGMA journal_mode=WAL")
     await _db.execute("PRAGMA foreign_keys=ON")
+    # WAL is durable across application crashes with NORMAL; only an OS
+    # crash can lose the last commits.
+    await _db.execute("PRAGMA synchronous=NORMAL")
 
     await _db.executescript("""
         CREATE TABLE IF NOT EXISTS sessions (
@@ -51,6 +222,7 @@ async def init_db():
             sources TEXT DEFAULT '[]',
             guardrails_triggered TEXT DEFAULT '[]',
             confidence REAL DEFAULT 0.0,
+            stages TEXT DEFAULT '{}',
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
 
@@ -60,112 +232,395 @@ async def init_db():
             file_type TEXT NOT NULL,
             chunk_count INTEGER DEFAULT 0,
             size_bytes INTEGER DEFAULT 0,
+            content_hash TEXT,
             uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
 
+        CREATE TABLE IF NOT EXISTS ingest_jobs (
+            id TEXT PRIMARY KEY,
+            document_id TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            file_type TEXT NOT NULL,
+            upload_path TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',  -- queued, running, done, failed
+            chunks_done INTEGER NOT NULL DEFAULT 0,
+            chunks_total INTEGER,
+            error TEXT,
+            owner TEXT,
+            heartbeat_at REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS audit_daily (
+            day TEXT PRIMARY KEY,
+            queries INTEGER NOT NULL DEFAULT 0,
+            latency_ms_sum REAL NOT NULL DEFAULT 0.0,
+            confidence_sum REAL NOT NULL DEFAULT 0.0,
+            tokens INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS audit_guardrail_counts (
+            guardrail TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        );
+
         CREATE TABLE IF NOT EXISTS guardrail_config (
             key TEXT PRIMARY KEY,
             value TEXT NOT NULL,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
 
-        CREATE INDEX IF NOT EXISTS idx_conversation_session
-            ON conversation_history(session_id);
-        CREATE INDEX IF NOT EXISTS idx_audit_timestamp
-            ON audit_log(timestamp);
-        CREATE INDEX IF NOT EXISTS idx_audit_session
-            ON audit_log(session_id);
+        DROP INDEX IF EXISTS idx_conversation_session;
+        CREATE INDEX IF NOT EXISTS idx_conversation_session_id
+            ON conversation_history(session_id, id);
+        DROP INDEX IF EXISTS idx_audit_timestamp;
+        DROP INDEX IF EXISTS idx_audit_session;
+        CREATE INDEX IF NOT EXISTS idx_audit_timestamp_id
+            ON audit_log(timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_audit_session_timestamp_id
+            ON audit_log(session_id, timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_audit_flagged_timestamp_id
+            ON audit_log(timestamp, id) WHERE guardrails_triggered != '[]';
+        CREATE INDEX IF NOT EXISTS idx_ingest_jobs_unfinished
+            ON ingest_jobs(status, created_at) WHERE status IN ('queued', 'running');
     """)
+    await _ensure_column(_db, "documents", "content_hash", "TEXT")
+    await _ensure_column(_db, "audit_log", "stages", "TEXT DEFAULT '{}'")
     await _db.commit()
+    await _check_rollups(_db)
+
+    await _open_readers(db_path, settings.sqlite_read_pool_size)
+
+    global _writer
+    _writer = WriteBehindQueue(
+        interval=settings.sqlite_flush_interval_ms / 1000,
+        max_records=settings.sqlite_flush_max_records,
+    )
+    _writer.start()
+
+
+async def _open_readers(db_path: Path, size: int):
+    """Open the read-only pool. WAL lets these read while the writer commits."""
+    global _readers
+    _readers = asyncio.Queue()
+    for _ in range(size):
+        conn = await aiosqlite.connect(f"file:{db_path.resolve()}?mode=ro", uri=True)
+        conn.row_factory = aiosqlite.Row
+        await conn.execute("PRAGMA query_only=ON")
+        _readers.put_nowait(conn)
+
+
+@contextlib.asynccontextmanager
+async def read_connection():
+    """Borrow a connection from the read-only pool."""
+    if _readers is None:
+        raise RuntimeError("Database not initialized")
+    conn = await _readers.get()
+    try:
+        yield conn
+    finally:
+        _readers.put_nowait(conn)
+
+
+async def _ensure_column(db: aiosqlite.Connection, table: str, column: str, decl: str):
+    """Add ``column`` to a table created by an older schema version."""
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    existing = {row["name"] for row in await cursor.fetchall()}
+    if column not in existing:
+        await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+async def _check_rollups(db: aiosqlite.Connection):
+    cursor = await db.execute(
+        "SELECT EXISTS(SELECT 1 FROM audit_log) AS has_audit, "
+        "EXISTS(SELECT 1 FROM audit_daily) AS has_rollups"
+    )
+    row = await cursor.fetchone()
+    if row["has_audit"] and not row["has_rollups"]:
+        log.warning("Analytics rollups are empty; run `python -m src.db.backfill` to build them")
+
+
+async def rebuild_rollups():
+    """Recompute the analytics rollups from ``audit_log`` in one transaction."""
+    await flush_writes()
+    async with transaction() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        await db.execute("DELETE FROM audit_daily")
+        await db.execute("DELETE FROM audit_guardrail_counts")
+        await db.execute(
+            """INSERT INTO audit_daily (day, queries, latency_ms_sum, confidence_sum, tokens)
+               SELECT date(timestamp), COUNT(*), TOTAL(latency_ms), TOTAL(confidence),
+                      COALESCE(SUM(tokens_used), 0)
+               FROM audit_log
+               GROUP BY date(timestamp)"""
+        )
+        await db.execute(
+            """INSERT INTO audit_guardrail_counts (guardrail, count)
+               SELECT g.value, COUNT(*)
+               FROM audit_log, json_each(audit_log.guardrails_triggered) AS g
+               GROUP BY g.value"""
+        )
 
 
 async def close_db():
-    global _db
+    global _db, _readers, _writer
+    if _writer is not None:
+        await _writer.close()
+        _writer = None
+    if _readers is not None:
+        while not _readers.empty():
+            await _readers.get_nowait().close()
+        _readers = None
     if _db:
         await _db.close()
         _db = None
 
 
-async def save_message(session_id: str, role: str, content: str,
-                       citations: list | None = None, confidence: float = 0.0):
-    db = await get_db()
-    await db.execute(
-        "INSERT OR IGNORE INTO sessions (id) VALUES (?)",
-        (session_id,)
-    )
-    await db.execute(
-        """INSERT INTO conversation_history
-           (session_id, role, content, citations, confidence)
-           VALUES (?, ?, ?, ?, ?)""",
-        (session_id, role, content, json.dumps(citations or []), confidence)
-    )
-    await db.execute(
-        "UPDATE sessions SET updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-        (session_id,)
-    )
-    await db.commit()
+def _message_records(session_id: str, role: str, content: str, citations: list | None,
+                     confidence: float, new_session: bool = False) -> list[tuple[str, tuple]]:
+    get_history_cache().append(session_id, {
+        "role": role,
+        "content": content,
+        "citations": citations or [],
+        "confidence": confidence,
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+    }, new_session=new_session)
+    return [
+        ("session", (session_id,)),
+        ("message", (session_id, role, content, json.dumps(citations or []), confidence)),
+    ]
 
 
-async def get_conversation(session_id: str) -> list[dict]:
-    db = await get_db()
-    cursor = await db.execute(
-        """SELECT role, content, citations, confidence, timestamp
-           FROM conversation_history
-           WHERE session_id = ?
-           ORDER BY timestamp ASC""",
-        (session_id,)
-    )
-    rows = await cursor.fetchall()
+def _audit_records(session_id: str, query: str, response: str, tokens_used: int, latency_ms: float,
+                   sources: list[str], guardrails_triggered: list[str], confidence: float,
+                   stages: dict[str, float] | None) -> list[tuple[str, tuple]]:
     return [
-        {
-            "role": row["role"],
-            "content": row["content"],
-            "citations": json.loads(row["citations"]),
-            "confidence": row["confidence"],
-            "timestamp": row["timestamp"],
-        }
-        for row in rows
+        ("audit", (session_id, query, response, tokens_used, latency_ms,
+                   json.dumps(sources), json.dumps(guardrails_triggered), confidence,
+                   json.dumps(stages or {}))),
+        ("audit_daily", (latency_ms, confidence, tokens_used)),
+        *(("guardrail_count", (g,)) for g in guardrails_triggered),
     ]
 
 
+async def save_message(session_id: str, role: str, content: str,
+                       citations: list | None = None, confidence: float = 0.0,
+                       new_session: bool = False):
+    """Queue a message (and a session touch) on the write-behind queue.
+
+    ``new_session`` tells the history cache the session has no earlier
+    messages, so it can be cached without a database read.
+    """
+    await _write(_message_records(session_id, role, content, citations, confidence, new_session))
+
+
+def _message_row(row) -> dict:
+    return {
+        "role": row["role"],
+        "content": row["content"],
+        "citations": json.loads(row["citations"]),
+        "confidence": row["confidence"],
+        "timestamp": row["timestamp"],
+    }
+
+
+async def get_conversation(session_id: str) -> list[dict]:
+    await flush_writes()
+    async with read_connection() as db:
+        cursor = await db.execute(
+            """SELECT role, content, citations, confidence, timestamp
+               FROM conversation_history
+               WHERE session_id = ?
+               ORDER BY id ASC""",
+            (session_id,)
+        )
+        rows = await cursor.fetchall()
+        return [_message_row(row) for row in rows]
+
+
+async def get_recent_messages(session_id: str) -> list[dict]:
+    """The last ``history_window`` messages of a session, oldest first."""
+    cache = get_history_cache()
+    cached = cache.get(session_id)
+    if cached is not None:
+        HISTORY_CACHE_LOOKUPS.labels(result="hit").inc()
+        return cached
+    HISTORY_CACHE_LOOKUPS.labels(result="miss").inc()
+
+    cache.begin_load(session_id)
+    await flush_writes()
+    async with read_connection() as db:
+        start = time.perf_counter()
+        cursor = await db.execute(
+            """SELECT role, content, citations, confidence, timestamp
+               FROM conversation_history
+               WHERE session_id = ?
+               ORDER BY id DESC
+               LIMIT ?""",
+            (session_id, cache.window)
+        )
+        rows = await cursor.fetchall()
+    HISTORY_FETCH_LATENCY.observe(time.perf_counter() - start)
+
+    messages = [_message_row(row) for row in reversed(rows)]
+    cache.finish_load(session_id, messages)
+    return messages
+
+
 async def delete_conversation(session_id: str):
-    db = await get_db()
-    await db.execute("DELETE FROM conversation_history WHERE session_id = ?", (session_id,))
-    await db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
-    await db.commit()
+    await flush_writes()
+    async with transaction() as db:
+        await db.execute("DELETE FROM conversation_history WHERE session_id = ?", (session_id,))
+        await db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+    get_history_cache().discard(session_id)
 
 
 async def save_audit(session_id: str, query: str, response: str,
                      tokens_used: int, latency_ms: float,
                      sources: list[str], guardrails_triggered: list[str],
-                     confidence: float):
-    db = await get_db()
-    await db.execute(
-        """INSERT INTO audit_log
-           (session_id, query, response, tokens_used, latency_ms,
-            sources, guardrails_triggered, confidence)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-        (session_id, query, response, tokens_used, latency_ms,
-         json.dumps(sources), json.dumps(guardrails_triggered), confidence)
+                     confidence: float, stages: dict[str, float] | None = None):
+    await _write(_audit_records(session_id, query, response, tokens_used, latency_ms,
+                                sources, guardrails_triggered, confidence, stages))
+
+
+async def save_answer(session_id: str, query: str, response: str, citations: list,
+                      tokens_used: int, latency_ms: float, sources: list[str],
+                      guardrails_triggered: list[str], confidence: float,
+                      stages: dict[str, float] | None = None):
+    """``save_message`` for the assistant's answer and ``save_audit`` for the turn, committed together."""
+    await _write(
+        _message_records(session_id, "assistant", response, citations, confidence)
+        + _audit_records(session_id, query, response, tokens_used, latency_ms,
+                         sources, guardrails_triggered, confidence, stages)
     )
-    await db.commit()
 
 
-async def get_audit_logs(page: int = 1, page_size: int = 50) -> tuple[list[dict], int]:
-    db = await get_db()
-    offset = (page - 1) * page_size
+def _sql_timestamp(dt: datetime) -> str:
+    """Format like SQLite's ``CURRENT_TIMESTAMP`` (UTC) for comparisons."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def encode_audit_cursor(timestamp: str, entry_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp}|{entry_id}".encode()).decode()
+
+
+def decode_audit_cursor(cursor: str) -> tuple[str, int]:
+    """Raises ``ValueError`` for a malformed cursor."""
+    try:
+        timestamp, entry_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return timestamp, int(entry_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid audit cursor") from e
+
+
+_audit_count_cache: dict[tuple, tuple[float, int]] = {}
+
 
-    cursor = await db.execute("SELECT COUNT(*) as cnt FROM audit_log")
+_rollups_cover_audit = False  # audit_daily known to count every audit_log row
+
+
+async def _rollups_complete(db: aiosqlite.Connection) -> bool:
+    """Whether ``audit_daily`` covers all of ``audit_log``.
+
+    On a database upgraded from before the rollups, they only count rows
+    written since, until ``python -m src.db.backfill`` runs. They are
+    complete once the oldest audit day is fully counted; from then on every
+    audit row and its rollup commit together, so the answer is remembered.
+    """
+    global _rollups_cover_audit
+    if _rollups_cover_audit:
+        return True
+    cursor = await db.execute("SELECT date(MIN(timestamp)) AS day FROM audit_log")
+    first_day = (await cursor.fetchone())["day"]
+    if first_day is None:
+        _rollups_cover_audit = True
+        return True
+    cursor = await db.execute(
+        """SELECT (SELECT COUNT(*) FROM audit_log
+                   WHERE timestamp >= ?1 AND timestamp < date(?1, '+1 day')) AS logged,
+                  (SELECT queries FROM audit_daily WHERE day = ?1) AS counted""",
+        (first_day,),
+    )
     row = await cursor.fetchone()
-    total = row["cnt"]
+    _rollups_cover_audit = row["counted"] == row["logged"]
+    return _rollups_cover_audit
+
+
+async def _audit_total(db: aiosqlite.Connection, where: str, params: tuple, key: tuple) -> int:
+    """Total for the audit listing without a full COUNT per page.
 
+    Unfiltered totals come from the rollups once they are complete; other
+    counts are cached for ``audit_count_cache_ttl`` seconds.
+    """
+    if not where and await _rollups_complete(db):
+        cursor = await db.execute("SELECT TOTAL(queries) AS cnt FROM audit_daily")
+        return int((await cursor.fetchone())["cnt"])
+
+    now = time.monotonic()
+    cached = _audit_count_cache.get(key)
+    if cached is not None and now - cached[0] < get_settings().audit_count_cache_ttl:
+        return cached[1]
     cursor = await db.execute(
-        """SELECT * FROM audit_log
-           ORDER BY timestamp DESC
-           LIMIT ? OFFSET ?""",
-        (page_size, offset)
+        f"SELECT COUNT(*) AS cnt FROM audit_log {f'WHERE {where}' if where else ''}", params
     )
-    rows = await cursor.fetchall()
+    total = (await cursor.fetchone())["cnt"]
+    if len(_audit_count_cache) >= 256:
+        _audit_count_cache.clear()
+    _audit_count_cache[key] = (now, total)
+    return total
+
+
+async def get_audit_logs(page: int = 1, page_size: int = 50, cursor: str | None = None,
+                         session_id: str | None = None, since: datetime | None = None,
+                         until: datetime | None = None,
+                         guardrail: str | None = None) -> tuple[list[dict], int, str | None]:
+    """One page of audit entries, newest first.
+
+    Pages by ``cursor`` (keyset on ``(timestamp, id)``) when given, else by
+    ``page`` offset. Returns ``(entries, total, next_cursor)``; ``next_cursor``
+    is ``None`` on the last page. ``guardrail`` is a guardrail name, or
+    ``"any"`` for every flagged entry.
+    """
+    await flush_writes()
+    filters, params = [], []
+    if session_id:
+        filters.append("session_id = ?")
+        params.append(session_id)
+    if since:
+        filters.append("timestamp >= ?")
+        params.append(_sql_timestamp(since))
+    if until:
+        filters.append("timestamp < ?")
+        params.append(_sql_timestamp(until))
+    if guardrail:
+        filters.append("guardrails_triggered != '[]'")
+        if guardrail != "any":
+            filters.append("EXISTS (SELECT 1 FROM json_each(guardrails_triggered) WHERE value = ?)")
+            params.append(guardrail)
+    count_where = " AND ".join(filters)
+    count_params = tuple(params)
+
+    offset = 0
+    if cursor:
+        filters.append("(timestamp, id) < (?, ?)")
+        params.extend(decode_audit_cursor(cursor))
+    else:
+        offset = (page - 1) * page_size
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+    async with read_connection() as db:
+        total = await _audit_total(db, count_where, count_params, (count_where, count_params))
+        rows = await db.execute_fetchall(
+            f"""SELECT * FROM audit_log
+                {where}
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ? OFFSET ?""",
+            (*params, page_size, offset)
+        )
     entries = []
     for row in rows:
         entries.append({
@@ -178,112 +633,188 @@ async def get_audit_logs(page: int = 1, page_size: int = 50) -> tuple[list[dict]
             "sources": json.loads(row["sources"]),
             "guardrails_triggered": json.loads(row["guardrails_triggered"]),
             "confidence": row["confidence"],
+            "stages": json.loads(row["stages"] or "{}"),
             "timestamp": row["timestamp"],
         })
-    return entries, total
+    next_cursor = None
+    if len(rows) == page_size:
+        next_cursor = encode_audit_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+    return entries, total, next_cursor
 
 
 async def get_analytics_summary() -> dict:
-    db = await get_db()
-
-    cursor = await db.execute(
-        "SELECT COUNT(*) as cnt, AVG(latency_ms) as avg_lat, "
-        "AVG(confidence) as avg_conf, SUM(tokens_used) as total_tok "
-        "FROM audit_log"
-    )
-    row = await cursor.fetchone()
-    total = row["cnt"]
-    avg_latency = row["avg_lat"] or 0.0
-    avg_confidence = row["avg_conf"] or 0.0
-    total_tokens = row["total_tok"] or 0
-
-    cursor = await db.execute(
-        "SELECT COUNT(*) as cnt FROM audit_log WHERE date(timestamp) = date('now')"
-    )
-    row = await cursor.fetchone()
-    today = row["cnt"]
-
-    cursor = await db.execute("SELECT guardrails_triggered FROM audit_log")
-    rows = await cursor.fetchall()
-    triggers: dict[str, int] = {}
-    for row in rows:
-        for t in json.loads(row["guardrails_triggered"]):
-            triggers[t] = triggers.get(t, 0) + 1
-
+    """Answered from the rollup tables, so cost does not grow with ``audit_log``."""
+    async with read_connection() as db:
+        cursor = await db.execute(
+            "SELECT TOTAL(queries) as cnt, TOTAL(latency_ms_sum) as lat_sum, "
+            "TOTAL(confidence_sum) as conf_sum, TOTAL(tokens) as total_tok, "
+            "TOTAL(CASE WHEN day = date('now') THEN queries END) as today "
+            "FROM audit_daily"
+        )
+        row = await cursor.fetchone()
+
+        cursor = await db.execute("SELECT guardrail, count FROM audit_guardrail_counts")
+        triggers = {r["guardrail"]: r["count"] for r in await cursor.fetchall()}
+
+    total = int(row["cnt"])
     return {
         "total_queries": total,
-        "avg_latency_ms": round(avg_latency, 2),
-        "avg_confidence": round(avg_confidence, 3),
-        "total_tokens": total_tokens,
+        "avg_latency_ms": round(row["lat_sum"] / total, 2) if total else 0.0,
+        "avg_confidence": round(row["conf_sum"] / total, 3) if total else 0.0,
+        "total_tokens": int(row["total_tok"]),
         "guardrail_triggers": triggers,
-        "queries_today": today,
+        "queries_today": int(row["today"]),
         "top_categories": [],
     }
 
 
 async def get_token_usage_timeseries() -> list[dict]:
-    db = await get_db()
-    cursor = await db.execute(
-        """SELECT date(timestamp) as date,
-                  SUM(tokens_used) as tokens,
-                  COUNT(*) as queries
-           FROM audit_log
-           GROUP BY date(timestamp)
-           ORDER BY date ASC
-           LIMIT 30"""
-    )
-    rows = await cursor.fetchall()
-    return [
-        {"date": row["date"], "tokens": row["tokens"], "queries": row["queries"]}
-        for row in rows
-    ]
+    async with read_connection() as db:
+        cursor = await db.execute(
+            """SELECT day as date, tokens, queries
+               FROM audit_daily
+               ORDER BY day ASC
+               LIMIT 30"""
+        )
+        rows = await cursor.fetchall()
+        return [
+            {"date": row["date"], "tokens": row["tokens"], "queries": row["queries"]}
+            for row in rows
+        ]
 
 
 async def save_document_meta(doc_id: str, filename: str, file_type: str,
-                             chunk_count: int, size_bytes: int):
-    db = await get_db()
-    await db.execute(
-        """INSERT OR REPLACE INTO documents
-           (id, filename, file_type, chunk_count, size_bytes)
-           VALUES (?, ?, ?, ?, ?)""",
-        (doc_id, filename, file_type, chunk_count, size_bytes)
-    )
-    await db.commit()
+                             chunk_count: int, size_bytes: int,
+                             content_hash: str | None = None):
+    await save_document_metas([(doc_id, filename, file_type, chunk_count, size_bytes, content_hash)])
+
+
+async def save_document_metas(rows: list[tuple]):
+    """Bulk upsert of ``(id, filename, file_type, chunk_count, size_bytes, content_hash)`` rows."""
+    async with transaction() as db:
+        await db.executemany(
+            """INSERT OR REPLACE INTO documents
+               (id, filename, file_type, chunk_count, size_bytes, content_hash)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            rows
+        )
+
+
+async def get_document_hashes() -> dict[str, str]:
+    async with read_connection() as db:
+        cursor = await db.execute(
+            "SELECT id, content_hash FROM documents WHERE content_hash IS NOT NULL"
+        )
+        rows = await cursor.fetchall()
+        return {row["id"]: row["content_hash"] for row in rows}
 
 
 async def get_documents() -> list[dict]:
-    db = await get_db()
-    cursor = await db.execute(
-        "SELECT * FROM documents ORDER BY uploaded_at DESC"
-    )
-    rows = await cursor.fetchall()
-    return [dict(row) for row in rows]
+    async with read_connection() as db:
+        cursor = await db.execute(
+            "SELECT * FROM documents ORDER BY uploaded_at DESC"
+        )
+        rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
 
 
 async def delete_document_meta(doc_id: str):
-    db = await get_db()
-    await db.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
-    await db.commit()
+    async with transaction() as db:
+        await db.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+
+async def create_ingest_job(job_id: str, document_id: str, filename: str,
+                            file_type: str, upload_path: str):
+    async with transaction() as db:
+        await db.execute(
+            """INSERT INTO ingest_jobs (id, document_id, filename, file_type, upload_path)
+               VALUES (?, ?, ?, ?, ?)""",
+            (job_id, document_id, filename, file_type, upload_path),
+        )
+
+
+async def claim_ingest_job(owner: str) -> dict | None:
+    """Atomically take the oldest queued job for ``owner`` and mark it running."""
+    async with transaction() as db:
+        # Fetched in one call: the RETURNING statement must be finished
+        # before the commit.
+        rows = await db.execute_fetchall(
+            """UPDATE ingest_jobs
+               SET status = 'running', owner = ?, heartbeat_at = ?,
+                   started_at = COALESCE(started_at, CURRENT_TIMESTAMP)
+               WHERE id = (SELECT id FROM ingest_jobs WHERE status = 'queued'
+                           ORDER BY created_at, id LIMIT 1)
+               RETURNING *""",
+            (owner, time.time()),
+        )
+    return dict(rows[0]) if rows else None
+
+
+async def update_ingest_job(job_id: str, **fields):
+    """Set columns of a job; ``finished=True`` also stamps ``finished_at``."""
+    finished = fields.pop("finished", False)
+    assignments = [f"{column} = ?" for column in fields]
+    if finished:
+        assignments.append("finished_at = CURRENT_TIMESTAMP")
+    async with transaction() as db:
+        await db.execute(
+            f"UPDATE ingest_jobs SET {', '.join(assignments)} WHERE id = ?",
+            (*fields.values(), job_id),
+        )
+
+
+async def heartbeat_ingest_jobs(owner: str, job_ids: list[str]):
+    if not job_ids:
+        return
+    async with transaction() as db:
+        await db.execute(
+            f"UPDATE ingest_jobs SET heartbeat_at = ? "
+            f"WHERE owner = ? AND status = 'running' AND id IN ({','.join('?' * len(job_ids))})",
+            (time.time(), owner, *job_ids),
+        )
+
+
+async def requeue_stale_ingest_jobs(stale_after: float) -> int:
+    """Put back running jobs whose worker stopped sending heartbeats (it crashed)."""
+    async with transaction() as db:
+        cursor = await db.execute(
+            """UPDATE ingest_jobs SET status = 'queued', owner = NULL
+               WHERE status = 'running' AND heartbeat_at < ?""",
+            (time.time() - stale_after,),
+        )
+    return cursor.rowcount
+
+
+async def count_queued_ingest_jobs() -> int:
+    async with read_connection() as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM ingest_jobs WHERE status = 'queued'")
+        return (await cursor.fetchone())[0]
+
+
+async def get_ingest_job(job_id: str) -> dict | None:
+    async with read_connection() as db:
+        cursor = await db.execute("SELECT * FROM ingest_jobs WHERE id = ?", (job_id,))
+        row = await cursor.fetchone()
+        return dict(row) if row else None
 
 
 async def get_guardrail_config() -> dict:
-    db = await get_db()
-    cursor = await db.execute("SELECT key, value FROM guardrail_config")
-    rows = await cursor.fetchall()
-    config = {}
-    for row in rows:
-        try:
-            config[row["key"]] = json.loads(row["value"])
-        except (json.JSONDecodeError, TypeError):
-            config[row["key"]] = row["value"]
-    return config
+    async with read_connection() as db:
+        cursor = await db.execute("SELECT key, value FROM guardrail_config")
+        rows = await cursor.fetchall()
+        config = {}
+        for row in rows:
+            try:
+                config[row["key"]] = json.loads(row["value"])
+            except (json.JSONDecodeError, TypeError):
+                config[row["key"]] = row["value"]
+        return config
 
 
 async def set_guardrail_config(key: str, value):
-    db = await get_db()
-    await db.execute(
-        """INSERT OR REPLACE INTO guardrail_config (key, value, updated_at)
-           VALUES (?, ?, CURRENT_TIMESTAMP)""",
-        (key, json.dumps(value))
-    )
-    await db.commit()
+    async with transaction() as db:
+        await db.execute(
+            """INSERT OR REPLACE INTO guardrail_config (key, value, updated_at)
+               VALUES (?, ?, CURRENT_TIMESTAMP)""",
+            (key, json.dumps(value))
+        )
@@ -0,0 +1,288 @@
+"""Vector store backends.
+
+The app talks to its vector store through the subset of the Chroma
+``Collection`` API it actually uses (``count``/``add``/``upsert``/``delete``/
+``get``/``query``), described by ``VectorCollection``. ``NumpyVectorStore``
+implements that subset in-process: a contiguous float32 matrix of
+L2-normalised rows searched with one matrix-vector product and
+``argpartition``, with ids, documents and metadata held in parallel arrays.
+For corpora of tens of thousands of chunks this is faster than the HTTP hop
+to a Chroma server.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Protocol
+
+import numpy as np
+
+from src.observability.logger import get_logger
+
+log = get_logger(__name__)
+
+_VECTORS_FILE = "vectors.npy"
+_META_FILE = "meta.json"
+
+
+class VectorCollection(Protocol):
+    def count(self) -> int: ...
+    def add(self, ids: list[str], embeddings: list, documents: list[str], metadatas: list[dict]) -> None: ...
+    def upsert(self, ids: list[str], embeddings: list, documents: list[str], metadatas: list[dict]) -> None: ...
+    def delete(self, ids: list[str] | None = None, where: dict | None = None) -> None: ...
+    def get(self, ids: list[str] | None = None, where: dict | None = None,
+            include: list[str] | None = None, limit: int | None = None,
+            offset: int | None = None) -> dict: ...
+    def query(self, query_embeddings: list, n_results: int = 10,
+              include: list[str] | None = None, where: dict | None = None) -> dict: ...
+
+
+def _matches(meta: dict, where: dict | None) -> bool:
+    if not where:
+        return True
+    for key, cond in where.items():
+        if isinstance(cond, dict):
+            if "$in" in cond and meta.get(key) not in cond["$in"]:
+                return False
+            if "$eq" in cond and meta.get(key) != cond["$eq"]:
+                return False
+        elif meta.get(key) != cond:
+            return False
+    return True
+
+
+class NumpyVectorStore:
+    """In-process, cosine-similarity vector store with on-disk snapshots.
+
+    Writers hold a lock; readers (and ``snapshot``) take a view of the arrays
+    under the lock and work outside it. Appends only fill spare capacity past
+    the end of every view; upserts that replace existing ids and deletes build
+    new arrays (copy-on-write), so the rows a reader sees never change under it.
+    """
+
+    def __init__(self, path: str | None = None, mmap: bool = False, metadata: dict | None = None):
+        self.path = Path(path) if path else None
+        # Collection-level metadata, like a Chroma collection's; a loaded
+        # snapshot keeps the metadata it was written with.
+        self.metadata = dict(metadata or {})
+        self._lock = threading.RLock()
+        self._matrix: np.ndarray | None = None
+        self._size = 0
+        self._ids: list[str] = []
+        self._documents: list[str] = []
+        self._metadatas: list[dict] = []
+        self._index: dict[str, int] = {}
+        self.dirty = False
+        self._version = 0  # bumped by every write; a snapshot is current if it saw the latest
+        if self.path and (self.path / _VECTORS_FILE).exists():
+            self._load(mmap)
+
+    # ── Persistence ───────────────────────────────────────────────────
+    def _load(self, mmap: bool):
+        matrix = np.load(self.path / _VECTORS_FILE, mmap_mode="r" if mmap else None)
+        meta = json.loads((self.path / _META_FILE).read_text(encoding="utf-8"))
+        self._matrix = matrix
+        self._size = len(matrix)
+        self._ids = meta["ids"]
+        self._documents = meta["documents"]
+        self._metadatas = meta["metadatas"]
+        self.metadata = meta.get("metadata", self.metadata)
+        self._index = {id_: i for i, id_ in enumerate(self._ids)}
+        log.info("Loaded %d vectors from %s%s", self._size, self.path, " (mmap)" if mmap else "")
+
+    def snapshot(self):
+        """Write the current contents to ``path`` atomically (write to a temp dir, then swap).
+
+        ``dirty`` is cleared only once the new snapshot is in place and no
+        write happened meanwhile, so a failed snapshot is retried.
+        """
+        if self.path is None:
+            return
+        with self._lock:
+            matrix = self._matrix[: self._size] if self._matrix is not None else np.zeros((0, 0), np.float32)
+            meta = {
+                "ids": list(self._ids),
+                "documents": list(self._documents),
+                "metadatas": list(self._metadatas),
+                "metadata": self.metadata,
+            }
+            version = self._version
+
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        np.save(tmp / _VECTORS_FILE, np.ascontiguousarray(matrix))
+        (tmp / _META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+
+        old = self.path.with_name(self.path.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if self.path.exists():
+            os.replace(self.path, old)
+        os.replace(tmp, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+        with self._lock:
+            if self._version == version:
+                self.dirty = False
+        log.info("Snapshot of %d vectors written to %s", len(meta["ids"]), self.path)
+
+    def snapshot_if_dirty(self):
+        if self.dirty:
+            self.snapshot()
+
+    # ── Writes ────────────────────────────────────────────────────────
+    @staticmethod
+    def _normalize(embeddings) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _reserve(self, rows: int, dim: int):
+        if self._matrix is not None and self._matrix.shape[1] != dim:
+            raise ValueError(f"Embedding dimension {dim} does not match store dimension {self._matrix.shape[1]}")
+        capacity = 0 if self._matrix is None else len(self._matrix)
+        writable = self._matrix is not None and self._matrix.flags.writeable
+        if self._size + rows <= capacity and writable:
+            return
+        new_capacity = max(self._size + rows, capacity * 2 if writable else capacity, 1024)
+        grown = np.empty((new_capacity, dim), dtype=np.float32)
+        if self._size:
+            grown[: self._size] = self._matrix[: self._size]
+        self._matrix = grown
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        vectors = self._normalize(embeddings)
+        with self._lock:
+            new_rows = sum(1 for id_ in dict.fromkeys(ids) if id_ not in self._index)
+            before = self._matrix
+            self._reserve(new_rows, vectors.shape[1])
+            if new_rows < len(ids):
+                # Existing rows are replaced: copy first, readers may hold the old arrays.
+                if self._matrix is before:
+                    self._matrix = self._matrix.copy()
+                self._documents = list(self._documents)
+                self._metadatas = list(self._metadatas)
+            for id_, vec, doc, meta in zip(ids, vectors, documents, metadatas):
+                row = self._index.get(id_)
+                if row is None:
+                    row = self._size
+                    self._index[id_] = row
+                    self._ids.append(id_)
+                    self._documents.append(doc)
+                    self._metadatas.append(meta)
+                    self._size += 1
+                else:
+                    self._documents[row] = doc
+                    self._metadatas[row] = meta
+                self._matrix[row] = vec
+            self.dirty = True
+            self._version += 1
+
+    add = upsert
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            drop = set(ids or ())
+            keep = [
+                i for i in range(self._size)
+                if self._ids[i] not in drop and not (where and _matches(self._metadatas[i], where))
+            ]
+            if len(keep) == self._size:
+                return
+            rows = np.asarray(keep, dtype=np.intp)
+            matrix = np.empty((max(len(keep), 1024), self._matrix.shape[1]), dtype=np.float32)
+            matrix[: len(keep)] = self._matrix[rows]
+            self._matrix = matrix
+            self._ids = [self._ids[i] for i in keep]
+            self._documents = [self._documents[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._index = {id_: i for i, id_ in enumerate(self._ids)}
+            self._size = len(keep)
+            self.dirty = True
+            self._version += 1
+
+    # ── Reads ─────────────────────────────────────────────────────────
+    def count(self) -> int:
+        return self._size
+
+    def _view(self):
+        with self._lock:
+            size = self._size
+            matrix = self._matrix[:size] if self._matrix is not None else None
+            return matrix, size, self._ids, self._documents, self._metadatas
+
+    def get(self, ids=None, where=None, include=None, limit=None, offset=None) -> dict:
+        _, size, all_ids, documents, metadatas = self._view()
+        wanted = set(ids) if ids is not None else None
+        rows = [
+            i for i in range(size)
+            if (wanted is None or all_ids[i] in wanted) and _matches(metadatas[i], where)
+        ]
+        rows = rows[offset or 0:]
+        if limit is not None:
+            rows = rows[:limit]
+        return {
+            "ids": [all_ids[i] for i in rows],
+            "documents": [documents[i] for i in rows],
+            "metadatas": [metadatas[i] for i in rows],
+        }
+
+    def query(self, query_embeddings, n_results=10, include=None, where=None) -> dict:
+        matrix, size, all_ids, documents, metadatas = self._view()
+        empty = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        if not size:
+            return empty
+
+        query = self._normalize([query_embeddings[0]])[0]
+        scores = matrix @ query
+
+        if where:
+            mask = np.fromiter((_matches(metadatas[i], where) for i in range(size)), dtype=bool, count=size)
+            scores = np.where(mask, scores, -np.inf)
+
+        k = min(n_results, size)
+        top = np.argpartition(-scores, k - 1)[:k] if k < size else np.arange(size)
+        top = top[np.argsort(-scores[top])]
+        top = top[np.isfinite(scores[top])]
+
+        return {
+            "ids": [[all_ids[i] for i in top]],
+            "documents": [[documents[i] for i in top]],
+            "metadatas": [[metadatas[i] for i in top]],
+            "distances": [[float(1.0 - scores[i]) for i in top]],
+        }
+
+
+class AsyncVectorStore:
+    """Async facade over an in-process store; searches run in a worker thread
+    (NumPy releases the GIL during the matrix product)."""
+
+    def __init__(self, store: NumpyVectorStore):
+        self._store = store
+
+    async def count(self) -> int:
+        return self._store.count()
+
+    async def add(self, **kwargs):
+        await asyncio.to_thread(self._store.add, **kwargs)
+
+    async def upsert(self, **kwargs):
+        await asyncio.to_thread(self._store.upsert, **kwargs)
+
+    async def delete(self, **kwargs):
+        await asyncio.to_thread(self._store.delete, **kwargs)
+
+    async def get(self, **kwargs) -> dict:
+        return await asyncio.to_thread(self._store.get, **kwargs)
+
+    async def query(self, **kwargs) -> dict:
+        return await asyncio.to_thread(self._store.query, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._store, name)
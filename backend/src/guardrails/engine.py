@@ -0,0 +1,243 @@
+r"""Compiled guardrail scanner.
+
+Each rule's pattern is analysed once for literal text every match must
+contain (``previous`` in ``ignore\s+(all\s+)?previous...``, ``@`` for an
+email, any of ``hack``/``exploit``/... for a leading alternation); with many
+rules the literals are indexed by their first three characters. Scanning a message lower-cases it once, looks up
+each of its character trigrams in that index, confirms the few literals
+found with a substring test, and runs the full regex only for those rules
+(plus rules with no usable literal, like the PII patterns). The cost of a
+clean message therefore grows with its length, not with the number of
+keyword rules.
+
+``re.IGNORECASE`` equates more characters than ``str.lower`` does (``ı``
+and ``İ`` match ``i``, ``ſ`` matches ``s``, the Kelvin sign matches ``k``).
+Case-insensitive rules therefore only get a prefilter for ASCII literals,
+and all of them run on a message that is not pure ASCII. A combined named-group
+alternation was measured to be slower than separate scans with Python's
+``re`` (it loses each pattern's literal-prefix search), see
+``benchmarks/guardrails.py``.
+
+Rules can be added or removed at runtime; compiled scanners are rebuilt
+lazily and swapped in whole, so concurrent scans never see a half-built one.
+"""
+from __future__ import annotations
+
+import json
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.config import get_settings
+
+try:
+    import re._constants as sre_constants
+    import re._parser as sre_parse
+except ImportError:  # private modules moved: every rule is scanned without a prefilter
+    sre_constants = sre_parse = None
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str  # reported in guardrails_triggered, e.g. "pii_email"
+    category: str  # "pii", "injection", "content_filter" (toggled by settings), or custom
+    pattern: str  # must not use numbered backreferences
+    action: str = "flag"  # "flag" or "block"
+    ignore_case: bool = False
+
+    def compile(self) -> re.Pattern:
+        return re.compile(self.pattern, re.IGNORECASE if self.ignore_case else 0)
+
+
+DEFAULT_RULES = [
+    Rule("pii_email", "pii", r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+"),
+    Rule("pii_phone", "pii", r"\b\d{3}[-.]?\d{3}[-.]?\d{4}\b"),
+    Rule("pii_ssn", "pii", r"\b\d{3}-\d{2}-\d{4}\b"),
+    Rule("pii_credit_card", "pii", r"\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b"),
+    Rule("prompt_injection", "injection", r"ignore\s+(all\s+)?previous\s+instructions", "block", True),
+    Rule("prompt_injection", "injection", r"you\s+are\s+now\s+(a|an)\s+", "block", True),
+    Rule("prompt_injection", "injection", r"system\s*:\s*", "block", True),
+    Rule("prompt_injection", "injection", r"<\s*/?\s*system\s*>", "block", True),
+    Rule("prompt_injection", "injection", r"forget\s+(everything|all|your)", "block", True),
+    Rule("prompt_injection", "injection", r"new\s+instructions?\s*:", "block", True),
+    Rule("blocked_content", "content_filter",
+         r"\b(hack|exploit|bypass|crack)\s+(the\s+)?(system|security|auth)", "block", True),
+]
+
+
+_GRAM = 3
+_INDEX_MIN_RULES = 64  # below this, testing each literal directly is cheaper than indexing
+
+
+def _anchors(pattern: str, flags: int) -> tuple[list[str] | None, bool]:
+    """Literals one of which must appear in every match of ``pattern``.
+
+    Uses the longest run of literal characters in the top-level sequence,
+    or a leading alternation of literals (``(hack|exploit|...)``) when that
+    is longer. Returns ``(anchors, ignore_case)``; ``anchors`` is ``None``
+    when nothing is required, and always when ``re``'s private parser is
+    unavailable or not shaped as expected.
+    """
+    if sre_parse is None:
+        return None, False
+    try:
+        return _parse_anchors(pattern, flags)
+    except Exception:
+        return None, False
+
+
+def _parse_anchors(pattern: str, flags: int) -> tuple[list[str] | None, bool]:
+    parsed = sre_parse.parse(pattern, flags)
+    ignore_case = bool(parsed.state.flags & re.IGNORECASE)
+
+    best, run = "", []
+    alternatives, alternatives_ignore_case = None, ignore_case
+    for n, (op, av) in enumerate(parsed):
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+        if len(run) > len(best):
+            best = "".join(run)
+        run = []
+        if op is sre_constants.SUBPATTERN and alternatives is None:
+            body = list(av[3])
+            if len(body) == 1 and body[0][0] is sre_constants.BRANCH:
+                alts = []
+                for branch in body[0][1][1]:
+                    lit = ""
+                    for bop, bav in branch:
+                        if bop is not sre_constants.LITERAL:
+                            break
+                        lit += chr(bav)
+                    alts.append(lit)
+                if all(alts):
+                    alternatives = alts
+                    # A scoped flag, (?i:hack|crack), applies to the group only.
+                    alternatives_ignore_case = ignore_case or bool(av[1] & re.IGNORECASE)
+    if len(run) > len(best):
+        best = "".join(run)
+
+    anchors = [best] if best else None
+    if alternatives and min(map(len, alternatives)) > len(best):
+        anchors, ignore_case = alternatives, alternatives_ignore_case
+    if anchors and ignore_case:
+        if not all(a.isascii() for a in anchors):
+            return None, False  # e.g. "ſ", which also matches "s"
+        anchors = [a.lower() for a in anchors]
+    return anchors, ignore_case
+
+
+class _Scanner:
+    def __init__(self, rules: list[Rule]):
+        self.rules = rules
+        self.patterns = [rule.compile() for rule in rules]
+        self.unanchored: list[int] = []
+        self.folded: list[int] = []  # anchored rules matched case-insensitively
+        # Rules whose literals are tested directly: (anchors, ignore_case, rule index)
+        self.direct: list[tuple[list[str], bool, int]] = []
+        # Lower-cased first ``_GRAM`` characters of a literal -> (literal, ignore_case, rule index)
+        self.by_prefix: dict[str, list[tuple[str, bool, int]]] = {}
+
+        anchored = []
+        for i, (rule, pattern) in enumerate(zip(rules, self.patterns)):
+            anchors, ignore_case = _anchors(rule.pattern, pattern.flags)
+            if anchors is None:
+                self.unanchored.append(i)
+            else:
+                anchored.append((anchors, ignore_case, i))
+                if ignore_case:
+                    self.folded.append(i)
+        index = len(anchored) >= _INDEX_MIN_RULES
+        for anchors, ignore_case, i in anchored:
+            if index and min(map(len, anchors)) >= _GRAM:
+                for anchor in anchors:
+                    self.by_prefix.setdefault(anchor[:_GRAM].lower(), []).append((anchor, ignore_case, i))
+            else:
+                self.direct.append((anchors, ignore_case, i))
+
+    def scan(self, text: str) -> list[Rule]:
+        lowered = text.lower()
+        candidates = set(self.unanchored)
+        if not text.isascii():
+            candidates.update(self.folded)
+        for anchors, ignore_case, i in self.direct:
+            haystack = lowered if ignore_case else text
+            if any(a in haystack for a in anchors):
+                candidates.add(i)
+        if self.by_prefix:
+            grams = {lowered[i : i + _GRAM] for i in range(len(lowered) - _GRAM + 1)}
+            for gram in grams & self.by_prefix.keys():
+                for anchor, ignore_case, i in self.by_prefix[gram]:
+                    if i not in candidates and anchor in (lowered if ignore_case else text):
+                        candidates.add(i)
+
+        seen: set[str] = set()
+        hits = []
+        for i in sorted(candidates):
+            rule = self.rules[i]
+            if rule.name not in seen and self.patterns[i].search(text):
+                seen.add(rule.name)
+                hits.append(rule)
+        return hits
+
+
+class GuardrailEngine:
+    def __init__(self, rules: list[Rule] | None = None):
+        self._rules: list[Rule] = list(DEFAULT_RULES if rules is None else rules)
+        self._scanners: dict[frozenset[str], _Scanner] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def rules(self) -> list[Rule]:
+        return list(self._rules)
+
+    def add_rules(self, rules: list[Rule]):
+        """Validate and add rules; raises ``re.error`` on a bad pattern."""
+        for rule in rules:
+            rule.compile()
+        with self._lock:
+            self._rules = self._rules + list(rules)
+            self._scanners = {}
+
+    def remove_rules(self, name: str) -> int:
+        with self._lock:
+            kept = [r for r in self._rules if r.name != name]
+            removed = len(self._rules) - len(kept)
+            self._rules = kept
+            self._scanners = {}
+        return removed
+
+    def _scanner(self, disabled: frozenset[str]) -> _Scanner:
+        scanners = self._scanners
+        scanner = scanners.get(disabled)
+        if scanner is None:
+            scanner = _Scanner([r for r in self._rules if r.category not in disabled])
+            scanners[disabled] = scanner
+        return scanner
+
+    def scan(self, text: str, disabled: frozenset[str] = frozenset()) -> list[Rule]:
+        """Rules matching ``text``, one per distinct name, in rule order.
+
+        Rules whose category is in ``disabled`` are skipped (and not compiled
+        into the scanner).
+        """
+        return self._scanner(disabled).scan(text)
+
+
+def rules_from_json(data: str | bytes) -> list[Rule]:
+    """Parse ``[{"name", "category", "pattern", "action"?, "ignore_case"?}, ...]``."""
+    return [Rule(**item) for item in json.loads(data)]
+
+
+_engine: GuardrailEngine | None = None
+
+
+def get_guardrail_engine() -> GuardrailEngine:
+    global _engine
+    if _engine is None:
+        _engine = GuardrailEngine()
+        path = get_settings().guardrails_rules_path
+        if path:
+            _engine.add_rules(rules_from_json(Path(path).read_text(encoding="utf-8")))
+    return _engine
@@ -1,112 +1,109 @@
-import re
 import json
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.config import get_settings
+from src.guardrails.engine import get_guardrail_engine
 from src.observability.logger import get_logger
 from src.observability.metrics import GUARDRAIL_CHECKS, GUARDRAIL_BLOCKS, GUARDRAIL_FLAGS
+from src.observability.spans import span
 
 log = get_logger(__name__)
 
-PII_PATTERNS = {
-    "email": re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+"),
-    "phone": re.compile(r"\b\d{3}[-.]?\d{3}[-.]?\d{4}\b"),
-    "ssn": re.compile(r"\b\d{3}-\d{2}-\d{4}\b"),
-    "credit_card": re.compile(r"\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b"),
+BLOCK_MESSAGES = {
+    "prompt_injection": "Request blocked by guardrails: potential prompt injection detected.",
+    "blocked_content": "Request blocked by guardrails: inappropriate content detected.",
+}
+
+# Settings toggles for the built-in rule categories; custom categories are always on.
+_CATEGORY_TOGGLES = {
+    "pii": "guardrails_pii_enabled",
+    "injection": "guardrails_injection_enabled",
+    "content_filter": "guardrails_content_filter_enabled",
 }
 
-INJECTION_PATTERNS = [
-    re.compile(r"ignore\s+(all\s+)?previous\s+instructions", re.IGNORECASE),
-    re.compile(r"you\s+are\s+now\s+(a|an)\s+", re.IGNORECASE),
-    re.compile(r"system\s*:\s*", re.IGNORECASE),
-    re.compile(r"<\s*/?\s*system\s*>", re.IGNORECASE),
-    re.compile(r"forget\s+(everything|all|your)", re.IGNORECASE),
-    re.compile(r"new\s+instructions?\s*:", re.IGNORECASE),
-]
-
-BLOCKED_CONTENT = [
-    re.compile(r"\b(hack|exploit|bypass|crack)\s+(the\s+)?(system|security|auth)", re.IGNORECASE),
-]
-
-
-def detect_pii(text: str) -> list[str]:
-    found = []
-    for name, pattern in PII_PATTERNS.items():
-        if pattern.search(text):
-            found.append(f"pii_{name}")
-    return found
-
-
-def detect_injection(text: str) -> list[str]:
-    found = []
-    for pattern in INJECTION_PATTERNS:
-        if pattern.search(text):
-            found.append("prompt_injection")
-            break
-    return found
 
+def _disabled_categories(settings) -> frozenset[str]:
+    return frozenset(c for c, flag in _CATEGORY_TOGGLES.items() if not getattr(settings, flag))
 
-def detect_blocked_content(text: str) -> list[str]:
-    found = []
-    for pattern in BLOCKED_CONTENT:
-        if pattern.search(text):
-            found.append("blocked_content")
+
+async def _read_body(receive: Receive) -> tuple[bytes, list[Message]]:
+    chunks, messages = [], []
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
             break
-    return found
+    return b"".join(chunks), messages
 
 
-class GuardrailsMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next) -> Response:
-        settings = get_settings()
+class GuardrailsMiddleware:
+    """Scans chat messages before they reach the endpoint (pure ASGI).
 
-        if request.method == "POST" and "/chat" in request.url.path:
+    The body is read and JSON-decoded once. The decoded payload and the
+    triggered guardrails are left in the request state (``chat_payload``,
+    ``guardrails_triggered``) for the endpoint, and the original body is
+    replayed to the app for anything that still reads it.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        state["guardrails_triggered"] = []
+        if scope["method"] != "POST" or "/chat" not in scope["path"]:
+            await self.app(scope, receive, send)
+            return
+
+        settings = get_settings()
+        body, buffered = await _read_body(receive)
+        with span("guardrails"):
             try:
-                body = await request.body()
                 data = json.loads(body) if body else {}
-                message = data.get("message", "")
             except (json.JSONDecodeError, UnicodeDecodeError):
+                data = None
+            message = data.get("message", "") if isinstance(data, dict) else ""
+            if not isinstance(message, str):
                 message = ""
-
-            triggered = []
-
-            if settings.guardrails_pii_enabled:
-                GUARDRAIL_CHECKS.labels(type="pii").inc()
-                pii_hits = detect_pii(message)
-                triggered.extend(pii_hits)
-                for hit in pii_hits:
-                    GUARDRAIL_FLAGS.labels(type=hit).inc()
-
-            if settings.guardrails_injection_enabled:
-                GUARDRAIL_CHECKS.labels(type="injection").inc()
-                injection_hits = detect_injection(message)
-                triggered.extend(injection_hits)
-
-            if settings.guardrails_content_filter_enabled:
-                GUARDRAIL_CHECKS.labels(type="content_filter").inc()
-                content_hits = detect_blocked_content(message)
-                triggered.extend(content_hits)
-
-            if "prompt_injection" in triggered:
-                GUARDRAIL_BLOCKS.labels(type="prompt_injection").inc()
-                log.warning("Blocked prompt injection attempt: %s", request.client.host)
-                return JSONResponse(
-                    status_code=400,
-                    content={"detail": "Request blocked by guardrails: potential prompt injection detected."},
-                )
-
-            if "blocked_content" in triggered:
-                GUARDRAIL_BLOCKS.labels(type="blocked_content").inc()
-                log.warning("Blocked harmful content: %s", request.client.host)
-                return JSONResponse(
-                    status_code=400,
-                    content={"detail": "Request blocked by guardrails: inappropriate content detected."},
-                )
-
-            request.state.guardrails_triggered = triggered
-        else:
-            request.state.guardrails_triggered = []
-
-        return await call_next(request)
+            state["chat_payload"] = data
+
+            disabled = _disabled_categories(settings)
+            for category in _CATEGORY_TOGGLES:
+                if category not in disabled:
+                    GUARDRAIL_CHECKS.labels(type=category).inc()
+
+            hits = get_guardrail_engine().scan(message, disabled)
+        for rule in hits:
+            if rule.action != "block":
+                GUARDRAIL_FLAGS.labels(type=rule.name).inc()
+
+        blocking = [rule for rule in hits if rule.action == "block"]
+        if blocking:
+            name = blocking[0].name
+            GUARDRAIL_BLOCKS.labels(type=name).inc()
+            client = scope.get("client")
+            log.warning("Blocked request (%s): %s", name, client[0] if client else "unknown")
+            response = JSONResponse(
+                status_code=400,
+                content={"detail": BLOCK_MESSAGES.get(name, f"Request blocked by guardrails: {name}.")},
+            )
+            await response(scope, receive, send)
+            return
+
+        state["guardrails_triggered"] = [rule.name for rule in hits]
+
+        async def replay() -> Message:
+            if buffered:
+                return buffered.pop(0)
+            return await receive()
+
+        await self.app(scope, replay, send)
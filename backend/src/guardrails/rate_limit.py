@@ -0,0 +1,195 @@
+"""Per-client rate limiting for the chat and ingestion endpoints.
+
+Each budget allows ``rpm`` requests per ``rate_limit_window`` seconds per
+client, with bursts up to the whole budget. It is a token bucket kept as a
+single number per key (GCRA): the "theoretical arrival time" ``tat``, which
+advances by ``window / rpm`` per admitted request. A request is admitted
+while ``tat - now`` stays within the burst allowance, so a check is one
+read and one write.
+
+Two backends:
+
+- ``memory``: a dict in this process. With N uvicorn workers each worker
+  enforces the budget separately.
+- ``sqlite``: one row per key in a small SQLite file that all workers on
+  the host share; the check-and-update is a single atomic ``UPSERT``.
+
+Clients are keyed by ``request.client.host``. Behind a reverse proxy that is
+the proxy's address unless uvicorn resolves the real client from
+``X-Forwarded-For``, which it only does for ``forwarded_allow_ips`` (see
+``src/serve.py``).
+"""
+from __future__ import annotations
+
+import math
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import HTTPException, Request
+
+from src.config import get_settings
+from src.observability.logger import get_logger
+from src.observability.metrics import RATE_LIMIT_REJECTIONS
+
+log = get_logger(__name__)
+
+# Keys whose bucket has refilled are dropped every this many checks.
+_PRUNE_EVERY = 1000
+
+
+@dataclass(frozen=True)
+class Budget:
+    name: str  # "chat" or "ingest"; part of the key and the metric label
+    rpm: int  # requests per window
+    window: float  # seconds; rpm and window are positive (checked by Settings)
+
+    @property
+    def interval(self) -> float:
+        return self.window / self.rpm
+
+    @property
+    def burst(self) -> float:
+        # How far ``tat`` may run ahead of now: the full budget minus the
+        # request being admitted.
+        return self.window - self.interval
+
+
+class MemoryRateLimiter:
+    def __init__(self):
+        self._tat: dict[str, float] = {}
+        self._checks = 0
+
+    def acquire(self, key: str, budget: Budget) -> float:
+        """Admit a request: 0.0 if allowed, else seconds until it would be."""
+        now = time.monotonic()
+        self._checks += 1
+        if self._checks % _PRUNE_EVERY == 0:
+            self._tat = {k: t for k, t in self._tat.items() if t > now}
+
+        tat = max(self._tat.get(key, now), now)
+        if tat - now > budget.burst:
+            return tat - now - budget.burst
+        self._tat[key] = tat + budget.interval
+        return 0.0
+
+    def close(self):
+        self._tat.clear()
+
+
+class SQLiteRateLimiter:
+    """Shares budgets between processes through a SQLite file.
+
+    Runs on the event loop: the statement touches one row of a tiny table in
+    WAL mode without fsync, so it costs tens of microseconds. If the file
+    stays locked past ``busy_timeout`` the request is let through rather
+    than failed.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 100):
+        db_path = Path(path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(db_path), timeout=busy_timeout_ms / 1000, isolation_level=None, check_same_thread=False,
+        )
+        self._lock = threading.Lock()
+        self._checks = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=OFF")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    tat REAL NOT NULL,
+                    allowed INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+
+    def acquire(self, key: str, budget: Budget) -> float:
+        now = time.time()
+        params = {"key": key, "now": now, "interval": budget.interval, "burst": budget.burst}
+        try:
+            with self._lock:
+                self._checks += 1
+                if self._checks % _PRUNE_EVERY == 0:
+                    self._conn.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,))
+                # SET expressions all see the row as it was, so ``allowed``
+                # and the new ``tat`` are decided from the same old value.
+                tat, allowed = self._conn.execute(
+                    """INSERT INTO rate_limits (key, tat, allowed)
+                       VALUES (:key, :now + :interval, 1)
+                       ON CONFLICT(key) DO UPDATE SET
+                           allowed = max(tat, :now) - :now <= :burst,
+                           tat = CASE WHEN max(tat, :now) - :now <= :burst
+                                      THEN max(tat, :now) + :interval ELSE tat END
+                       RETURNING tat, allowed""",
+                    params,
+                ).fetchone()
+        except sqlite3.OperationalError as e:
+            log.warning("Rate limit check skipped: %s", e)
+            return 0.0
+        if allowed:
+            return 0.0
+        return tat - now - budget.burst
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_limiter: MemoryRateLimiter | SQLiteRateLimiter | None = None
+
+
+def get_rate_limiter() -> MemoryRateLimiter | SQLiteRateLimiter:
+    global _limiter
+    if _limiter is None:
+        settings = get_settings()
+        if settings.rate_limit_backend == "sqlite":
+            _limiter = SQLiteRateLimiter(settings.rate_limit_sqlite_path)
+        else:
+            _limiter = MemoryRateLimiter()
+    return _limiter
+
+
+def close_rate_limiter():
+    global _limiter
+    if _limiter:
+        _limiter.close()
+        _limiter = None
+
+
+def _client_key(request: Request, by_session: bool) -> str:
+    if by_session:
+        payload = request.scope.get("state", {}).get("chat_payload")
+        session_id = payload.get("session_id") if isinstance(payload, dict) else None
+        if isinstance(session_id, str) and session_id:
+            return f"session:{session_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def _enforce(request: Request, budget: Budget, by_session: bool = False):
+    retry_after = get_rate_limiter().acquire(f"{budget.name}:{_client_key(request, by_session)}", budget)
+    if retry_after > 0:
+        RATE_LIMIT_REJECTIONS.labels(budget=budget.name).inc()
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded for {budget.name} requests.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+async def limit_chat(request: Request):
+    """Dependency for the chat endpoints (``rate_limit_rpm``)."""
+    settings = get_settings()
+    if settings.rate_limit_enabled:
+        budget = Budget("chat", settings.rate_limit_rpm, settings.rate_limit_window)
+        _enforce(request, budget, by_session=settings.rate_limit_key == "session")
+
+
+async def limit_ingest(request: Request):
+    """Dependency for document ingestion (``rate_limit_ingest_rpm``), always per IP."""
+    settings = get_settings()
+    if settings.rate_limit_enabled:
+        _enforce(request, Budget("ingest", settings.rate_limit_ingest_rpm, settings.rate_limit_window))
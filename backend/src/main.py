@@ -1,3 +1,5 @@
+import asyncio
+import contextlib
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -5,11 +7,16 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from src.config import get_settings
 from src.db.sqlite import init_db, close_db
-from src.db.chroma import get_chroma_client
+from src.db.chroma import get_chroma_client, collection_manager
+from src.db.embedding_cache import close_embedding_cache
+from src.rag.jobs import get_ingest_job_runner, close_ingest_job_runner
+from src.rag.lexical import lexical_enabled, rebuild_lexical_index
 from src.api import chat, documents, admin, analytics, health
 from src.guardrails.middleware import GuardrailsMiddleware
+from src.guardrails.rate_limit import close_rate_limiter
 from src.observability.logger import setup_logging
 from src.observability.tracer import TracingMiddleware
+from src.observability.spans import close_exporter
 from src.observability.metrics import metrics_endpoint
 
 
@@ -17,9 +24,24 @@ from src.observability.metrics import metrics_endpoint
 async def lifespan(app: FastAPI):
     setup_logging()
     await init_db()
-    get_chroma_client()
+    if settings.vector_backend == "chroma":
+        get_chroma_client()
+    if lexical_enabled():
+        await rebuild_lexical_index()
+    refresher = asyncio.create_task(
+        collection_manager.run_refresher(settings.chroma_count_refresh_interval)
+    )
+    get_ingest_job_runner().start()
     yield
+    await close_ingest_job_runner()
+    refresher.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await refresher
+    collection_manager.snapshot()
     await close_db()
+    close_embedding_cache()
+    close_rate_limiter()
+    close_exporter()
 
 
 settings = get_settings()
@@ -36,10 +58,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Request-ID", "X-Latency-Ms"],
+    expose_headers=["X-Request-ID", "X-Latency-Ms", "Server-Timing"],
 )
-app.add_middleware(TracingMiddleware)
+# Added last so it wraps the guardrails scan (and times blocked requests too).
 app.add_middleware(GuardrailsMiddleware)
+app.add_middleware(TracingMiddleware)
 
 app.add_route("/metrics", metrics_endpoint, methods=["GET"])
 
@@ -12,6 +12,7 @@ class AuditEntry(BaseModel):
     sources: list[str]
     guardrails_triggered: list[str]
     confidence: float
+    stages: dict[str, float] = {}  # milliseconds per pipeline stage, when the request was traced
     timestamp: datetime
 
 
@@ -20,6 +21,7 @@ class AuditLog(BaseModel):
     total: int
     page: int
     page_size: int
+    next_cursor: str | None = None
 
 
 class AnalyticsSummary(BaseModel):
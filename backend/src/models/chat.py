@@ -21,6 +21,7 @@ class ChatResponse(BaseModel):
     tokens_used: int = 0
     latency_ms: float = 0.0
     guardrails_triggered: list[str] = []
+    cached: bool = False
 
 
 class ConversationMessage(BaseModel):
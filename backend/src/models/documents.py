@@ -23,7 +23,21 @@ class IngestResult(BaseModel):
     status: str = "success"
 
 
+class IngestJob(BaseModel):
+    id: str
+    document_id: str
+    filename: str
+    status: str  # queued, running, done, failed
+    chunks_done: int = 0
+    chunks_total: int | None = None
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
 class IngestSampleResult(BaseModel):
     documents_ingested: int
     total_chunks: int
+    documents_skipped: int = 0
     details: list[IngestResult]
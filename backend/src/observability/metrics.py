@@ -1,13 +1,25 @@
-from prometheus_client import (
+import glob
+import os
+
+from src.config import get_settings
+
+# Multiprocess mode is chosen when prometheus_client is first imported, so a
+# directory configured only in .env has to reach the environment before that.
+if get_settings().prometheus_multiproc_dir:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", get_settings().prometheus_multiproc_dir)
+
+from prometheus_client import (  # noqa: E402
+    CollectorRegistry,
     Counter,
     Histogram,
     Gauge,
     Info,
     generate_latest,
+    multiprocess,
     CONTENT_TYPE_LATEST,
 )
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import Response  # noqa: E402
 
 # ── App Info ──────────────────────────────────────────────────────────
 APP_INFO = Info("helpdesk", "NLQ Helpdesk application metadata")
@@ -39,22 +51,52 @@ LLM_REQUESTS = Counter(
     ["model", "status"],
 )
 
+SEMANTIC_CACHE_REQUESTS = Counter(
+    "helpdesk_semantic_cache_requests_total",
+    "Semantic answer cache lookups",
+    ["result"],
+)
+
 LLM_TOKENS_PROMPT = Counter(
     "helpdesk_llm_tokens_prompt_total",
     "Total prompt (input) tokens consumed",
 )
 
+LLM_TOKENS_PROMPT_SAVED = Counter(
+    "helpdesk_llm_tokens_prompt_saved_total",
+    "Estimated prompt tokens kept out of the context (merged overlaps, duplicates, token budget)",
+)
+
 LLM_TOKENS_COMPLETION = Counter(
     "helpdesk_llm_tokens_completion_total",
     "Total completion (output) tokens consumed",
 )
 
+# Requests that joined an identical in-flight chat (src/rag/singleflight.py);
+# stage is "generate" (retrieval + answer shared) or "retrieve" (streaming).
+CHAT_COALESCED = Counter(
+    "helpdesk_chat_coalesced_total",
+    "Chat requests served by an identical in-flight request instead of their own",
+    ["stage"],
+)
+
+LLM_TOKENS_COALESCED = Counter(
+    "helpdesk_llm_tokens_coalesced_total",
+    "LLM tokens coalesced chat requests would otherwise have spent",
+)
+
 LLM_LATENCY = Histogram(
     "helpdesk_llm_latency_seconds",
     "LLM generation latency (seconds)",
     buckets=[0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0],
 )
 
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "helpdesk_llm_time_to_first_token_seconds",
+    "Time from chat request start to the first streamed token (seconds)",
+    buckets=[0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0],
+)
+
 RAG_RETRIEVAL_LATENCY = Histogram(
     "helpdesk_rag_retrieval_latency_seconds",
     "RAG vector retrieval latency (seconds)",
@@ -73,6 +115,12 @@ RAG_CHUNKS_RETRIEVED = Histogram(
     buckets=[0, 1, 2, 3, 4, 5, 7, 10],
 )
 
+LEXICAL_FAST_PATH = Counter(
+    "helpdesk_lexical_fast_path_total",
+    "Lexical-first retrievals: decisive (embedding skipped) or fallback to hybrid",
+    ["result"],
+)
+
 RESPONSE_CONFIDENCE = Histogram(
     "helpdesk_response_confidence",
     "Response confidence score distribution",
@@ -92,6 +140,25 @@ EMBEDDING_REQUESTS = Counter(
     ["status"],
 )
 
+EMBEDDING_BATCH_SIZE = Histogram(
+    "helpdesk_embedding_batch_size",
+    "Query embeddings sent per micro-batched embed request",
+    buckets=[1, 2, 4, 8, 16, 32, 64, 100],
+)
+
+EMBEDDING_QUEUE_WAIT = Histogram(
+    "helpdesk_embedding_queue_wait_seconds",
+    "Time a query embedding waited in the micro-batcher before dispatch",
+    buckets=[0.001, 0.0025, 0.005, 0.0075, 0.01, 0.025, 0.05, 0.1],
+)
+
+# Hit ratio: rate(result="hit") / rate(all results)
+EMBEDDING_CACHE_LOOKUPS = Counter(
+    "helpdesk_embedding_cache_lookups_total",
+    "Texts looked up in the persistent embedding cache",
+    ["result"],
+)
+
 # ── Guardrail Metrics ─────────────────────────────────────────────────
 GUARDRAIL_CHECKS = Counter(
     "helpdesk_guardrail_checks_total",
@@ -111,12 +178,23 @@ GUARDRAIL_FLAGS = Counter(
     ["type"],
 )
 
+RATE_LIMIT_REJECTIONS = Counter(
+    "helpdesk_rate_limit_rejections_total",
+    "Requests rejected with 429 by the per-client rate limiter",
+    ["budget"],
+)
+
 # ── Document / Ingestion Metrics ──────────────────────────────────────
 DOCUMENTS_INGESTED = Counter(
     "helpdesk_documents_ingested_total",
     "Total documents ingested",
 )
 
+DOCUMENTS_SKIPPED = Counter(
+    "helpdesk_documents_skipped_total",
+    "Documents skipped during bulk ingestion because their content is already indexed",
+)
+
 CHUNKS_CREATED = Counter(
     "helpdesk_chunks_created_total",
     "Total chunks created from documents",
@@ -128,10 +206,38 @@ INGESTION_LATENCY = Histogram(
     buckets=[0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0],
 )
 
+# Every worker reads the same SQLite count, so take the max rather than the sum.
+INGEST_JOB_QUEUE_DEPTH = Gauge(
+    "helpdesk_ingest_job_queue_depth",
+    "Ingestion jobs waiting for a worker",
+    multiprocess_mode="livemax",
+)
+
+INGEST_JOB_DURATION = Histogram(
+    "helpdesk_ingest_job_duration_seconds",
+    "Time from a worker starting an ingestion job to its completion (seconds)",
+    ["status"],
+    buckets=[1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0],
+)
+
+# ── SQLite Write-Behind Metrics ───────────────────────────────────────
+SQLITE_WRITE_QUEUE_DEPTH = Gauge(
+    "helpdesk_sqlite_write_queue_depth",
+    "Records waiting in the SQLite write-behind queue",
+    multiprocess_mode="livesum",
+)
+
+SQLITE_FLUSH_LATENCY = Histogram(
+    "helpdesk_sqlite_flush_latency_seconds",
+    "Time to write and commit one write-behind batch (seconds)",
+    buckets=[0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0],
+)
+
 # ── Session Metrics ───────────────────────────────────────────────────
 ACTIVE_SESSIONS = Gauge(
     "helpdesk_active_sessions",
     "Currently active chat sessions",
+    multiprocess_mode="livesum",
 )
 
 CONVERSATIONS_TOTAL = Counter(
@@ -139,10 +245,63 @@ CONVERSATIONS_TOTAL = Counter(
     "Total conversations started",
 )
 
+# Hit ratio: rate(result="hit") / rate(all results)
+HISTORY_CACHE_LOOKUPS = Counter(
+    "helpdesk_history_cache_lookups_total",
+    "Conversation history window lookups in the session cache",
+    ["result"],
+)
+
+HISTORY_FETCH_LATENCY = Histogram(
+    "helpdesk_history_fetch_latency_seconds",
+    "Time to load a session's recent history window from SQLite (seconds)",
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1],
+)
+
 
 # ── Prometheus /metrics endpoint ──────────────────────────────────────
+# With several workers (PROMETHEUS_MULTIPROC_DIR set, see src/serve.py) every
+# worker writes its samples to files in that directory and a scrape of any
+# worker reads all of them: counters and histograms are summed over every
+# worker that has run, the gauges above over live workers only.
+
+
+def multiprocess_dir() -> str | None:
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def cleanup_dead_workers(path: str):
+    """Drop live-gauge files of workers that have exited (counters are kept)."""
+    pids = {
+        int(f.rsplit("_", 1)[1].removesuffix(".db"))
+        for f in glob.glob(os.path.join(path, "gauge_live*_*.db"))
+    }
+    for pid in pids:
+        if not _pid_alive(pid):
+            multiprocess.mark_process_dead(pid, path)
+
+
+def _multiprocess_registry(path: str) -> CollectorRegistry:
+    cleanup_dead_workers(path)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path)
+    registry.register(APP_INFO)  # Info keeps its value in process memory
+    return registry
+
+
 async def metrics_endpoint(request: Request) -> Response:
+    path = multiprocess_dir()
     return Response(
-        content=generate_latest(),
+        content=generate_latest(_multiprocess_registry(path)) if path else generate_latest(),
         media_type=CONTENT_TYPE_LATEST,
     )
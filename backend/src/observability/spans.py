@@ -0,0 +1,234 @@
+"""Per-request stage timing.
+
+A ``Trace`` is started for each sampled request by ``TracingMiddleware``
+(under its ``X-Request-ID``) and for each background ingestion job. Code
+marks stages with ``with span("embed_query"):``; spans nest by context, so
+concurrent tasks of one request get the right parent. The finished trace
+feeds the ``Server-Timing`` header, the ``stages`` breakdown stored with
+the audit record, and, when ``trace_export_path`` is set, one OTLP/JSON
+``ExportTraceServiceRequest`` per line in that file.
+
+When no trace is active (``trace_sample_rate`` is 0, or outside a request)
+``span`` costs one context-variable lookup and returns a shared no-op.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from src.config import get_settings
+from src.observability.logger import get_logger
+
+log = get_logger(__name__)
+
+_trace: ContextVar["Trace | None"] = ContextVar("trace", default=None)
+_parent: ContextVar["Span | None"] = ContextVar("span_parent", default=None)
+
+
+def _span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int
+    end_ns: int = 0
+    attributes: dict = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+class Trace:
+    def __init__(self, trace_id: str, name: str):
+        self.trace_id = trace_id
+        self.root = Span(name, _span_id(), None, time.time_ns())
+        self.spans: list[Span] = []
+
+    def stages(self) -> dict[str, float]:
+        """Finished spans' milliseconds summed by name, in order of first use."""
+        totals: dict[str, float] = {}
+        for s in self.spans:
+            if s.end_ns:
+                totals[s.name] = totals.get(s.name, 0.0) + s.duration_ms
+        return {name: round(ms, 2) for name, ms in totals.items()}
+
+    def server_timing(self, total_ms: float | None = None) -> str:
+        metrics = [f"{name};dur={ms}" for name, ms in self.stages().items()]
+        if total_ms is not None:
+            metrics.append(f"total;dur={total_ms}")
+        return ", ".join(metrics)
+
+
+class _SpanContext:
+    __slots__ = ("trace", "span", "token")
+
+    def __init__(self, trace: Trace, name: str, attributes: dict):
+        self.trace = trace
+        parent = _parent.get() or trace.root
+        self.span = Span(name, _span_id(), parent.span_id, 0, attributes=attributes)
+
+    def __enter__(self) -> Span:
+        self.token = _parent.set(self.span)
+        self.span.start_ns = time.time_ns()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.end_ns = time.time_ns()
+        try:
+            _parent.reset(self.token)
+        except ValueError:
+            pass  # an async generator closed from another context; that context is discarded anyway
+        if exc_type is not None:
+            self.span.attributes["error"] = exc_type.__name__
+        self.trace.spans.append(self.span)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """Time a stage of the current trace (a no-op when there is none)."""
+    trace = _trace.get()
+    if trace is None:
+        return _NOOP
+    return _SpanContext(trace, name, attributes)
+
+
+def current_trace() -> Trace | None:
+    return _trace.get()
+
+
+def start_trace(trace_id: str, name: str, sampled: bool | None = None):
+    """Make a new trace current; returns a token for ``finish_trace``, or ``None`` if not sampled."""
+    if sampled is None:
+        rate = get_settings().trace_sample_rate
+        sampled = rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+    if not sampled:
+        return None
+    return _trace.set(Trace(trace_id, name)), _parent.set(None)
+
+
+def finish_trace(token, name: str | None = None, **attributes):
+    """Close the trace made current by ``start_trace`` (optionally renaming its root span) and export it."""
+    if token is None:
+        return
+    trace = _trace.get()
+    _trace.reset(token[0])
+    _parent.reset(token[1])
+    trace.root.end_ns = time.time_ns()
+    if name:
+        trace.root.name = name
+    trace.root.attributes.update(attributes)
+    exporter = get_exporter()
+    if exporter is not None:
+        exporter.export(trace)
+
+
+# ── OTLP/JSON file exporter ───────────────────────────────────────────
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(trace_id: str, s: Span) -> dict:
+    out = {
+        "traceId": trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+    }
+    if s.parent_id:
+        out["parentSpanId"] = s.parent_id
+    return out
+
+
+def otlp_trace_id(request_id: str) -> str:
+    """OTLP wants 32 hex digits; our request IDs are 16 (or client supplied)."""
+    try:
+        if len(request_id) <= 32:
+            int(request_id, 16)
+            return request_id.lower().rjust(32, "0")
+    except ValueError:
+        pass
+    return hashlib.sha256(request_id.encode("utf-8")).hexdigest()[:32]
+
+
+class OTLPFileExporter:
+    """Appends each trace as one OTLP/JSON ``ExportTraceServiceRequest`` line."""
+
+    def __init__(self, path: str, service_name: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._resource = {"attributes": [{"key": "service.name", "value": _otlp_value(service_name)}]}
+
+    def export(self, trace: Trace):
+        trace_id = otlp_trace_id(trace.trace_id)
+        trace.root.attributes.setdefault("request_id", trace.trace_id)
+        line = json.dumps({
+            "resourceSpans": [{
+                "resource": self._resource,
+                "scopeSpans": [{
+                    "scope": {"name": "helpdesk"},
+                    "spans": [_otlp_span(trace_id, s) for s in (trace.root, *trace.spans)],
+                }],
+            }],
+        })
+        try:
+            with self._lock:
+                self._file.write(line + "\n")
+                self._file.flush()
+        except (OSError, ValueError) as e:
+            log.warning("Trace export failed: %s", e)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+_exporter: OTLPFileExporter | None = None
+
+
+def get_exporter() -> OTLPFileExporter | None:
+    global _exporter
+    if _exporter is None:
+        settings = get_settings()
+        if settings.trace_export_path:
+            _exporter = OTLPFileExporter(settings.trace_export_path, settings.app_name)
+    return _exporter
+
+
+def close_exporter():
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+        _exporter = None
@@ -1,61 +1,101 @@
 import time
 import uuid
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.observability.logger import get_logger
 from src.observability.metrics import HTTP_REQUESTS, HTTP_LATENCY
+from src.observability.spans import current_trace, finish_trace, start_trace
 
 log = get_logger(__name__)
 
 
-def _normalize_path(path: str) -> str:
-    """Collapse path params to reduce cardinality (e.g. /chat/history/abc -> /chat/history/:id)."""
-    parts = path.strip("/").split("/")
-    normalized = []
-    for i, part in enumerate(parts):
-        if len(part) > 8 and part.isalnum():
-            normalized.append(":id")
-        else:
-            normalized.append(part)
-    return "/" + "/".join(normalized)
+def route_template(scope: Scope) -> str:
+    """The matched route's path template (``/api/chat/history/{session_id}``).
 
+    Unmatched requests share one label so arbitrary paths can't blow up
+    metric cardinality.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    path = scope["path"]
+    if not template:
+        if "endpoint" not in scope:
+            return "<unmatched>"
+        # Plain Starlette routes (``/metrics``) only leave their endpoint and
+        # parameters in the scope.
+        params = {str(v): f"{{{k}}}" for k, v in scope.get("path_params", {}).items()}
+        return "/".join(params.get(part, part) for part in path.split("/"))
+    # Routes reached through an included router may carry their path relative
+    # to the router's prefix; recover the prefix from the leading segments of
+    # the request path.
+    if not template.count("{") and path == template:
+        return template
+    extra = path.rstrip("/").count("/") - template.rstrip("/").count("/")
+    if extra > 0:
+        template = "/".join(path.split("/")[: extra + 1]) + template
+    return template
 
-class TracingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next) -> Response:
-        request_id = request.headers.get("X-Request-ID", uuid.uuid4().hex[:16])
+
+class TracingMiddleware:
+    """Request ID, latency headers, access log and HTTP metrics (pure ASGI).
+
+    Sampled requests also get a span ``Trace`` keyed by the request ID; the
+    stages finished by the time the response starts go out in a
+    ``Server-Timing`` header, and the whole trace is exported afterwards.
+
+    Headers are added as the response starts, so ``X-Latency-Ms`` (and
+    ``Server-Timing``) cover time to first byte for streamed responses;
+    metrics and the log line use the time the response finished.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("X-Request-ID") or uuid.uuid4().hex[:16]
         start = time.perf_counter()
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+        state["start_time"] = start
+        status_code = 500
+        trace_token = start_trace(request_id, scope["method"])
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                latency_ms = round((time.perf_counter() - start) * 1000, 2)
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Latency-Ms"] = str(latency_ms)
+                trace = current_trace()
+                if trace is not None:
+                    headers["Server-Timing"] = trace.server_timing(latency_ms)
+            await send(message)
 
-        request.state.request_id = request_id
-        request.state.start_time = start
-
-        response: Response = await call_next(request)
-
-        elapsed = time.perf_counter() - start
-        latency_ms = round(elapsed * 1000, 2)
-
-        response.headers["X-Request-ID"] = request_id
-        response.headers["X-Latency-Ms"] = str(latency_ms)
-
-        endpoint = _normalize_path(request.url.path)
-        HTTP_REQUESTS.labels(
-            method=request.method,
-            endpoint=endpoint,
-            status=response.status_code,
-        ).inc()
-        HTTP_LATENCY.labels(
-            method=request.method,
-            endpoint=endpoint,
-        ).observe(elapsed)
-
-        log.info(
-            "%s %s %s %.1fms req=%s",
-            request.method,
-            request.url.path,
-            response.status_code,
-            latency_ms,
-            request_id,
-        )
-        return response
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            method = scope["method"]
+            endpoint = route_template(scope)
+            finish_trace(
+                trace_token, f"{method} {endpoint}",
+                **{"http.method": method, "http.route": endpoint, "http.status_code": status_code},
+            )
+            HTTP_REQUESTS.labels(method=method, endpoint=endpoint, status=status_code).inc()
+            HTTP_LATENCY.labels(method=method, endpoint=endpoint).observe(elapsed)
+            log.info(
+                "%s %s %s %.1fms req=%s",
+                method,
+                scope["path"],
+                status_code,
+                elapsed * 1000,
+                request_id,
+            )
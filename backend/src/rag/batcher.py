@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from src.observability.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_QUEUE_WAIT
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-text embedding calls into one batched request.
+
+    Callers ``await submit(text)``. Texts are collected for up to ``window``
+    seconds, or until ``max_size`` texts are waiting. Then ``batch_fn`` runs
+    once on the whole batch and each caller gets its own vector back. If the
+    batch call fails, every waiter receives the exception.
+    """
+
+    def __init__(self, batch_fn: Callable[[list], Awaitable[list]],
+                 window: float, max_size: int):
+        self._batch_fn = batch_fn
+        self.window = window
+        self.max_size = max_size
+        self._pending: list[tuple[object, asyncio.Future, float]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Bound to a new event loop (e.g. a fresh asyncio.run): start clean.
+            self._loop = loop
+            self._pending = []
+            self._timer = None
+            self._tasks = set()
+
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._dispatch)
+
+        return await future
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[object, asyncio.Future, float]]):
+        now = time.perf_counter()
+        EMBEDDING_BATCH_SIZE.observe(len(batch))
+        for _, _, enqueued in batch:
+            EMBEDDING_QUEUE_WAIT.observe(now - enqueued)
+
+        try:
+            results = await self._batch_fn([item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
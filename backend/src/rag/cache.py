@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.config import get_settings
+from src.observability.logger import get_logger
+
+log = get_logger(__name__)
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    context_docs: list[dict]
+    similarity: float
+
+
+class SemanticCache:
+    """Bounded LRU/TTL cache of answers keyed by query embedding similarity.
+
+    Entries are matched by cosine similarity rather than exact text, so
+    rephrasings of the same question reuse one generation. Every corpus change
+    bumps ``generation`` and drops all entries; stores carrying a stale
+    generation are ignored so an answer computed against the old corpus can
+    never be cached after an ingest or delete.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: float):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self._entries: OrderedDict[int, tuple[np.ndarray, CachedAnswer, float]] = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray | None:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vec))
+        if norm == 0.0:
+            return None
+        return vec / norm
+
+    def _evict_expired(self, now: float):
+        expired = [k for k, (_, _, ts) in self._entries.items() if now - ts > self.ttl_seconds]
+        for k in expired:
+            del self._entries[k]
+
+    def lookup(self, embedding: list[float]) -> CachedAnswer | None:
+        vec = self._normalize(embedding)
+        if vec is None:
+            return None
+
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            if not self._entries:
+                return None
+
+            keys = list(self._entries.keys())
+            vectors = [self._entries[k][0] for k in keys]
+            if any(v.shape != vec.shape for v in vectors):
+                # Embedding model/dimension changed under us — start over.
+                self._entries.clear()
+                return None
+
+            scores = np.stack(vectors) @ vec
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            if score < self.threshold:
+                return None
+
+            key = keys[best]
+            self._entries.move_to_end(key)
+            entry = self._entries[key][1]
+            return CachedAnswer(entry.answer, entry.context_docs, round(score, 4))
+
+    def store(self, embedding: list[float], answer: str, context_docs: list[dict], generation: int):
+        vec = self._normalize(embedding)
+        if vec is None:
+            return
+
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[self._next_key] = (
+                vec, CachedAnswer(answer, context_docs, 1.0), time.monotonic(),
+            )
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            dropped = len(self._entries)
+            self._entries.clear()
+        if dropped:
+            log.info("Semantic cache invalidated (%d entries dropped)", dropped)
+
+
+_cache: SemanticCache | None = None
+
+
+def get_answer_cache() -> SemanticCache:
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        _cache = SemanticCache(
+            threshold=settings.semantic_cache_threshold,
+            max_entries=settings.semantic_cache_max_entries,
+            ttl_seconds=settings.semantic_cache_ttl,
+        )
+    return _cache
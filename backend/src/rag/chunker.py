@@ -1,38 +1,220 @@
+"""Split documents into chunks for embedding.
+
+Text is consumed incrementally: ``iter_chunks`` takes a document as a stream
+of string pieces and yields chunks as soon as their boundaries are known,
+holding about one chunk plus one piece in memory. ``chunk_text`` runs the
+same generator over a single string, so both produce identical chunks.
+
+CSV is split by rows (the header repeated in every chunk) and JSON by
+records (array elements, or one value per line for JSON Lines) rather than
+as raw text; see ``iter_document_chunks``.
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+import json
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
 from src.config import get_settings
 
+READ_SIZE = 64 * 1024  # bytes/characters read from a file or upload at a time
+
+_BOUNDARIES = ["\n\n", "\n", ". ", " "]  # paragraph, line, sentence, word
 
-def chunk_text(text: str, chunk_size: int | None = None, overlap: int | None = None) -> list[str]:
-    settings = get_settings()
-    size = chunk_size or settings.chunk_size
-    lap = overlap or settings.chunk_overlap
 
-    text = text.strip()
-    if not text:
-        return []
+def _params(chunk_size: int | None, overlap: int | None) -> tuple[int, int]:
+    settings = get_settings()
+    return chunk_size or settings.chunk_size, overlap or settings.chunk_overlap
 
-    if len(text) <= size:
-        return [text]
 
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + size
+def _split(text: str, start: int, end: int, size: int, lap: int, final: bool) -> Iterator[tuple[str, int]]:
+    """Yield ``(chunk, next_start)`` for the chunks of ``text[start:end]``.
 
-        if end < len(text):
+    ``end`` excludes trailing whitespace. Unless ``final``, stops while the
+    rest could still be the document's last chunk, since more input would
+    change where that one ends.
+    """
+    while start < end if final else start + size < end:
+        stop = start + size
+        if stop < end:
             # Try to break at paragraph, then sentence, then word boundary
-            for sep in ["\n\n", "\n", ". ", " "]:
-                idx = text.rfind(sep, start, end)
+            for sep in _BOUNDARIES:
+                idx = text.rfind(sep, start, stop)
                 if idx > start:
-                    end = idx + len(sep)
+                    stop = idx + len(sep)
                     break
+        chunk = text[start:stop].strip()
+        # An early boundary can leave no room for the overlap; always advance.
+        start = stop - lap if stop < end and stop - lap > start else stop
+        yield chunk, start
 
-        chunks.append(text[start:end].strip())
-        start = end - lap if end < len(text) else end
 
-    return [c for c in chunks if c]
+def iter_chunks(pieces: Iterable[str], chunk_size: int | None = None, overlap: int | None = None) -> Iterator[str]:
+    size, lap = _params(chunk_size, overlap)
+    buf, start = "", 0
+    for piece in pieces:
+        buf = buf + piece if buf else piece.lstrip()
+        for chunk, start in _split(buf, start, len(buf.rstrip()), size, lap, final=False):
+            if chunk:
+                yield chunk
+        if start:
+            buf, start = buf[start:], 0
+    for chunk, _ in _split(buf, start, len(buf.rstrip()), size, lap, final=True):
+        if chunk:
+            yield chunk
 
 
-def chunk_file(file_path: str) -> list[str]:
+def chunk_text(text: str, chunk_size: int | None = None, overlap: int | None = None) -> list[str]:
+    return list(iter_chunks([text], chunk_size, overlap))
+
+
+def _pack(records: Iterable[str], size: int, lap: int, header: str = "") -> Iterator[str]:
+    """Join whole records into chunks of up to ``size`` characters, each starting with ``header``.
+
+    A record too long for a chunk of its own is split like plain text.
+    """
+    prefix = f"{header}\n" if header else ""
+    batch: list[str] = []
+    length = len(prefix)
+    for record in records:
+        record = record.strip()
+        if not record:
+            continue
+        if len(prefix) + len(record) > size:
+            if batch:
+                yield prefix + "\n".join(batch)
+                batch, length = [], len(prefix)
+            yield from iter_chunks([prefix + record], size, lap)
+            continue
+        if batch and length + 1 + len(record) > size:
+            yield prefix + "\n".join(batch)
+            batch, length = [], len(prefix)
+        batch.append(record)
+        length += len(record) + (1 if len(batch) > 1 else 0)
+    if batch:
+        yield prefix + "\n".join(batch)
+
+
+def _lines(pieces: Iterable[str]) -> Iterator[str]:
+    rest = ""
+    for piece in pieces:
+        *lines, rest = (rest + piece).split("\n")
+        for line in lines:
+            yield line + "\n"
+    if rest:
+        yield rest
+
+
+def _csv_line(row: list[str]) -> str:
+    out = io.StringIO()
+    csv.writer(out, lineterminator="").writerow(row)
+    return out.getvalue()
+
+
+def iter_csv_chunks(pieces: Iterable[str], chunk_size: int | None = None, overlap: int | None = None) -> Iterator[str]:
+    """Chunks of whole CSV rows, each chunk starting with the header row."""
+    size, lap = _params(chunk_size, overlap)
+    rows = csv.reader(_lines(pieces))
+
+    def records() -> Iterator[str]:
+        try:
+            for row in rows:
+                if any(field.strip() for field in row):
+                    yield _csv_line(row)
+        except csv.Error as e:
+            raise ValueError(f"Invalid CSV: {e}") from e
+
+    it = records()
+    header = next(it, "")
+    if len(header) > size // 2:  # no room for rows next to it; treat it as a row
+        yield from _pack([header, *it], size, lap)
+    else:
+        yield from _pack(it, size, lap, header)
+
+
+def _json_records(pieces: Iterable[str]) -> Iterator[object]:
+    """Decode a JSON array element by element, or a sequence of JSON values (JSON Lines)."""
+    decoder = json.JSONDecoder()
+    source = iter(pieces)
+    buf, pos, eof = "", 0, False
+    in_array: bool | None = None
+
+    def more() -> bool:
+        nonlocal buf, pos, eof
+        piece = next(source, None)
+        if piece is None:
+            eof = True
+            return False
+        buf, pos = buf[pos:] + piece, 0
+        return True
+
+    while True:
+        while pos < len(buf) and (buf[pos].isspace() or (in_array and buf[pos] == ",")):
+            pos += 1
+        if pos == len(buf):
+            if more():
+                continue
+            if in_array:
+                raise ValueError("Invalid JSON: unterminated array")
+            return
+        if in_array is None:
+            in_array = buf[pos] == "["
+            pos += in_array
+            continue
+        if in_array and buf[pos] == "]":
+            return
+        try:
+            record, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as e:
+            if not eof and more():
+                continue
+            raise ValueError(f"Invalid JSON: {e}") from e
+        # A bare number or literal at the end of the buffer may continue in the next piece.
+        if end == len(buf) and not isinstance(record, (dict, list, str)) and not eof and more():
+            continue
+        pos = end
+        yield record
+
+
+def iter_json_chunks(pieces: Iterable[str], chunk_size: int | None = None, overlap: int | None = None) -> Iterator[str]:
+    """Chunks of whole JSON records, one compact JSON value per line."""
+    size, lap = _params(chunk_size, overlap)
+    records = (
+        r if isinstance(r, str) else json.dumps(r, ensure_ascii=False)
+        for r in _json_records(pieces)
+    )
+    yield from _pack(records, size, lap)
+
+
+def iter_document_chunks(
+    pieces: Iterable[str], file_type: str, chunk_size: int | None = None, overlap: int | None = None,
+) -> Iterator[str]:
+    """Chunks of a document given as text pieces; ``file_type`` is its extension (``.csv``)."""
+    if file_type == ".csv":
+        return iter_csv_chunks(pieces, chunk_size, overlap)
+    if file_type == ".json":
+        return iter_json_chunks(pieces, chunk_size, overlap)
+    return iter_chunks(pieces, chunk_size, overlap)
+
+
+def read_stream(stream: BinaryIO, size: int = READ_SIZE) -> Iterator[str]:
+    """UTF-8 text pieces of a binary stream (raises ``UnicodeDecodeError`` on bad input)."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while block := stream.read(size):
+        if text := decoder.decode(block):
+            yield text
+    if text := decoder.decode(b"", final=True):
+        yield text
+
+
+def read_file(file_path: str | Path, size: int = READ_SIZE) -> Iterator[str]:
     with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
-    return chunk_text(content)
+        while text := f.read(size):
+            yield text
+
+
+def chunk_file(file_path: str) -> list[str]:
+    return list(iter_document_chunks(read_file(file_path), Path(file_path).suffix.lower()))
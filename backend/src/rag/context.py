@@ -0,0 +1,128 @@
+"""Assemble retrieved chunks into the context block of the system prompt.
+
+Retrieval returns chunks, and adjacent chunks of a document share
+``chunk_overlap`` characters; sent verbatim, that text is paid for twice.
+``build_context``:
+
+1. merges chunks of the same ``doc_id`` with consecutive ``chunk_index``
+   into one passage, dropping the overlapping span;
+2. drops passages whose word 3-grams are mostly (``context_dedup_threshold``)
+   contained in a higher-scoring passage, e.g. the same FAQ uploaded twice;
+3. packs passages best score first into ``context_token_budget`` tokens,
+   as estimated by ``estimate_tokens`` (no tokenizer call).
+"""
+from __future__ import annotations
+
+import math
+import re
+
+from src.config import get_settings
+
+CHARS_PER_TOKEN = 4  # Gemini's rule of thumb for English text
+NO_CONTEXT = "No relevant documents found in knowledge base."
+
+_MIN_OVERLAP = 16  # shorter suffix/prefix matches are treated as coincidence
+_WORD = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def format_passage(doc: dict) -> str:
+    return f"[{doc['source']}] (score: {doc['score']}): {doc['text']}"
+
+
+def _join_overlapping(left: str, right: str) -> str:
+    """Concatenate consecutive chunks, keeping the text they share once."""
+    probe = right[:_MIN_OVERLAP]
+    if len(probe) == _MIN_OVERLAP:
+        idx = left.find(probe, max(0, len(left) - len(right)))
+        while idx != -1:
+            if right.startswith(left[idx:]):
+                return left[:idx] + right
+            idx = left.find(probe, idx + 1)
+    return f"{left} {right}"
+
+
+def merge_adjacent(docs: list[dict]) -> list[dict]:
+    """Merge runs of consecutive chunks of one document; a run keeps its best score."""
+    passages: list[dict] = []
+    runs: dict[str, dict] = {}  # doc_id -> passage that ends with the last chunk seen
+    ordered = sorted(
+        docs,
+        key=lambda d: (d.get("doc_id") is None, d.get("doc_id") or "", d.get("chunk_index") or 0),
+    )
+    for doc in ordered:
+        doc_id, index = doc.get("doc_id"), doc.get("chunk_index")
+        run = runs.get(doc_id) if doc_id is not None and index is not None else None
+        if run is not None and index == run["chunk_index"] + 1:
+            run["text"] = _join_overlapping(run["text"], doc["text"])
+            run["score"] = max(run["score"], doc["score"])
+            run["chunk_index"] = index
+            continue
+        passage = dict(doc)
+        passages.append(passage)
+        if doc_id is not None and index is not None:
+            runs[doc_id] = passage
+    return passages
+
+
+def _shingles(text: str) -> set[tuple[str, ...]]:
+    words = _WORD.findall(text.lower())
+    if len(words) < 3:
+        return {tuple(words)}
+    return set(zip(words, words[1:], words[2:]))
+
+
+def drop_near_duplicates(passages: list[dict], threshold: float) -> list[dict]:
+    """Keep passages best score first, skipping those mostly contained in a kept one."""
+    kept: list[tuple[dict, set]] = []
+    for passage in sorted(passages, key=lambda p: p["score"], reverse=True):
+        shingles = _shingles(passage["text"])
+        if any(len(shingles & other) >= threshold * len(shingles) for _, other in kept):
+            continue
+        kept.append((passage, shingles))
+    return [p for p, _ in kept]
+
+
+def _truncate(text: str, tokens: int) -> str:
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit)
+    return text[: cut if cut > 0 else limit].rstrip() + " …"
+
+
+def build_context(docs: list[dict], budget: int | None = None) -> tuple[str, int]:
+    """Return ``(context_text, tokens_saved)``.
+
+    ``tokens_saved`` is the estimated difference from joining ``docs``
+    verbatim. ``budget`` defaults to ``context_token_budget``; 0 means no
+    limit. The best passage is always sent, truncated if it alone exceeds
+    the budget.
+    """
+    if not docs:
+        return NO_CONTEXT, 0
+    settings = get_settings()
+    budget = settings.context_token_budget if budget is None else budget
+
+    passages = drop_near_duplicates(merge_adjacent(docs), settings.context_dedup_threshold)
+
+    parts: list[str] = []
+    used = 0
+    for passage in passages:
+        part = format_passage(passage)
+        cost = estimate_tokens(part) + 1  # the blank line between passages
+        if budget and used + cost > budget:
+            if parts:
+                continue
+            header = estimate_tokens(format_passage({**passage, "text": ""}))
+            part = format_passage({**passage, "text": _truncate(passage["text"], max(budget - header, 1))})
+            cost = estimate_tokens(part) + 1
+        parts.append(part)
+        used += cost
+
+    context = "\n\n".join(parts)
+    verbatim = sum(estimate_tokens(format_passage(d)) + 1 for d in docs)
+    return context, max(verbatim - used, 0)
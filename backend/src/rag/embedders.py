@@ -0,0 +1,238 @@
+"""Embedding providers, selected by ``embedding_provider``.
+
+- ``gemini``: ``embed_content`` on the Gemini API (``gemini_embedding_model``,
+  optionally truncated to ``gemini_embedding_dim``).
+- ``local``: ``HashingEmbedder``, a CPU embedder with no model file or
+  network: hashed character n-grams of the normalised text, log-scaled and
+  L2-normalised, computed for a whole batch with a few NumPy operations.
+  It matches on shared word fragments rather than meaning, but embeds a
+  query in well under a millisecond and lets the stack run offline.
+
+Vectors from different providers (or dimensions) are not comparable, so
+every collection records the ``embedding_model``/``embedding_dim`` it was
+built with and ``check_embedding_space`` refuses a mismatch. Local
+providers also get a collection of their own (``collection_suffix``).
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import Protocol
+
+import numpy as np
+from google import genai
+
+from src.config import get_settings
+from src.observability.logger import get_logger
+from src.observability.metrics import EMBEDDING_REQUESTS
+
+log = get_logger(__name__)
+
+EMBED_BATCH_SIZE = 100  # max texts per embed_content request
+
+# Output size of each Gemini model when ``gemini_embedding_dim`` is not set.
+_GEMINI_DIMENSIONS = {"gemini-embedding-001": 3072, "text-embedding-004": 768}
+
+
+class Embedder(Protocol):
+    model: str  # recorded on collections; also the embedding-cache key
+    dimension: int | None
+    remote: bool  # each call is a network round trip: worth caching and micro-batching
+
+    def embed(self, texts: list[str]) -> list[list[float]]: ...
+    async def embed_async(self, texts: list[str]) -> list[list[float]]: ...
+
+
+class GeminiEmbedder:
+    remote = True
+
+    def __init__(self, model: str, dimension: int = 0):
+        self._name = model
+        self._output_dim = dimension
+        self.model = f"{model}@{dimension}" if dimension else model
+        self.dimension = dimension or _GEMINI_DIMENSIONS.get(model)
+        self._client: genai.Client | None = None
+
+    def _get_client(self) -> genai.Client:
+        if self._client is None:
+            settings = get_settings()
+            self._client = genai.Client(
+                api_key=settings.gemini_api_key,
+                http_options=genai.types.HttpOptions(base_url=settings.gemini_base_url)
+                if settings.gemini_base_url else None,
+            )
+        return self._client
+
+    def _config(self) -> genai.types.EmbedContentConfig | None:
+        if not self._output_dim:
+            return None
+        return genai.types.EmbedContentConfig(output_dimensionality=self._output_dim)
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        client = self._get_client()
+        all_embeddings = []
+        for i in range(0, len(texts), EMBED_BATCH_SIZE):
+            try:
+                result = client.models.embed_content(
+                    model=self._name, contents=texts[i : i + EMBED_BATCH_SIZE], config=self._config(),
+                )
+            except Exception:
+                EMBEDDING_REQUESTS.labels(status="error").inc()
+                raise
+            EMBEDDING_REQUESTS.labels(status="success").inc()
+            all_embeddings.extend([e.values for e in result.embeddings])
+        return all_embeddings
+
+    async def embed_async(self, texts: list[str]) -> list[list[float]]:
+        client = self._get_client()
+        all_embeddings = []
+        for i in range(0, len(texts), EMBED_BATCH_SIZE):
+            try:
+                result = await client.aio.models.embed_content(
+                    model=self._name, contents=texts[i : i + EMBED_BATCH_SIZE], config=self._config(),
+                )
+            except Exception:
+                EMBEDDING_REQUESTS.labels(status="error").inc()
+                raise
+            EMBEDDING_REQUESTS.labels(status="success").inc()
+            all_embeddings.extend([e.values for e in result.embeddings])
+        return all_embeddings
+
+
+# Bytes kept in words: ASCII letters and digits, and every byte of a multi-byte
+# UTF-8 character; anything else separates words.
+_WORD_BYTES = np.zeros(256, dtype=bool)
+_WORD_BYTES[[*range(ord("0"), ord("9") + 1), *range(ord("a"), ord("z") + 1), *range(128, 256)]] = True
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+_MIX1, _MIX2, _SHIFT = np.uint64(0xFF51AFD7ED558CCD), np.uint64(0xC4CEB9FE1A85EC53), np.uint64(33)
+_HIGH = np.uint64(32)
+_INLINE_CHARS = 8192  # embed_async computes batches smaller than this on the event loop
+
+
+class HashingEmbedder:
+    """Signed feature hashing of character n-grams (FNV-1a over UTF-8 bytes, then fmix64).
+
+    Text is lower-cased and reduced to words separated by single spaces, so
+    n-grams at word edges carry the boundary. Each n-gram adds +1 or -1 to
+    one of ``dimension`` buckets; counts are log-scaled so repeated words do
+    not dominate, and rows are L2-normalised for cosine search.
+    """
+
+    remote = False
+
+    def __init__(self, dimension: int = 768, ngrams: tuple[int, ...] = (3, 4, 5)):
+        self.dimension = dimension
+        self.ngrams = ngrams
+        self.model = f"local-hash-ngram{min(ngrams)}-{max(ngrams)}"
+
+    def vectors(self, texts: list[str]) -> np.ndarray:
+        docs = [f" {t.lower()} ".encode("utf-8") for t in texts]
+        lengths = np.fromiter(map(len, docs), dtype=np.int64, count=len(docs))
+        raw = np.frombuffer(b"".join(docs), dtype=np.uint8)
+        rows = np.repeat(np.arange(len(docs)), lengths)
+
+        # Separators become one space: keep a separator byte only after a word
+        # byte, plus the leading space of each text.
+        word = _WORD_BYTES[raw]
+        keep = word.copy()
+        keep[1:] |= word[:-1]
+        keep[np.cumsum(lengths) - lengths] = True
+        data = np.where(word, raw, ord(" "))[keep].astype(np.uint64)
+        rows = rows[keep]
+
+        # h[i] is the FNV-1a hash of data[i : i + k + 1] after step k, so one
+        # pass yields every n-gram size.
+        slots = 2 * self.dimension  # bucket * 2 + sign
+        counts = np.zeros(len(docs) * slots, dtype=np.int64)
+        h = np.full(len(data), _FNV_OFFSET)
+        for k in range(max(self.ngrams)):
+            m = len(data) - k
+            if m <= 0:
+                break
+            h = (h[:m] ^ data[k:]) * _FNV_PRIME  # wraps mod 2**64
+            if k + 1 not in self.ngrams:
+                continue
+            same_doc = rows[:m] == rows[k:]
+            mixed = h[same_doc]
+            # FNV leaves short inputs poorly mixed; finish with murmur3's fmix64,
+            # then map the top 32 bits onto [0, slots) by multiply-shift.
+            mixed ^= mixed >> _SHIFT
+            mixed *= _MIX1
+            mixed ^= mixed >> _SHIFT
+            mixed *= _MIX2
+            mixed ^= mixed >> _SHIFT
+            slot = ((mixed >> _HIGH) * np.uint64(slots)) >> _HIGH
+            counts += np.bincount(rows[:m][same_doc] * slots + slot.view(np.int64), minlength=counts.size)
+
+        signed = counts.reshape(len(docs), self.dimension, 2)
+        signed = (signed[..., 0] - signed[..., 1]).astype(np.float32)
+        matrix = np.copysign(np.log1p(np.abs(signed)), signed)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        return self.vectors(texts).tolist()
+
+    async def embed_async(self, texts: list[str]) -> list[list[float]]:
+        if sum(map(len, texts)) < _INLINE_CHARS:
+            return self.embed(texts)
+        return await asyncio.to_thread(self.embed, texts)
+
+
+_embedder: Embedder | None = None
+
+
+def get_embedder() -> Embedder:
+    global _embedder
+    if _embedder is None:
+        settings = get_settings()
+        if settings.embedding_provider == "gemini":
+            _embedder = GeminiEmbedder(settings.gemini_embedding_model, settings.gemini_embedding_dim)
+        elif settings.embedding_provider == "local":
+            _embedder = HashingEmbedder(settings.local_embedding_dim)
+        else:
+            raise ValueError(f"Unknown embedding_provider: {settings.embedding_provider!r}")
+    return _embedder
+
+
+# ── Collection bookkeeping ────────────────────────────────────────────
+class EmbeddingSpaceMismatch(RuntimeError):
+    pass
+
+
+def embedding_space() -> dict:
+    """Collection metadata identifying the vectors the configured provider produces."""
+    embedder = get_embedder()
+    space = {"embedding_model": embedder.model}
+    if embedder.dimension:
+        space["embedding_dim"] = embedder.dimension
+    return space
+
+
+def collection_suffix() -> str:
+    """Appended to collection names/paths; empty for Gemini, which owns the original ones."""
+    embedder = get_embedder()
+    if embedder.remote:
+        return ""
+    return "-" + re.sub(r"[^a-z0-9]+", "-", f"{embedder.model}-{embedder.dimension}".lower()).strip("-")
+
+
+def check_embedding_space(metadata: dict | None, name: str):
+    """Raise ``EmbeddingSpaceMismatch`` if collection ``name`` was built by another provider."""
+    metadata = metadata or {}
+    if "embedding_model" not in metadata:
+        log.info("Collection %s does not record its embedding model; assuming %s", name, get_embedder().model)
+        return
+    expected = embedding_space()
+    for key, value in expected.items():
+        if key in metadata and metadata[key] != value:
+            raise EmbeddingSpaceMismatch(
+                f"Collection {name} holds vectors from {metadata.get('embedding_model')} "
+                f"(dim {metadata.get('embedding_dim', '?')}) but the configured provider produces "
+                f"{expected['embedding_model']} (dim {expected.get('embedding_dim', '?')}). "
+                "Use another collection or re-ingest the documents."
+            )
@@ -1,38 +1,102 @@
-from google import genai
+import asyncio
 
 from src.config import get_settings
+from src.rag.batcher import EmbeddingBatcher
+from src.rag.embedders import EMBED_BATCH_SIZE, get_embedder
+from src.db.embedding_cache import get_embedding_cache, text_hash
 from src.observability.logger import get_logger
+from src.observability.metrics import EMBEDDING_CACHE_LOOKUPS
 
 log = get_logger(__name__)
 
-_client: genai.Client | None = None
+_query_batcher: EmbeddingBatcher | None = None
 
 
-def _get_client() -> genai.Client:
-    global _client
-    if _client is None:
-        settings = get_settings()
-        _client = genai.Client(api_key=settings.gemini_api_key)
-    return _client
+def _embed_batches(texts: list[str]) -> list[list[float]]:
+    return get_embedder().embed(texts)
 
 
-def embed_texts(texts: list[str]) -> list[list[float]]:
-    settings = get_settings()
-    client = _get_client()
+async def _embed_batches_async(texts: list[str]) -> list[list[float]]:
+    return await get_embedder().embed_async(texts)
 
-    all_embeddings = []
-    batch_size = 100
 
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i : i + batch_size]
-        result = client.models.embed_content(
-            model=settings.gemini_embedding_model,
-            contents=batch,
-        )
-        all_embeddings.extend([e.values for e in result.embeddings])
+def _split_cached(texts: list[str], cached: dict[str, list[float]],
+                  hashes: list[str]) -> dict[str, str]:
+    """Return ``{hash: text}`` for texts missing from ``cached``, de-duplicated."""
+    missing: dict[str, str] = {}
+    for h, t in zip(hashes, texts):
+        if h not in cached and h not in missing:
+            missing[h] = t
+
+    EMBEDDING_CACHE_LOOKUPS.labels(result="hit").inc(len(texts) - len(missing))
+    EMBEDDING_CACHE_LOOKUPS.labels(result="miss").inc(len(missing))
+    if missing:
+        log.info("Embedding %d new texts (%d served from cache)", len(missing), len(texts) - len(missing))
+    return missing
+
+
+def _use_cache(use_cache: bool) -> bool:
+    # A local embedder computes vectors faster than the cache can look them up.
+    return use_cache and get_settings().embedding_cache_enabled and get_embedder().remote
+
+
+def embed_texts(texts: list[str], use_cache: bool = True) -> list[list[float]]:
+    """Embed ``texts``, sending only content not already in the embedding cache to the provider."""
+    if not _use_cache(use_cache):
+        return _embed_batches(texts)
+
+    model = get_embedder().model
+    cache = get_embedding_cache()
+    hashes = [text_hash(t) for t in texts]
+    cached = cache.get_many(model, hashes)
+
+    missing = _split_cached(texts, cached, hashes)
+    if missing:
+        fresh = dict(zip(missing.keys(), _embed_batches(list(missing.values()))))
+        cache.put_many(model, fresh)
+        cached.update(fresh)
+
+    return [cached[h] for h in hashes]
 
-    return all_embeddings
+
+async def embed_texts_async(texts: list[str], use_cache: bool = True) -> list[list[float]]:
+    """Async ``embed_texts``; cache I/O runs in a worker thread."""
+    if not _use_cache(use_cache):
+        return await _embed_batches_async(texts)
+
+    model = get_embedder().model
+    cache = get_embedding_cache()
+    hashes = [text_hash(t) for t in texts]
+    cached = await asyncio.to_thread(cache.get_many, model, hashes)
+
+    missing = _split_cached(texts, cached, hashes)
+    if missing:
+        fresh = dict(zip(missing.keys(), await _embed_batches_async(list(missing.values()))))
+        await asyncio.to_thread(cache.put_many, model, fresh)
+        cached.update(fresh)
+
+    return [cached[h] for h in hashes]
 
 
 def embed_query(query: str) -> list[float]:
-    return embed_texts([query])[0]
+    # Queries are short-lived; repeats are handled by the semantic answer cache.
+    return embed_texts([query], use_cache=False)[0]
+
+
+def _get_query_batcher() -> EmbeddingBatcher:
+    global _query_batcher
+    if _query_batcher is None:
+        settings = get_settings()
+        _query_batcher = EmbeddingBatcher(
+            _embed_batches_async,
+            window=settings.embedding_batch_window_ms / 1000,
+            max_size=min(settings.embedding_batch_max_size, EMBED_BATCH_SIZE),
+        )
+    return _query_batcher
+
+
+async def embed_query_async(query: str) -> list[float]:
+    # Concurrent chats share one embed_content round trip via the micro-batcher.
+    if get_settings().embedding_batching_enabled and get_embedder().remote:
+        return await _get_query_batcher().submit(query)
+    return (await embed_texts_async([query], use_cache=False))[0]
@@ -0,0 +1,191 @@
+"""Background ingestion of uploaded documents.
+
+An upload is saved under ``ingest_upload_dir`` and recorded as a job in the
+``ingest_jobs`` table; the request returns right away. Each process runs an
+``IngestJobRunner`` that claims queued jobs from SQLite (so several uvicorn
+workers share one queue) and ingests up to ``ingest_job_concurrency`` of
+them at a time, recording ``chunks_done`` after every embedding batch.
+
+Jobs survive restarts: a job interrupted by shutdown is put back in the
+queue, one whose process crashed is re-queued once its heartbeat is older
+than ``ingest_job_stale_after``, and either resumes after the chunks it had
+already stored.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import time
+import uuid
+from functools import partial
+
+from src.config import get_settings
+from src.db.sqlite import (
+    claim_ingest_job, count_queued_ingest_jobs, heartbeat_ingest_jobs, requeue_stale_ingest_jobs,
+    save_document_meta, update_ingest_job,
+)
+from src.rag.chunker import iter_document_chunks, read_file
+from src.rag.pipeline import ingest_chunks, ingest_chunks_async
+from src.observability.logger import get_logger
+from src.observability.metrics import INGEST_JOB_DURATION, INGEST_JOB_QUEUE_DEPTH
+from src.observability.spans import current_trace, finish_trace, span, start_trace
+
+log = get_logger(__name__)
+
+
+def _count_chunks(path: str, file_type: str) -> int:
+    return sum(1 for _ in iter_document_chunks(read_file(path), file_type))
+
+
+class IngestJobRunner:
+    def __init__(self, concurrency: int, poll_interval: float, stale_after: float):
+        self.owner = uuid.uuid4().hex
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._slots = asyncio.Semaphore(concurrency)
+        self._wake = asyncio.Event()
+        self._running: dict[str, asyncio.Task] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._dispatch()), asyncio.create_task(self._heartbeat())]
+
+    def notify(self):
+        """A job was queued by this process; claim it without waiting for the next poll."""
+        self._wake.set()
+
+    async def close(self):
+        """Stop claiming jobs and interrupt running ones; they are re-queued for the next start."""
+        for task in self._tasks + list(self._running.values()):
+            task.cancel()
+        for task in self._tasks + list(self._running.values()):
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+    async def _dispatch(self):
+        requeued = False
+        while True:
+            try:
+                if not requeued:
+                    await requeue_stale_ingest_jobs(self.stale_after)
+                    requeued = True
+                await self._dispatch_next()
+            except Exception:
+                # A locked or unavailable database must not stop ingestion
+                # for the life of the process: retry after a poll interval.
+                log.exception("Ingestion job dispatch failed; retrying in %.1fs", self.poll_interval)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _dispatch_next(self):
+        """Start the oldest queued job, or wait for one to be queued."""
+        await self._slots.acquire()
+        try:
+            job = await claim_ingest_job(self.owner)
+        except BaseException:
+            self._slots.release()
+            raise
+        if job is not None:
+            task = asyncio.create_task(self._execute(job))
+            self._running[job["id"]] = task
+            task.add_done_callback(partial(self._finished, job["id"]))
+        else:
+            self._slots.release()
+        INGEST_JOB_QUEUE_DEPTH.set(await count_queued_ingest_jobs())
+        if job is None:
+            # Not wait_for: on Python 3.11 it drops a cancellation that arrives
+            # just as the event is set, and close() then waits forever.
+            with contextlib.suppress(asyncio.TimeoutError):
+                async with asyncio.timeout(self.poll_interval):
+                    await self._wake.wait()
+            self._wake.clear()
+            if await requeue_stale_ingest_jobs(self.stale_after):
+                log.warning("Re-queued ingestion jobs from a stopped worker")
+
+    def _finished(self, job_id: str, _task: asyncio.Task):
+        self._running.pop(job_id, None)
+        self._slots.release()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.stale_after / 4)
+            try:
+                await heartbeat_ingest_jobs(self.owner, list(self._running))
+            except Exception:
+                log.exception("Ingestion job heartbeat failed")
+
+    async def _execute(self, job: dict):
+        job_id, path = job["id"], job["upload_path"]
+        job_start = time.perf_counter()
+        trace_token = start_trace(job_id, "ingest_job")
+        status = "queued"
+        try:
+            total = job["chunks_total"]
+            if total is None:
+                with span("count_chunks"):
+                    total = await asyncio.to_thread(_count_chunks, path, job["file_type"])
+                await update_ingest_job(job_id, chunks_total=total)
+            if job["chunks_done"]:
+                log.info("Resuming ingestion job %s at chunk %d/%d", job_id, job["chunks_done"], total)
+
+            chunks = iter_document_chunks(read_file(path), job["file_type"])
+            if get_settings().async_pipeline:
+                async def progress(done: int):
+                    await update_ingest_job(job_id, chunks_done=done)
+
+                count = await ingest_chunks_async(
+                    job["document_id"], job["filename"], chunks, job["chunks_done"], progress,
+                )
+            else:
+                loop = asyncio.get_running_loop()
+
+                def progress(done: int):
+                    asyncio.run_coroutine_threadsafe(update_ingest_job(job_id, chunks_done=done), loop).result()
+
+                count = await asyncio.to_thread(
+                    ingest_chunks, job["document_id"], job["filename"], chunks, job["chunks_done"], progress,
+                )
+
+            await save_document_meta(
+                job["document_id"], job["filename"], job["file_type"], count, os.path.getsize(path),
+            )
+            await update_ingest_job(job_id, status="done", chunks_done=count, chunks_total=count, finished=True)
+            status = "done"
+        except asyncio.CancelledError:
+            await asyncio.shield(update_ingest_job(job_id, status="queued", owner=None))
+            raise
+        except Exception as e:
+            log.exception("Ingestion job %s failed", job_id)
+            await update_ingest_job(job_id, status="failed", error=str(e), finished=True)
+            status = "failed"
+        finally:
+            trace = current_trace() if trace_token else None
+            if trace is not None:
+                log.info("Ingestion job %s %s, stages (ms): %s", job_id, status, trace.stages())
+            finish_trace(trace_token, **{"job.id": job_id, "job.status": status})
+        INGEST_JOB_DURATION.labels(status=status).observe(time.perf_counter() - job_start)
+        with contextlib.suppress(OSError):
+            os.remove(path)
+
+
+_runner: IngestJobRunner | None = None
+
+
+def get_ingest_job_runner() -> IngestJobRunner:
+    global _runner
+    if _runner is None:
+        settings = get_settings()
+        _runner = IngestJobRunner(
+            concurrency=settings.ingest_job_concurrency,
+            poll_interval=settings.ingest_job_poll_interval,
+            stale_after=settings.ingest_job_stale_after,
+        )
+    return _runner
+
+
+async def close_ingest_job_runner():
+    global _runner
+    if _runner is not None:
+        await _runner.close()
+        _runner = None
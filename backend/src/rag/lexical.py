@@ -0,0 +1,189 @@
+"""BM25 inverted index over chunk text.
+
+Exact product names, error codes and ticket IDs are matched far more
+reliably (and far more cheaply) by keyword search than by an embedding call.
+The index is in-process and maintained alongside the vector store: chunks are
+added on ingest and removed on delete, and the whole index is rebuilt from
+the vector store at startup.
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from src.config import get_settings
+from src.observability.logger import get_logger
+
+log = get_logger(__name__)
+
+# Keeps identifiers such as "ERR-4012", "INC0012345" or "0x80070005" whole.
+_TOKEN_RE = re.compile(r"\w+(?:[-.]\w+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i if in is it its
+me my no not of on or our so that the their then there these this to was we what
+when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[str, int]] = defaultdict(dict)
+        self._lengths: dict[str, int] = {}
+        self._chunks: dict[str, tuple[str, dict]] = {}
+        self._by_doc: dict[str, set[str]] = defaultdict(set)
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def _remove_chunk(self, chunk_id: str):
+        text, meta = self._chunks.pop(chunk_id)
+        for term in set(tokenize(text)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(chunk_id)
+        doc_chunks = self._by_doc.get(meta.get("doc_id"))
+        if doc_chunks is not None:
+            doc_chunks.discard(chunk_id)
+            if not doc_chunks:
+                del self._by_doc[meta.get("doc_id")]
+
+    def add(self, ids: list[str], documents: list[str], metadatas: list[dict]):
+        with self._lock:
+            for chunk_id, text, meta in zip(ids, documents, metadatas):
+                if chunk_id in self._chunks:
+                    self._remove_chunk(chunk_id)
+                terms = tokenize(text)
+                for term, tf in Counter(terms).items():
+                    self._postings[term][chunk_id] = tf
+                self._lengths[chunk_id] = len(terms)
+                self._total_length += len(terms)
+                self._chunks[chunk_id] = (text, meta)
+                self._by_doc[meta.get("doc_id")].add(chunk_id)
+
+    def remove_documents(self, doc_ids: list[str]):
+        with self._lock:
+            for doc_id in doc_ids:
+                for chunk_id in list(self._by_doc.get(doc_id, ())):
+                    self._remove_chunk(chunk_id)
+
+    def remove_chunks(self, chunk_ids: list[str]):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                if chunk_id in self._chunks:
+                    self._remove_chunk(chunk_id)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._chunks.clear()
+            self._by_doc.clear()
+            self._total_length = 0
+
+    def search(self, query: str, k: int) -> tuple[list[dict], float]:
+        """Top-``k`` chunks by BM25.
+
+        Returns ``(hits, max_score)``. Each hit is a dict with ``id``, ``text``,
+        ``source``, ``doc_id``, ``chunk_index`` and raw ``bm25`` score.
+        ``max_score`` is the score a chunk matching every query term would get;
+        it is used to normalise.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            n = len(self._lengths)
+            if not terms or not n:
+                return [], 0.0
+            avgdl = self._total_length / n
+
+            scores: dict[str, float] = defaultdict(float)
+            max_score = 0.0
+            for term in terms:
+                postings = self._postings.get(term)
+                df = len(postings) if postings else 0
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                max_score += idf * (self.k1 + 1)
+                if not postings:
+                    continue
+                for chunk_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / avgdl)
+                    scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            top = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+            hits = []
+            for chunk_id, score in top:
+                text, meta = self._chunks[chunk_id]
+                hits.append({
+                    "id": chunk_id,
+                    "text": text,
+                    "source": meta.get("source", "unknown"),
+                    "doc_id": meta.get("doc_id"),
+                    "chunk_index": meta.get("chunk_index"),
+                    "bm25": score,
+                })
+        return hits, max_score
+
+
+_index: BM25Index | None = None
+
+
+def get_lexical_index() -> BM25Index:
+    global _index
+    if _index is None:
+        _index = BM25Index()
+    return _index
+
+
+def lexical_enabled() -> bool:
+    return get_settings().retrieval_mode in ("hybrid", "lexical_first")
+
+
+def index_chunks(ids: list[str], documents: list[str], metadatas: list[dict]):
+    if lexical_enabled():
+        get_lexical_index().add(ids, documents, metadatas)
+
+
+def unindex_documents(doc_ids: list[str]):
+    if lexical_enabled():
+        get_lexical_index().remove_documents(doc_ids)
+
+
+def unindex_chunks(chunk_ids: list[str]):
+    if lexical_enabled():
+        get_lexical_index().remove_chunks(chunk_ids)
+
+
+async def rebuild_lexical_index(page_size: int = 1000):
+    """Rebuild the index from the vector store (it is not persisted)."""
+    from src.db.chroma import get_async_collection
+
+    if not lexical_enabled():
+        return
+    index = get_lexical_index()
+    index.clear()
+    try:
+        collection = await get_async_collection()
+        offset = 0
+        while True:
+            page = await collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            index.add(page["ids"], page["documents"], page["metadatas"])
+            offset += len(page["ids"])
+    except Exception as e:
+        log.warning("Lexical index rebuild failed, keyword matches limited to new ingests: %s", e)
+        return
+    log.info("Lexical index rebuilt with %d chunks", len(index))
@@ -1,29 +1,41 @@
 import time
 import uuid
 import asyncio
-from functools import partial
+import contextlib
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Iterator
 
 from google import genai
 
 from src.config import get_settings
-from src.db.chroma import get_collection
-from src.db.sqlite import save_message, save_audit, get_conversation
+from src.db.chroma import collection_manager, get_collection, get_async_collection
+from src.db.sqlite import save_message, save_answer, get_recent_messages
 from src.rag.chunker import chunk_text
-from src.rag.embeddings import embed_texts
-from src.rag.retriever import retrieve
+from src.rag.cache import get_answer_cache
+from src.rag.context import build_context
+from src.rag.embeddings import EMBED_BATCH_SIZE, embed_texts, embed_texts_async, embed_query, embed_query_async
+from src.rag.lexical import index_chunks, unindex_documents
+from src.rag.retriever import retrieve, retrieve_async, lexical_fast_path
+from src.rag.singleflight import SingleFlight
 from src.models.chat import ChatResponse, Citation
 from src.observability.logger import get_logger
 from src.observability.metrics import (
-    LLM_REQUESTS, LLM_TOKENS_PROMPT, LLM_TOKENS_COMPLETION, LLM_LATENCY,
+    LLM_REQUESTS, LLM_TOKENS_PROMPT, LLM_TOKENS_PROMPT_SAVED, LLM_TOKENS_COMPLETION, LLM_TOKENS_COALESCED, LLM_LATENCY,
+    LLM_TIME_TO_FIRST_TOKEN, SEMANTIC_CACHE_REQUESTS,
     RAG_RETRIEVAL_LATENCY, RAG_RETRIEVAL_SCORE, RAG_CHUNKS_RETRIEVED,
     RESPONSE_CONFIDENCE, DOCUMENTS_INGESTED, CHUNKS_CREATED, INGESTION_LATENCY,
-    EMBEDDING_LATENCY, EMBEDDING_REQUESTS, CONVERSATIONS_TOTAL, ACTIVE_SESSIONS,
+    EMBEDDING_LATENCY, CONVERSATIONS_TOTAL, ACTIVE_SESSIONS,
 )
+from src.observability.spans import current_trace, span
 
 log = get_logger(__name__)
 
 _client: genai.Client | None = None
 
+# Identical concurrent questions share these (see chat_coalesce_policy).
+_generations = SingleFlight("generate")
+_retrievals = SingleFlight("retrieve")
+
 SYSTEM_PROMPT = """You are a helpful IT helpdesk assistant. Answer questions using ONLY the provided context.
 If the context doesn't contain enough information, say so honestly.
 Be concise and professional. Cite the source documents when possible.
@@ -40,95 +52,377 @@ def _get_client() -> genai.Client:
     global _client
     if _client is None:
         settings = get_settings()
-        _client = genai.Client(api_key=settings.gemini_api_key)
+        _client = genai.Client(
+            api_key=settings.gemini_api_key,
+            http_options=genai.types.HttpOptions(base_url=settings.gemini_base_url)
+            if settings.gemini_base_url else None,
+        )
     return _client
 
 
-def ingest_document(doc_id: str, filename: str, content: str) -> int:
+def _next_batch(chunks: Iterator[str]) -> list[str]:
+    return list(islice(chunks, EMBED_BATCH_SIZE))
+
+
+def ingest_chunks(doc_id: str, filename: str, chunks: Iterable[str],
+                  start: int = 0, progress: Callable[[int], None] | None = None) -> int:
+    """Embed and store ``chunks`` one embedding batch at a time.
+
+    ``chunks`` may be a generator over a file or upload stream, so memory is
+    bounded by the batch size. ``start`` skips chunks already stored by an
+    interrupted run (chunks are upserted, so redoing a batch is harmless);
+    ``progress`` is called with the number of chunks stored after each
+    batch. If a batch fails, chunks already stored for the document are
+    removed again.
+    """
     ingest_start = time.perf_counter()
+    it = islice(chunks, start, None)
+    collection = None
+    count, embed_time = start, 0.0
+    try:
+        while True:
+            with span("chunk"):
+                batch = _next_batch(it)
+            if not batch:
+                break
+            collection = collection or get_collection()
+
+            embed_start = time.perf_counter()
+            with span("embed", chunks=len(batch)):
+                embeddings = embed_texts(batch)
+            embed_time += time.perf_counter() - embed_start
+
+            ids = [f"{doc_id}_chunk_{i}" for i in range(count, count + len(batch))]
+            metadatas = [
+                {"source": filename, "chunk_index": i, "doc_id": doc_id}
+                for i in range(count, count + len(batch))
+            ]
+            with span("upsert", chunks=len(batch)):
+                collection.upsert(ids=ids, embeddings=embeddings, documents=batch, metadatas=metadatas)
+                index_chunks(ids, batch, metadatas)
+            count += len(batch)
+            if progress:
+                progress(count)
+    except Exception:
+        if count:
+            delete_document_chunks(doc_id)
+        raise
+    if not count:
+        return 0
+
+    EMBEDDING_LATENCY.observe(embed_time)
+    collection_manager.refresh_count()
+    _record_ingest(filename, count, ingest_start)
+    return count
+
+
+async def ingest_chunks_async(doc_id: str, filename: str, chunks: Iterable[str], start: int = 0,
+                              progress: Callable[[int], Awaitable[None]] | None = None) -> int:
+    """Async ``ingest_chunks``.
 
-    chunks = chunk_text(content)
-    if not chunks:
+    Batches are pulled from ``chunks`` in a worker thread (the generator may
+    be reading a file), the next one while the current one is embedded. On
+    cancellation the stored chunks are kept so the ingest can be resumed.
+    """
+    ingest_start = time.perf_counter()
+    it = islice(chunks, start, None)
+    collection = None
+    count, embed_time = start, 0.0
+    pending = asyncio.ensure_future(asyncio.to_thread(_next_batch, it))
+    try:
+        while True:
+            with span("chunk"):  # time spent waiting on the prefetch
+                batch = await pending
+            if not batch:
+                break
+            pending = asyncio.ensure_future(asyncio.to_thread(_next_batch, it))
+            collection = collection or await get_async_collection()
+
+            embed_start = time.perf_counter()
+            with span("embed", chunks=len(batch)):
+                embeddings = await embed_texts_async(batch)
+            embed_time += time.perf_counter() - embed_start
+
+            ids = [f"{doc_id}_chunk_{i}" for i in range(count, count + len(batch))]
+            metadatas = [
+                {"source": filename, "chunk_index": i, "doc_id": doc_id}
+                for i in range(count, count + len(batch))
+            ]
+            with span("upsert", chunks=len(batch)):
+                await collection.upsert(ids=ids, embeddings=embeddings, documents=batch, metadatas=metadatas)
+                index_chunks(ids, batch, metadatas)
+            count += len(batch)
+            if progress:
+                await progress(count)
+    except BaseException as e:
+        # The generator must not be closed while the thread is still reading it.
+        with contextlib.suppress(BaseException):
+            await asyncio.shield(pending)
+        if count and not isinstance(e, asyncio.CancelledError):
+            await delete_document_chunks_async(doc_id)
+        raise
+    if not count:
         return 0
 
-    collection = get_collection()
+    EMBEDDING_LATENCY.observe(embed_time)
+    await collection_manager.refresh_count_async()
+    _record_ingest(filename, count, ingest_start)
+    return count
 
-    embed_start = time.perf_counter()
-    embeddings = embed_texts(chunks)
-    EMBEDDING_LATENCY.observe(time.perf_counter() - embed_start)
-    EMBEDDING_REQUESTS.labels(status="success").inc()
 
-    ids = [f"{doc_id}_chunk_{i}" for i in range(len(chunks))]
-    metadatas = [{"source": filename, "chunk_index": i, "doc_id": doc_id} for i in range(len(chunks))]
+def ingest_document(doc_id: str, filename: str, content: str) -> int:
+    return ingest_chunks(doc_id, filename, chunk_text(content))
+
+
+async def ingest_document_async(doc_id: str, filename: str, content: str) -> int:
+    return await ingest_chunks_async(doc_id, filename, chunk_text(content))
 
-    collection.add(
-        ids=ids,
-        embeddings=embeddings,
-        documents=chunks,
-        metadatas=metadatas,
-    )
+
+def _record_ingest(filename: str, chunk_count: int, ingest_start: float):
+    get_answer_cache().invalidate()
 
     DOCUMENTS_INGESTED.inc()
-    CHUNKS_CREATED.inc(len(chunks))
+    CHUNKS_CREATED.inc(chunk_count)
     INGESTION_LATENCY.observe(time.perf_counter() - ingest_start)
 
-    log.info("Ingested %d chunks from %s", len(chunks), filename)
-    return len(chunks)
+    log.info("Ingested %d chunks from %s", chunk_count, filename)
 
 
 def delete_document_chunks(doc_id: str):
     collection = get_collection()
     try:
         collection.delete(where={"doc_id": doc_id})
+        collection_manager.refresh_count()
+        unindex_documents([doc_id])
+    except Exception:
+        log.warning("Could not delete chunks for doc %s", doc_id)
+    get_answer_cache().invalidate()
+
+
+async def delete_document_chunks_async(doc_id: str):
+    collection = await get_async_collection()
+    try:
+        await collection.delete(where={"doc_id": doc_id})
+        await collection_manager.refresh_count_async()
+        unindex_documents([doc_id])
     except Exception:
         log.warning("Could not delete chunks for doc %s", doc_id)
+    get_answer_cache().invalidate()
+
+
+def _build_system_prompt(context_docs: list[dict], history_text: str) -> str:
+    context_text, tokens_saved = build_context(context_docs)
+    LLM_TOKENS_PROMPT_SAVED.inc(tokens_saved)
 
+    return SYSTEM_PROMPT.format(context=context_text, history=history_text)
 
-def _sync_retrieve_and_generate(message: str, history_text: str) -> tuple:
-    """Run sync retrieval + Gemini call in a thread to avoid blocking the event loop."""
+
+def _generation_config(system: str) -> genai.types.GenerateContentConfig:
     settings = get_settings()
+    return genai.types.GenerateContentConfig(
+        system_instruction=system,
+        temperature=settings.gemini_temperature,
+        max_output_tokens=settings.gemini_max_tokens,
+    )
 
-    # ── Retrieval phase ───────────────────────────────────────────────
-    retrieval_start = time.perf_counter()
-    context_docs = retrieve(message)
+
+def _usage_tokens(usage) -> tuple[int, int]:
+    if not usage:
+        return 0, 0
+    return usage.prompt_token_count or 0, usage.candidates_token_count or 0
+
+
+def _record_retrieval(context_docs: list[dict], retrieval_start: float):
     RAG_RETRIEVAL_LATENCY.observe(time.perf_counter() - retrieval_start)
     RAG_CHUNKS_RETRIEVED.observe(len(context_docs))
 
     for doc in context_docs:
         RAG_RETRIEVAL_SCORE.observe(doc["score"])
 
-    context_text = "\n\n".join(
-        f"[{d['source']}] (score: {d['score']}): {d['text']}" for d in context_docs
-    ) if context_docs else "No relevant documents found in knowledge base."
 
-    system = SYSTEM_PROMPT.format(context=context_text, history=history_text)
+def _sync_retrieve(message: str, cacheable: bool) -> tuple:
+    """Embed + retrieve, consulting the semantic cache first when allowed.
+
+    Returns ``(context_docs, query_embedding, cache_hit)``; ``cache_hit`` is a
+    ``CachedAnswer`` or ``None``. ``query_embedding`` is ``None`` when the
+    lexical fast path answered without one.
+    """
+    cache = get_answer_cache()
+
+    retrieval_start = time.perf_counter()
+    if get_settings().retrieval_mode == "lexical_first":
+        with span("lexical"):
+            context_docs = lexical_fast_path(message)
+        if context_docs is not None:
+            _record_retrieval(context_docs, retrieval_start)
+            return context_docs, None, None
+
+    query_embedding = None
+    if cacheable:
+        with span("embed_query"):
+            query_embedding = embed_query(message)
+        with span("cache_lookup"):
+            hit = cache.lookup(query_embedding)
+        if hit is not None:
+            SEMANTIC_CACHE_REQUESTS.labels(result="hit").inc()
+            log.info("Semantic cache hit (similarity %.3f)", hit.similarity)
+            return hit.context_docs, query_embedding, hit
+        SEMANTIC_CACHE_REQUESTS.labels(result="miss").inc()
+
+    with span("retrieve"):
+        context_docs = retrieve(message, query_embedding)
+    _record_retrieval(context_docs, retrieval_start)
+    return context_docs, query_embedding, None
+
+
+async def _retrieve_async(message: str, cacheable: bool) -> tuple:
+    """Async ``_sync_retrieve``; same return shape."""
+    cache = get_answer_cache()
+
+    retrieval_start = time.perf_counter()
+    if get_settings().retrieval_mode == "lexical_first":
+        with span("lexical"):
+            context_docs = lexical_fast_path(message)
+        if context_docs is not None:
+            _record_retrieval(context_docs, retrieval_start)
+            return context_docs, None, None
+
+    query_embedding = None
+    if cacheable:
+        with span("embed_query"):
+            query_embedding = await embed_query_async(message)
+        with span("cache_lookup"):
+            hit = cache.lookup(query_embedding)
+        if hit is not None:
+            SEMANTIC_CACHE_REQUESTS.labels(result="hit").inc()
+            log.info("Semantic cache hit (similarity %.3f)", hit.similarity)
+            return hit.context_docs, query_embedding, hit
+        SEMANTIC_CACHE_REQUESTS.labels(result="miss").inc()
+
+    with span("retrieve"):
+        context_docs = await retrieve_async(message, query_embedding)
+    _record_retrieval(context_docs, retrieval_start)
+    return context_docs, query_embedding, None
+
+
+def _sync_retrieve_and_generate(message: str, history_text: str, cacheable: bool = False) -> tuple:
+    """Run sync retrieval + Gemini call in a thread to avoid blocking the event loop.
+
+    Returns ``(answer, prompt_tokens, completion_tokens, context_docs, cache_hit)``.
+    """
+    settings = get_settings()
+    cache = get_answer_cache()
+    generation = cache.generation
+
+    # ── Retrieval phase ───────────────────────────────────────────────
+    context_docs, query_embedding, hit = _sync_retrieve(message, cacheable)
+    if hit is not None:
+        return hit.answer, 0, 0, context_docs, True
+
+    system = _build_system_prompt(context_docs, history_text)
 
     # ── Generation phase ──────────────────────────────────────────────
     gen_start = time.perf_counter()
     client = _get_client()
     try:
-        response = client.models.generate_content(
-            model=settings.gemini_model,
-            contents=message,
-            config=genai.types.GenerateContentConfig(
-                system_instruction=system,
-                temperature=settings.gemini_temperature,
-                max_output_tokens=settings.gemini_max_tokens,
-            ),
-        )
+        with span("llm", model=settings.gemini_model):
+            response = client.models.generate_content(
+                model=settings.gemini_model,
+                contents=message,
+                config=_generation_config(system),
+            )
         LLM_LATENCY.observe(time.perf_counter() - gen_start)
         LLM_REQUESTS.labels(model=settings.gemini_model, status="success").inc()
     except Exception as e:
         LLM_REQUESTS.labels(model=settings.gemini_model, status="error").inc()
         raise
 
-    return response, context_docs
+    answer = response.text or "I'm sorry, I couldn't generate a response."
+    prompt_tokens, completion_tokens = _usage_tokens(response.usage_metadata)
 
+    if query_embedding is not None and response.text:
+        cache.store(query_embedding, answer, context_docs, generation)
 
-async def chat(message: str, session_id: str | None = None,
-               guardrails_triggered: list[str] | None = None) -> ChatResponse:
+    return answer, prompt_tokens, completion_tokens, context_docs, False
+
+
+async def _retrieve_and_generate_async(message: str, history_text: str, cacheable: bool = False) -> tuple:
+    """Async ``_sync_retrieve_and_generate``: no worker thread is held while waiting on I/O."""
+    settings = get_settings()
+    cache = get_answer_cache()
+    generation = cache.generation
+
+    # ── Retrieval phase ───────────────────────────────────────────────
+    context_docs, query_embedding, hit = await _retrieve_async(message, cacheable)
+    if hit is not None:
+        return hit.answer, 0, 0, context_docs, True
+
+    system = _build_system_prompt(context_docs, history_text)
+
+    # ── Generation phase ──────────────────────────────────────────────
+    gen_start = time.perf_counter()
+    client = _get_client()
+    try:
+        with span("llm", model=settings.gemini_model):
+            response = await client.aio.models.generate_content(
+                model=settings.gemini_model,
+                contents=message,
+                config=_generation_config(system),
+            )
+        LLM_LATENCY.observe(time.perf_counter() - gen_start)
+        LLM_REQUESTS.labels(model=settings.gemini_model, status="success").inc()
+    except Exception:
+        LLM_REQUESTS.labels(model=settings.gemini_model, status="error").inc()
+        raise
+
+    answer = response.text or "I'm sorry, I couldn't generate a response."
+    prompt_tokens, completion_tokens = _usage_tokens(response.usage_metadata)
+
+    if query_embedding is not None and response.text:
+        cache.store(query_embedding, answer, context_docs, generation)
+
+    return answer, prompt_tokens, completion_tokens, context_docs, False
+
+
+async def _retrieve(message: str, cacheable: bool) -> tuple:
+    if get_settings().async_pipeline:
+        return await _retrieve_async(message, cacheable)
+    return await asyncio.to_thread(_sync_retrieve, message, cacheable)
+
+
+async def _retrieve_and_generate(message: str, history_text: str, cacheable: bool) -> tuple:
+    if get_settings().async_pipeline:
+        return await _retrieve_and_generate_async(message, history_text, cacheable)
+    # Sync fallback: run retrieval + generation in a thread pool (to_thread
+    # carries the request's trace context into the worker)
+    return await asyncio.to_thread(_sync_retrieve_and_generate, message, history_text, cacheable)
+
+
+def _flight_key(message: str, cacheable: bool, standalone: bool, retrieval_only: bool = False) -> tuple | None:
+    """Key under which concurrent requests share a retrieval (and generation), or ``None``.
+
+    Questions match after lower-casing, collapsing whitespace and dropping
+    trailing punctuation. Generation is only shared between standalone
+    questions unless ``chat_coalesce_policy`` is "query"; ``retrieval_only``
+    flights ignore history, which retrieval does not use. The answer-cache
+    generation is part of the key, so a request arriving after an ingest
+    never joins a flight started before it.
+    """
+    policy = get_settings().chat_coalesce_policy
+    if policy == "off" or (policy == "standalone" and not standalone and not retrieval_only):
+        return None
+    question = " ".join(message.lower().split()).rstrip("?!. ")
+    return question, cacheable, get_answer_cache().generation
+
+
+async def _start_turn(message: str, session_id: str | None,
+                      guardrails_triggered: list[str] | None) -> tuple[str, str, bool, bool]:
+    """Persist the user message and load history.
+
+    Returns ``(session_id, history_text, cacheable, standalone)``;
+    ``standalone`` means the session has no earlier messages.
+    """
     settings = get_settings()
-    start = time.perf_counter()
 
     is_new_session = session_id is None
     if not session_id:
@@ -138,31 +432,25 @@ async def chat(message: str, session_id: str | None = None,
         CONVERSATIONS_TOTAL.inc()
         ACTIVE_SESSIONS.inc()
 
-    await save_message(session_id, "user", message)
+    with span("persist"):
+        await save_message(session_id, "user", message, new_session=is_new_session)
 
-    history_rows = await get_conversation(session_id)
+    with span("history_load"):
+        history_rows = await get_recent_messages(session_id)
     history_lines = []
-    for msg in history_rows[-10:]:
+    for msg in history_rows:
         history_lines.append(f"{msg['role']}: {msg['content']}")
     history_text = "\n".join(history_lines) if history_lines else "No previous messages."
 
-    # Run sync retrieval + generation in a thread pool
-    loop = asyncio.get_event_loop()
-    response, context_docs = await loop.run_in_executor(
-        None, partial(_sync_retrieve_and_generate, message, history_text)
-    )
+    # Only standalone questions are answered from the semantic cache: a
+    # follow-up depends on its history, and flagged messages may carry PII.
+    standalone = len(history_rows) <= 1
+    cacheable = settings.semantic_cache_enabled and standalone and not guardrails_triggered
+    return session_id, history_text, cacheable, standalone
 
-    answer = response.text or "I'm sorry, I couldn't generate a response."
-    prompt_tokens = 0
-    completion_tokens = 0
-    if response.usage_metadata:
-        prompt_tokens = response.usage_metadata.prompt_token_count or 0
-        completion_tokens = response.usage_metadata.candidates_token_count or 0
-        LLM_TOKENS_PROMPT.inc(prompt_tokens)
-        LLM_TOKENS_COMPLETION.inc(completion_tokens)
-    tokens_used = prompt_tokens + completion_tokens
 
-    citations = [
+def _citations(context_docs: list[dict]) -> list[Citation]:
+    return [
         Citation(
             document_name=d["source"],
             chunk_text=d["text"][:200],
@@ -171,6 +459,19 @@ async def chat(message: str, session_id: str | None = None,
         for d in context_docs[:3]
     ]
 
+
+async def _finish_turn(message: str, session_id: str, answer: str,
+                       prompt_tokens: int, completion_tokens: int,
+                       context_docs: list[dict], cache_hit: bool,
+                       guardrails_triggered: list[str] | None,
+                       start: float) -> ChatResponse:
+    """Record token/confidence metrics, persist the answer and audit entry."""
+    LLM_TOKENS_PROMPT.inc(prompt_tokens)
+    LLM_TOKENS_COMPLETION.inc(completion_tokens)
+    tokens_used = prompt_tokens + completion_tokens
+
+    citations = _citations(context_docs)
+
     confidence = round(
         sum(d["score"] for d in context_docs) / len(context_docs), 3
     ) if context_docs else 0.0
@@ -178,21 +479,21 @@ async def chat(message: str, session_id: str | None = None,
 
     latency_ms = round((time.perf_counter() - start) * 1000, 2)
 
-    citation_dicts = [c.model_dump() for c in citations]
-    await save_message(session_id, "assistant", answer, citation_dicts, confidence)
-
     triggered = guardrails_triggered or []
-    sources = [d["source"] for d in context_docs]
-    await save_audit(
-        session_id=session_id,
-        query=message,
-        response=answer,
-        tokens_used=tokens_used,
-        latency_ms=latency_ms,
-        sources=sources,
-        guardrails_triggered=triggered,
-        confidence=confidence,
-    )
+    trace = current_trace()
+    with span("persist"):
+        await save_answer(
+            session_id=session_id,
+            query=message,
+            response=answer,
+            citations=[c.model_dump() for c in citations],
+            tokens_used=tokens_used,
+            latency_ms=latency_ms,
+            sources=[d["source"] for d in context_docs],
+            guardrails_triggered=triggered,
+            confidence=confidence,
+            stages=trace.stages() if trace is not None else None,
+        )
 
     return ChatResponse(
         response=answer,
@@ -202,4 +503,108 @@ async def chat(message: str, session_id: str | None = None,
         tokens_used=tokens_used,
         latency_ms=latency_ms,
         guardrails_triggered=triggered,
+        cached=cache_hit,
+    )
+
+
+async def chat(message: str, session_id: str | None = None,
+               guardrails_triggered: list[str] | None = None) -> ChatResponse:
+    start = time.perf_counter()
+
+    session_id, history_text, cacheable, standalone = await _start_turn(message, session_id, guardrails_triggered)
+
+    result, shared = await _generations.do(
+        _flight_key(message, cacheable, standalone),
+        lambda: _retrieve_and_generate(message, history_text, cacheable),
+    )
+    answer, prompt_tokens, completion_tokens, context_docs, cache_hit = result
+    if shared:
+        # Spent (and counted) once, by the request that ran the generation.
+        LLM_TOKENS_COALESCED.inc(prompt_tokens + completion_tokens)
+        prompt_tokens = completion_tokens = 0
+
+    return await _finish_turn(
+        message, session_id, answer, prompt_tokens, completion_tokens,
+        context_docs, cache_hit, guardrails_triggered, start,
+    )
+
+
+async def chat_stream(message: str, session_id: str | None = None,
+                      guardrails_triggered: list[str] | None = None) -> AsyncIterator[tuple[str, dict]]:
+    """Streaming variant of ``chat``.
+
+    Yields ``(event, data)`` pairs: one ``citations`` event once retrieval is
+    done, ``token`` events as text deltas arrive from Gemini, and a final
+    ``done`` event carrying the full ``ChatResponse`` after it is persisted.
+    """
+    settings = get_settings()
+    start = time.perf_counter()
+
+    session_id, history_text, cacheable, standalone = await _start_turn(message, session_id, guardrails_triggered)
+
+    # Token streams are not shared, only the retrieval before them.
+    cache = get_answer_cache()
+    generation = cache.generation
+    (context_docs, query_embedding, hit), _ = await _retrievals.do(
+        _flight_key(message, cacheable, standalone, retrieval_only=True),
+        lambda: _retrieve(message, cacheable),
+    )
+
+    yield "citations", {
+        "session_id": session_id,
+        "citations": [c.model_dump() for c in _citations(context_docs)],
+    }
+
+    if hit is not None:
+        LLM_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start)
+        yield "token", {"text": hit.answer}
+        result = await _finish_turn(
+            message, session_id, hit.answer, 0, 0,
+            context_docs, True, guardrails_triggered, start,
+        )
+        yield "done", result.model_dump(mode="json")
+        return
+
+    system = _build_system_prompt(context_docs, history_text)
+
+    gen_start = time.perf_counter()
+    client = _get_client()
+    parts: list[str] = []
+    usage = None
+    try:
+        with span("llm", model=settings.gemini_model):
+            stream = await client.aio.models.generate_content_stream(
+                model=settings.gemini_model,
+                contents=message,
+                config=_generation_config(system),
+            )
+            async for chunk in stream:
+                if chunk.usage_metadata:
+                    usage = chunk.usage_metadata
+                text = chunk.text
+                if not text:
+                    continue
+                if not parts:
+                    LLM_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start)
+                parts.append(text)
+                yield "token", {"text": text}
+        LLM_LATENCY.observe(time.perf_counter() - gen_start)
+        LLM_REQUESTS.labels(model=settings.gemini_model, status="success").inc()
+    except Exception:
+        LLM_REQUESTS.labels(model=settings.gemini_model, status="error").inc()
+        raise
+
+    full_text = "".join(parts)
+    answer = full_text or "I'm sorry, I couldn't generate a response."
+    if not full_text:
+        yield "token", {"text": answer}
+    prompt_tokens, completion_tokens = _usage_tokens(usage)
+
+    if query_embedding is not None and full_text:
+        cache.store(query_embedding, answer, context_docs, generation)
+
+    result = await _finish_turn(
+        message, session_id, answer, prompt_tokens, completion_tokens,
+        context_docs, False, guardrails_triggered, start,
     )
+    yield "done", result.model_dump(mode="json")
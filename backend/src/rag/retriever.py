@@ -1,26 +1,31 @@
 from src.config import get_settings
-from src.db.chroma import get_collection
-from src.rag.embeddings import embed_query
+from src.db.chroma import collection_manager, get_collection, get_async_collection
+from src.rag.embeddings import embed_query, embed_query_async
+from src.rag.lexical import get_lexical_index
 from src.observability.logger import get_logger
+from src.observability.metrics import LEXICAL_FAST_PATH
 
 log = get_logger(__name__)
 
+# Fields of a retrieved chunk handed to the pipeline; doc_id and chunk_index
+# let the context builder merge neighbouring chunks.
+_CONTEXT_KEYS = ("text", "score", "source", "doc_id", "chunk_index")
 
-def retrieve(query: str) -> list[dict]:
-    settings = get_settings()
-    collection = get_collection()
 
-    if collection.count() == 0:
-        log.info("Collection is empty, skipping retrieval")
-        return []
+def _query_kwargs(query_embedding: list[float]) -> dict:
+    settings = get_settings()
+    n_results = settings.rag_top_k
+    if settings.retrieval_mode != "vector":
+        n_results *= settings.hybrid_candidate_factor
+    return {
+        "query_embeddings": [query_embedding],
+        "n_results": n_results,
+        "include": ["documents", "metadatas", "distances"],
+    }
 
-    query_embedding = embed_query(query)
 
-    results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=settings.rag_top_k,
-        include=["documents", "metadatas", "distances"],
-    )
+def _to_docs(results: dict) -> list[dict]:
+    settings = get_settings()
 
     docs = []
     for i, doc in enumerate(results["documents"][0]):
@@ -32,11 +37,105 @@ def retrieve(query: str) -> list[dict]:
             continue
 
         docs.append({
+            "id": results["ids"][0][i],
             "text": doc,
             "score": round(score, 4),
             "source": metadata.get("source", "unknown"),
+            "doc_id": metadata.get("doc_id"),
+            "chunk_index": metadata.get("chunk_index"),
         })
 
     docs.sort(key=lambda d: d["score"], reverse=True)
-    log.info("Retrieved %d relevant chunks for query", len(docs))
     return docs
+
+
+def _lexical_docs(query: str, k: int) -> list[dict]:
+    hits, max_score = get_lexical_index().search(query, k)
+    return [
+        {"id": h["id"], "text": h["text"], "score": round(h["bm25"] / max_score, 4), "source": h["source"],
+         "doc_id": h["doc_id"], "chunk_index": h["chunk_index"]}
+        for h in hits
+    ]
+
+
+def _fuse(vector_docs: list[dict], lexical_docs: list[dict], top_k: int) -> list[dict]:
+    """Reciprocal-rank fusion of the vector and BM25 rankings.
+
+    A chunk's ``score`` stays its cosine similarity when the vector search
+    found it, so confidence and ``rag_min_score`` keep their meaning; chunks
+    only BM25 found carry their normalised BM25 score.
+    """
+    k = get_settings().rrf_k
+    fused: dict[str, float] = {}
+    docs: dict[str, dict] = {}
+    for ranking in (vector_docs, lexical_docs):
+        for rank, doc in enumerate(ranking):
+            fused[doc["id"]] = fused.get(doc["id"], 0.0) + 1.0 / (k + rank + 1)
+            docs.setdefault(doc["id"], doc)
+    ranked = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return [docs[chunk_id] for chunk_id in ranked]
+
+
+def _finish(query: str, vector_docs: list[dict]) -> list[dict]:
+    settings = get_settings()
+    if settings.retrieval_mode == "vector":
+        docs = vector_docs[: settings.rag_top_k]
+    else:
+        lexical = _lexical_docs(query, settings.rag_top_k * settings.hybrid_candidate_factor)
+        docs = _fuse(vector_docs, lexical, settings.rag_top_k)
+    log.info("Retrieved %d relevant chunks for query", len(docs))
+    return [{k: d[k] for k in _CONTEXT_KEYS} for d in docs]
+
+
+def lexical_fast_path(query: str) -> list[dict] | None:
+    """Answer retrieval from BM25 alone when its top hit is decisive.
+
+    Decisive means the top chunk's normalised score reaches
+    ``lexical_first_min_score`` and beats the runner-up by
+    ``lexical_first_margin``. Returns ``None`` otherwise, and the caller
+    falls back to hybrid retrieval (which needs the query embedding).
+    """
+    settings = get_settings()
+    if collection_manager.count == 0:
+        return None
+    docs = _lexical_docs(query, settings.rag_top_k)
+    if not docs:
+        LEXICAL_FAST_PATH.labels(result="fallback").inc()
+        return None
+
+    top = docs[0]["score"]
+    runner_up = docs[1]["score"] if len(docs) > 1 else 0.0
+    if top < settings.lexical_first_min_score or top < runner_up * settings.lexical_first_margin:
+        LEXICAL_FAST_PATH.labels(result="fallback").inc()
+        return None
+
+    LEXICAL_FAST_PATH.labels(result="decisive").inc()
+    docs = [d for d in docs if d["score"] >= settings.rag_min_score]
+    log.info("Lexical fast path: %d chunks, top score %.3f", len(docs), top)
+    return [{k: d[k] for k in _CONTEXT_KEYS} for d in docs]
+
+
+def retrieve(query: str, query_embedding: list[float] | None = None) -> list[dict]:
+    if collection_manager.count == 0:
+        log.info("Collection is empty, skipping retrieval")
+        return []
+
+    collection = get_collection()
+
+    if query_embedding is None:
+        query_embedding = embed_query(query)
+
+    return _finish(query, _to_docs(collection.query(**_query_kwargs(query_embedding))))
+
+
+async def retrieve_async(query: str, query_embedding: list[float] | None = None) -> list[dict]:
+    if collection_manager.count == 0:
+        log.info("Collection is empty, skipping retrieval")
+        return []
+
+    collection = await get_async_collection()
+
+    if query_embedding is None:
+        query_embedding = await embed_query_async(query)
+
+    return _finish(query, _to_docs(await collection.query(**_query_kwargs(query_embedding))))
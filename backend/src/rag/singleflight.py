@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+from src.observability.metrics import CHAT_COALESCED
+from src.observability.spans import span
+
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers with the same key.
+
+    The first caller for a key starts ``fn()`` as a task; callers arriving
+    while it runs await the same task instead of starting their own. The key
+    is forgotten as soon as the task finishes, so results are never reused
+    afterwards (that is the semantic cache's job). A failure reaches every
+    waiter. A waiter that is cancelled (a client disconnecting) does not
+    cancel the call for the others.
+
+    Flights are per process: with several workers, each shares its own.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage  # CHAT_COALESCED label
+        self._flights: dict[Hashable, asyncio.Task] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def do(self, key: Hashable | None, fn: Callable[[], Awaitable]) -> tuple[object, bool]:
+        """Return ``(result, shared)``; ``shared`` is true for callers that joined another's call.
+
+        A ``None`` key runs ``fn`` unshared.
+        """
+        if key is None:
+            return await fn(), False
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Bound to a new event loop (e.g. a fresh asyncio.run): start clean.
+            self._loop = loop
+            self._flights = {}
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            CHAT_COALESCED.labels(stage=self.stage).inc()
+            with span("coalesced", stage=self.stage):
+                return await asyncio.shield(flight), True
+
+        flight = loop.create_task(fn())
+        self._flights[key] = flight
+        flight.add_done_callback(lambda task: self._finished(key, task))
+        return await asyncio.shield(flight), False
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every waiter went away
@@ -0,0 +1,107 @@
+"""Run the API under uvicorn with one or more worker processes.
+
+    python -m src.serve --workers 4 --host 0.0.0.0 --port 8001
+
+(or ``WORKERS=4``). With more than one worker, Prometheus metrics switch to
+multiprocess mode: each worker writes its samples to
+``PROMETHEUS_MULTIPROC_DIR`` (``data/prometheus`` unless configured), the
+directory is emptied here before the workers start, and ``/metrics`` on any
+worker reports the whole server. Live gauges of crashed workers are dropped
+at the next scrape.
+
+Workers share SQLite (messages, audit log, ingest jobs, embedding cache)
+and Chroma, but not their memory. State that would go stale when another
+worker writes is therefore refused or switched off here for every worker:
+
+- ``VECTOR_BACKEND=numpy`` is refused: each worker would search its own
+  copy, and the last snapshot written would drop other workers' ingests.
+- The semantic answer cache is disabled: an ingest only invalidates the
+  worker that ran it.
+- The session history cache is disabled: it would miss turns served by
+  other workers.
+- ``RETRIEVAL_MODE`` falls back to ``vector``: the BM25 index is only
+  updated by the worker that ingests or deletes.
+
+Still per worker, but only less effective: the rate limiter unless
+``RATE_LIMIT_BACKEND=sqlite``, chat single-flight, and query-embedding
+micro-batching. Launching ``uvicorn --workers`` directly skips these checks.
+
+Behind a reverse proxy, list its address in ``FORWARDED_ALLOW_IPS`` so
+clients are identified (and rate limited) by their own address rather than
+all sharing the proxy's.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+from pathlib import Path
+
+import uvicorn
+
+from src.config import Settings, get_settings
+from src.observability.logger import get_logger, setup_logging
+
+log = get_logger(__name__)
+
+# Environment overrides that switch off per-process state (see above).
+_MULTI_WORKER_ENV = {
+    "SEMANTIC_CACHE_ENABLED": ("semantic_cache_enabled", False),
+    "HISTORY_CACHE_SESSIONS": ("history_cache_sessions", 0),
+    "RETRIEVAL_MODE": ("retrieval_mode", "vector"),
+}
+
+
+def prepare_multiprocess_dir(path: str):
+    """Start every launch with an empty metrics directory (stale pids could be reused)."""
+    shutil.rmtree(path, ignore_errors=True)
+    Path(path).mkdir(parents=True, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(Path(path).resolve())
+
+
+def multi_worker_env(settings: Settings) -> dict[str, str]:
+    """Environment for workers that do not share memory; raises ``ValueError`` if unsupported."""
+    if settings.vector_backend == "numpy":
+        raise ValueError(
+            "VECTOR_BACKEND=numpy keeps vectors in each worker's memory; "
+            "run a single worker or use the chroma backend"
+        )
+    env = {}
+    for name, (field, value) in _MULTI_WORKER_ENV.items():
+        if getattr(settings, field) != value:
+            log.warning("Setting %s=%s for every worker: this state is not shared between workers", name, value)
+            env[name] = str(value).lower()
+    return env
+
+
+def main():
+    setup_logging()
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=settings.workers)
+    parser.add_argument("--forwarded-allow-ips", default=settings.forwarded_allow_ips,
+                        help="proxies trusted to set X-Forwarded-For (comma-separated IPs/networks)")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        try:
+            os.environ.update(multi_worker_env(settings))
+        except ValueError as e:
+            parser.error(str(e))
+
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or settings.prometheus_multiproc_dir
+    if args.workers > 1 and not multiproc_dir:
+        multiproc_dir = "data/prometheus"
+    if multiproc_dir:
+        prepare_multiprocess_dir(multiproc_dir)
+
+    uvicorn.run(
+        "src.main:app", host=args.host, port=args.port, workers=args.workers,
+        proxy_headers=True, forwarded_allow_ips=args.forwarded_allow_ips,
+    )
+
+
+if __name__ == "__main__":
+    main()
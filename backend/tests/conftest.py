@@ -0,0 +1,99 @@
+import types
+
+import pytest
+
+from src.config import get_settings
+
+
+@pytest.fixture
+def settings_env(monkeypatch):
+    """Set environment variables for ``get_settings()``; the cached settings are rebuilt."""
+    def apply(**values):
+        for name, value in values.items():
+            monkeypatch.setenv(name, str(value))
+        get_settings.cache_clear()
+        return get_settings()
+
+    yield apply
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+async def database(monkeypatch, settings_env, tmp_path):
+    """A fresh SQLite database; callers wait for their writes to commit."""
+    from src.db import history_cache, sqlite
+
+    monkeypatch.setattr(history_cache, "_history_cache", None)
+    monkeypatch.setattr(sqlite, "_rollups_cover_audit", False)
+    monkeypatch.setattr(sqlite, "_audit_count_cache", {})
+    settings_env(SQLITE_PATH=tmp_path / "audit.db", SQLITE_FLUSH_INTERVAL_MS=5, SQLITE_WRITE_DURABILITY="flush")
+    await sqlite.init_db()
+    yield sqlite
+    await sqlite.close_db()
+
+
+@pytest.fixture
+async def local_rag(monkeypatch, settings_env, tmp_path, database):
+    """The RAG pipeline on in-process parts: numpy vectors, the local embedder, no answers cached yet."""
+    from src.db import chroma
+    from src.rag import cache, embedders, lexical
+
+    settings_env(
+        VECTOR_BACKEND="numpy",
+        NUMPY_STORE_PATH=tmp_path / "vectors",
+        EMBEDDING_PROVIDER="local",
+        EMBEDDING_CACHE_PATH=tmp_path / "embeddings.db",
+        RAG_MIN_SCORE=0.05,
+    )
+    for module, name in [(embedders, "_embedder"), (cache, "_cache"), (lexical, "_index")]:
+        monkeypatch.setattr(module, name, None)
+    manager = chroma.collection_manager
+    for name in ("_collection", "_async_collection", "_local_store", "count"):
+        monkeypatch.setattr(manager, name, None)
+    yield manager
+
+
+class FakeGemini:
+    """Stands in for ``genai.Client``: every generation answers ``reply``, streamed in ``pieces``."""
+
+    def __init__(self, reply: str = "Restart the router, then sign in again.", pieces: int = 3):
+        self.reply = reply
+        self.pieces = pieces
+        self.calls: list[dict] = []
+        self.models = types.SimpleNamespace(generate_content=self._generate)
+        self.aio = types.SimpleNamespace(models=types.SimpleNamespace(
+            generate_content=self._generate_async,
+            generate_content_stream=self._stream,
+        ))
+
+    @staticmethod
+    def _usage(prompt: int, completion: int):
+        return types.SimpleNamespace(prompt_token_count=prompt, candidates_token_count=completion)
+
+    def _generate(self, **kwargs):
+        self.calls.append(kwargs)
+        return types.SimpleNamespace(text=self.reply, usage_metadata=self._usage(40, 10))
+
+    async def _generate_async(self, **kwargs):
+        return self._generate(**kwargs)
+
+    async def _stream(self, **kwargs):
+        self.calls.append(kwargs)
+        step = max(1, -(-len(self.reply) // self.pieces))
+        texts = [self.reply[i : i + step] for i in range(0, len(self.reply), step)]
+
+        async def chunks():
+            for i, text in enumerate(texts):
+                last = i == len(texts) - 1
+                yield types.SimpleNamespace(text=text, usage_metadata=self._usage(40, 10) if last else None)
+
+        return chunks()
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    from src.rag import pipeline
+
+    fake = FakeGemini()
+    monkeypatch.setattr(pipeline, "_client", fake)
+    return fake
@@ -0,0 +1,53 @@
+import asyncio
+
+from src.rag.batcher import EmbeddingBatcher
+
+
+class Recorder:
+    def __init__(self, fail: bool = False):
+        self.batches: list[list[str]] = []
+        self.fail = fail
+
+    async def __call__(self, texts):
+        self.batches.append(list(texts))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+        return [[float(len(t))] for t in texts]
+
+
+async def test_concurrent_calls_share_one_batch():
+    embed = Recorder()
+    batcher = EmbeddingBatcher(embed, window=0.01, max_size=32)
+    results = await asyncio.gather(*(batcher.submit(t) for t in ["a", "bb", "ccc"]))
+    assert results == [[1.0], [2.0], [3.0]]
+    assert embed.batches == [["a", "bb", "ccc"]]
+
+
+async def test_full_batch_is_sent_without_waiting():
+    embed = Recorder()
+    batcher = EmbeddingBatcher(embed, window=60, max_size=2)
+    results = await asyncio.wait_for(asyncio.gather(batcher.submit("a"), batcher.submit("bb")), 1)
+    assert results == [[1.0], [2.0]]
+    assert embed.batches == [["a", "bb"]]
+
+
+async def test_later_calls_start_a_new_batch():
+    embed = Recorder()
+    batcher = EmbeddingBatcher(embed, window=0.005, max_size=32)
+    await batcher.submit("a")
+    await asyncio.gather(batcher.submit("bb"), batcher.submit("ccc"))
+    assert embed.batches == [["a"], ["bb", "ccc"]]
+
+
+async def test_failure_reaches_every_caller():
+    batcher = EmbeddingBatcher(Recorder(fail=True), window=0.005, max_size=32)
+    results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+    assert [str(r) for r in results] == ["quota exceeded"] * 2
+
+
+def test_survives_a_new_event_loop():
+    embed = Recorder()
+    batcher = EmbeddingBatcher(embed, window=0.005, max_size=32)
+    assert asyncio.run(batcher.submit("a")) == [1.0]
+    assert asyncio.run(batcher.submit("bb")) == [2.0]
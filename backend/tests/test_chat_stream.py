@@ -0,0 +1,66 @@
+import pytest
+
+from src.rag import pipeline
+
+GUIDE = (
+    "VPN troubleshooting. If the VPN client shows error 809, restart the router and "
+    "sign in again. Password resets are handled by the self-service portal."
+)
+
+
+@pytest.fixture
+async def knowledge_base(local_rag):
+    await pipeline.ingest_document_async("vpn", "vpn.md", GUIDE)
+
+
+async def _events(message: str, session_id: str | None = None) -> list[tuple[str, dict]]:
+    return [event async for event in pipeline.chat_stream(message, session_id)]
+
+
+async def test_stream_emits_citations_tokens_then_done(knowledge_base, gemini, database):
+    events = await _events("How do I fix VPN error 809?")
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == "citations" and kinds[-1] == "done"
+    assert set(kinds[1:-1]) == {"token"} and len(kinds) == 2 + gemini.pieces
+
+    citations = events[0][1]
+    assert citations["citations"][0]["document_name"] == "vpn.md"
+    assert "".join(data["text"] for kind, data in events if kind == "token") == gemini.reply
+
+    done = events[-1][1]
+    assert done["response"] == gemini.reply
+    assert done["session_id"] == citations["session_id"]
+    assert done["tokens_used"] == 50 and not done["cached"]
+    assert "error 809" in gemini.calls[0]["config"].system_instruction
+
+    await database.flush_writes()
+    history = await database.get_conversation(done["session_id"])
+    assert [(m["role"], m["content"]) for m in history] == [
+        ("user", "How do I fix VPN error 809?"), ("assistant", gemini.reply),
+    ]
+
+
+async def test_repeated_question_streams_cached_answer(knowledge_base, gemini):
+    await _events("How do I fix VPN error 809?")
+    events = await _events("How do I fix VPN error 809?")
+    assert [kind for kind, _ in events] == ["citations", "token", "done"]
+    assert events[1][1]["text"] == gemini.reply
+    assert events[-1][1]["cached"] and events[-1][1]["tokens_used"] == 0
+    assert len(gemini.calls) == 1
+
+
+async def test_follow_up_sends_history_and_skips_cache(knowledge_base, gemini):
+    first = await _events("How do I fix VPN error 809?")
+    session_id = first[-1][1]["session_id"]
+    events = await _events("How do I fix VPN error 809?", session_id)
+    assert not events[-1][1]["cached"]
+    assert len(gemini.calls) == 2
+    assert f"assistant: {gemini.reply}" in gemini.calls[1]["config"].system_instruction
+
+
+async def test_empty_stream_gets_fallback_answer(knowledge_base, gemini):
+    gemini.reply = ""
+    events = await _events("How do I fix VPN error 809?")
+    assert [kind for kind, _ in events] == ["citations", "token", "done"]
+    assert events[1][1]["text"] == events[-1][1]["response"]
+    assert events[-1][1]["response"].startswith("I'm sorry")
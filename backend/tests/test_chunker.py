@@ -0,0 +1,92 @@
+import csv
+import io
+import random
+
+import pytest
+
+from src.rag.chunker import chunk_text, iter_chunks, iter_document_chunks, read_stream
+
+
+def _document(seed: int) -> str:
+    rng = random.Random(seed)
+    words = ["refund", "policy", "order", "shipping", "a", "the", "customer", "support", "ticket"]
+    paragraphs = []
+    for _ in range(rng.randint(1, 12)):
+        sentences = []
+        for _ in range(rng.randint(1, 8)):
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(1, 25)))
+            sentences.append(sentence.capitalize() + ".")
+        paragraphs.append(rng.choice([" ", "\n"]).join(sentences))
+    return "  " + "\n\n".join(paragraphs) + " \n"
+
+
+def _pieces(text: str, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(1, 40))))
+    return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+
+@pytest.mark.parametrize("seed", range(30))
+@pytest.mark.parametrize("size, overlap", [(200, 50), (64, 16), (500, 0)])
+def test_iter_chunks_matches_chunk_text(seed, size, overlap):
+    text = _document(seed)
+    expected = chunk_text(text, size, overlap)
+    assert list(iter_chunks(_pieces(text, seed), size, overlap)) == expected
+    assert list(iter_chunks(text, size, overlap)) == expected  # one character at a time
+
+
+def test_chunks_are_bounded_spans_of_the_text():
+    text = _document(7)
+    chunks = chunk_text(text, 200, 50)
+    assert len(chunks) > 1
+    position = 0
+    for chunk in chunks:
+        assert 0 < len(chunk) <= 200
+        position = text.index(chunk, max(position - 200, 0))
+
+
+@pytest.mark.parametrize("text", ["", "   ", "\n\n"])
+def test_blank_text_has_no_chunks(text):
+    assert chunk_text(text, 100, 10) == []
+    assert list(iter_chunks([text, text], 100, 10)) == []
+
+
+def _split_every(text: str, n: int) -> list[str]:
+    return [text[i : i + n] for i in range(0, len(text), n)]
+
+
+def test_csv_chunks_repeat_the_header_and_keep_rows_whole():
+    rows = [f'{i},"Ticket {i}, printer offline",open' for i in range(40)]
+    text = "id,title,status\n" + "\n".join(rows) + "\n"
+    chunks = list(iter_document_chunks(_split_every(text, 7), ".csv", 120, 10))
+    assert len(chunks) > 1
+    assert all(c.startswith("id,title,status\n") and len(c) <= 120 for c in chunks)
+    assert [line for c in chunks for line in c.split("\n")[1:]] == rows
+
+
+def test_invalid_csv():
+    with pytest.raises(ValueError, match="Invalid CSV"):
+        list(iter_document_chunks(["a,b\n", "x" * (csv.field_size_limit() + 1)], ".csv", 100, 10))
+
+
+@pytest.mark.parametrize("text", [
+    '[{"q": "vpn", "a": "restart"}, {"q": "mail", "a": "clear cache"}, 12345678, "text"]',
+    '{"q": "vpn", "a": "restart"}\n{"q": "mail", "a": "clear cache"}\n12345678\n"text"\n',
+])
+def test_json_records_across_piece_boundaries(text):
+    expected = ['{"q": "vpn", "a": "restart"}\n{"q": "mail", "a": "clear cache"}\n12345678\ntext']
+    for n in (1, 3, 1000):
+        assert list(iter_document_chunks(_split_every(text, n), ".json", 500, 10)) == expected
+
+
+@pytest.mark.parametrize("text", ['[{"a": 1}', '{"a": }'])
+def test_invalid_json(text):
+    with pytest.raises(ValueError, match="Invalid JSON"):
+        list(iter_document_chunks(_split_every(text, 2), ".json", 100, 10))
+
+
+def test_read_stream_decodes_characters_split_across_reads():
+    text = "Ünïcödé – ✓ " * 50
+    assert "".join(read_stream(io.BytesIO(text.encode()), size=7)) == text
+    with pytest.raises(UnicodeDecodeError):
+        list(read_stream(io.BytesIO(b"ok \xff"), size=2))
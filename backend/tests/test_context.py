@@ -0,0 +1,97 @@
+import pytest
+
+from src.rag.chunker import chunk_text
+from src.rag.context import (
+    NO_CONTEXT, build_context, drop_near_duplicates, estimate_tokens, format_passage, merge_adjacent,
+)
+
+ARTICLE = " ".join(
+    f"Step {i}: open the VPN client, choose the {name} gateway and sign in with your badge number."
+    for i, name in enumerate(["Berlin", "Lisbon", "Austin", "Osaka", "Nairobi", "Quito"])
+)
+
+
+def _chunks(text: str, doc_id: str, size: int = 120, overlap: int = 30, score: float = 0.5) -> list[dict]:
+    return [
+        {"text": chunk, "source": f"{doc_id}.md", "doc_id": doc_id, "chunk_index": i, "score": score}
+        for i, chunk in enumerate(chunk_text(text, size, overlap))
+    ]
+
+
+def test_adjacent_chunks_merge_back_into_the_text():
+    chunks = _chunks(ARTICLE, "vpn")
+    assert len(chunks) > 3
+    chunks[2]["score"] = 0.9
+    (passage,) = merge_adjacent(list(reversed(chunks)))  # retrieval order is by score
+    assert passage["text"] == ARTICLE
+    assert (passage["score"], passage["chunk_index"]) == (0.9, len(chunks) - 1)
+    assert [c["text"] for c in chunks] == chunk_text(ARTICLE, 120, 30)  # inputs are not modified
+
+
+def test_gaps_and_other_documents_start_new_passages():
+    vpn, printer = _chunks(ARTICLE, "vpn"), _chunks("Printer offline? Power cycle it.", "printer")
+    loose = {"text": "no position", "source": "x.md", "score": 0.4}
+    passages = merge_adjacent([vpn[0], vpn[1], vpn[3], *printer, loose])
+    assert [(p.get("doc_id"), p.get("chunk_index")) for p in passages] == [
+        ("printer", 0), ("vpn", 1), ("vpn", 3), (None, None),
+    ]
+    assert passages[1]["text"] in ARTICLE
+
+
+def test_chunks_without_a_shared_span_are_joined_with_a_space():
+    docs = [
+        {"text": "First half of the answer.", "source": "a.md", "doc_id": "a", "chunk_index": 0, "score": 0.5},
+        {"text": "Second half of the answer.", "source": "a.md", "doc_id": "a", "chunk_index": 1, "score": 0.5},
+    ]
+    assert merge_adjacent(docs)[0]["text"] == "First half of the answer. Second half of the answer."
+
+
+def test_near_duplicates_keep_the_best_scoring_copy():
+    text = "To reset your password open the portal, choose forgot password and follow the emailed link."
+    passages = [
+        {"text": text, "source": "old.md", "score": 0.6},
+        {"text": text + " Links expire after one hour.", "source": "new.md", "score": 0.8},
+        {"text": "Printers on floor three use the badge release queue.", "source": "print.md", "score": 0.7},
+    ]
+    assert [p["source"] for p in drop_near_duplicates(passages, 0.8)] == ["new.md", "print.md"]
+    assert [p["source"] for p in drop_near_duplicates(passages, 1.01)] == ["new.md", "print.md", "old.md"]
+
+
+def test_no_documents():
+    assert build_context([]) == (NO_CONTEXT, 0)
+
+
+def test_merged_overlap_is_counted_as_saved(settings_env):
+    settings_env(CONTEXT_TOKEN_BUDGET=0)
+    chunks = _chunks(ARTICLE, "vpn")
+    context, saved = build_context(chunks)
+    assert context == format_passage({**chunks[0], "text": ARTICLE})
+    verbatim = sum(estimate_tokens(format_passage(c)) + 1 for c in chunks)
+    assert saved == verbatim - (estimate_tokens(context) + 1) > 0
+
+
+def test_passages_are_packed_best_first_into_the_budget(settings_env):
+    settings_env(CONTEXT_TOKEN_BUDGET=0)
+    docs = [
+        {"text": f"Answer {i}: " + "restart the service and check the logs " * 3, "source": f"{i}.md", "score": s}
+        for i, s in enumerate([0.3, 0.9, 0.6])
+    ]
+    cost = estimate_tokens(format_passage(docs[0])) + 1
+    context, _ = build_context(docs, budget=2 * cost)
+    assert [part.split("]")[0] for part in context.split("\n\n")] == ["[1.md", "[2.md"]
+    assert build_context(docs)[0].count("\n\n") == 2  # budget 0: no limit
+
+
+def test_the_best_passage_is_truncated_to_fit(settings_env):
+    settings_env(CONTEXT_TOKEN_BUDGET=30)
+    doc = {"text": "word " * 200, "source": "long.md", "score": 0.9}
+    context, saved = build_context([doc])
+    assert context.startswith("[long.md] (score: 0.9): word") and context.endswith(" …")
+    assert estimate_tokens(context) <= 30
+    assert saved > 0
+
+
+@pytest.mark.parametrize("budget", [1, 5])
+def test_tiny_budgets_still_send_something(budget):
+    context, _ = build_context([{"text": "reboot the router now", "source": "r.md", "score": 0.5}], budget=budget)
+    assert context.startswith("[r.md]")
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from src.rag import embedders
+from src.rag.embedders import (
+    EmbeddingSpaceMismatch, GeminiEmbedder, HashingEmbedder, check_embedding_space, collection_suffix,
+    embedding_space, get_embedder,
+)
+
+TEXTS = ["How do I reset my VPN password?", "Printer on floor 3 is offline", "Café Wi-Fi: ¿contraseña?", "ok"]
+
+
+@pytest.fixture
+def provider(monkeypatch, settings_env):
+    """Select an embedding provider by its settings; the configured embedder is rebuilt."""
+    def apply(**values):
+        monkeypatch.setattr(embedders, "_embedder", None)
+        settings_env(**values)
+        return get_embedder()
+
+    return apply
+
+
+def test_vectors_are_unit_rows_of_the_configured_dimension():
+    matrix = HashingEmbedder(dimension=64).vectors(TEXTS)
+    assert matrix.shape == (4, 64) and matrix.dtype == np.float32
+    assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0)
+
+
+def test_vectors_are_deterministic_and_independent_of_the_batch():
+    batch = HashingEmbedder().vectors(TEXTS)
+    for text, row in zip(TEXTS, batch):
+        assert np.array_equal(HashingEmbedder().vectors([text])[0], row)
+
+
+def test_case_and_punctuation_are_ignored():
+    embedder = HashingEmbedder()
+    a, b, c = embedder.vectors(["Reset the PASSWORD!!", "  reset, the password", "reset the passwords"])
+    assert np.array_equal(a, b)
+    assert not np.array_equal(a, c)
+
+
+def test_shared_words_are_closer_than_unrelated_text():
+    query, related, unrelated = HashingEmbedder().vectors(
+        ["reset vpn password", "How to reset your VPN password", "Printer toner replacement"],
+    )
+    assert query @ related > 0.5 > query @ unrelated
+
+
+@pytest.mark.parametrize("text", ["", "   ", "?!", " - "])
+def test_text_without_ngrams_is_a_zero_vector(text):
+    assert not HashingEmbedder().vectors([text]).any()
+
+
+async def test_embed_and_embed_async_agree():
+    embedder = HashingEmbedder()
+    assert embedder.embed([]) == []
+    assert await embedder.embed_async(TEXTS) == embedder.embed(TEXTS)
+    long = [" ".join(TEXTS) * 100]  # embedded in a worker thread
+    assert await embedder.embed_async(long) == embedder.embed(long)
+
+
+def test_gemini_model_names_record_the_output_dimension():
+    assert (GeminiEmbedder("gemini-embedding-001").model, GeminiEmbedder("gemini-embedding-001").dimension) == (
+        "gemini-embedding-001", 3072,
+    )
+    truncated = GeminiEmbedder("gemini-embedding-001", 256)
+    assert (truncated.model, truncated.dimension) == ("gemini-embedding-001@256", 256)
+    assert GeminiEmbedder("unknown-model").dimension is None
+
+
+def test_get_embedder_follows_the_provider(provider):
+    local = provider(EMBEDDING_PROVIDER="local", LOCAL_EMBEDDING_DIM=128)
+    assert isinstance(local, HashingEmbedder) and local.dimension == 128
+    assert get_embedder() is local
+    assert collection_suffix() == "-local-hash-ngram3-5-128"
+
+    gemini = provider(EMBEDDING_PROVIDER="gemini", GEMINI_EMBEDDING_DIM=0)
+    assert isinstance(gemini, GeminiEmbedder)
+    assert collection_suffix() == ""
+
+    with pytest.raises(ValueError, match="embedding_provider"):
+        provider(EMBEDDING_PROVIDER="word2vec")
+
+
+def test_check_embedding_space(provider):
+    provider(EMBEDDING_PROVIDER="local", LOCAL_EMBEDDING_DIM=768)
+    space = embedding_space()
+    assert space == {"embedding_model": "local-hash-ngram3-5", "embedding_dim": 768}
+
+    check_embedding_space(None, "legacy")  # collections from before models were recorded
+    check_embedding_space({"hnsw:space": "cosine", **space}, "docs")
+    for metadata in ({**space, "embedding_dim": 3072}, {"embedding_model": "gemini-embedding-001"}):
+        with pytest.raises(EmbeddingSpaceMismatch, match="re-ingest"):
+            check_embedding_space(metadata, "docs")
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from src.db import embedding_cache
+from src.db.embedding_cache import EmbeddingCache, text_hash
+from src.rag import embeddings
+
+
+class CountingEmbedder:
+    model = "fake-model"
+    dimension = 2
+    remote = True
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    async def embed_async(self, texts):
+        return self.embed(texts)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def embedder(monkeypatch, settings_env, tmp_path):
+    settings_env(EMBEDDING_CACHE_PATH=tmp_path / "embeddings.db", EMBEDDING_CACHE_ENABLED="true")
+    fake = CountingEmbedder()
+    monkeypatch.setattr(embeddings, "get_embedder", lambda: fake)
+    yield fake
+    embedding_cache.close_embedding_cache()
+
+
+def test_round_trip_is_keyed_by_model(cache):
+    vec = [0.25, -1.5, 3.0]
+    cache.put_many("m1", {text_hash("a"): vec})
+    assert cache.get_many("m1", [text_hash("a"), text_hash("b")]) == {text_hash("a"): vec}
+    assert cache.get_many("m2", [text_hash("a")]) == {}
+
+
+def test_lookups_span_parameter_batches(cache):
+    items = {text_hash(str(i)): [float(i)] for i in range(1200)}
+    cache.put_many("m", items)
+    found = cache.get_many("m", list(items) + list(items)[:5])
+    assert found == items
+
+
+def test_vectors_are_stored_as_float32(cache):
+    cache.put_many("m", {"h": [0.1]})
+    assert cache.get_many("m", ["h"])["h"] == [float(np.float32(0.1))]
+
+
+def test_embed_texts_only_sends_new_text(embedder):
+    assert embeddings.embed_texts(["aa", "b", "aa"]) == [[2.0, 1.0], [1.0, 1.0], [2.0, 1.0]]
+    assert embedder.calls == [["aa", "b"]]
+    assert embeddings.embed_texts(["b", "ccc"]) == [[1.0, 1.0], [3.0, 1.0]]
+    assert embedder.calls[-1] == ["ccc"]
+
+
+async def test_embed_texts_async_shares_the_cache(embedder):
+    embeddings.embed_texts(["aa"])
+    assert await embeddings.embed_texts_async(["aa", "dddd"]) == [[2.0, 1.0], [4.0, 1.0]]
+    assert embedder.calls == [["aa"], ["dddd"]]
+
+
+def test_cache_can_be_bypassed(embedder, settings_env):
+    embeddings.embed_texts(["aa"])
+    embeddings.embed_texts(["aa"], use_cache=False)
+    settings_env(EMBEDDING_CACHE_ENABLED="false")
+    embeddings.embed_texts(["aa"])
+    assert embedder.calls == [["aa"], ["aa"], ["aa"]]
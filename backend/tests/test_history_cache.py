@@ -0,0 +1,77 @@
+from src.db.history_cache import SessionHistoryCache
+
+
+def _message(n: int) -> dict:
+    return {"role": "user", "content": f"m{n}"}
+
+
+def _contents(messages) -> list[str]:
+    return [m["content"] for m in messages]
+
+
+def test_keeps_the_last_window_of_messages():
+    cache = SessionHistoryCache(window=3, max_sessions=10)
+    cache.append("s", _message(0), new_session=True)
+    for n in range(1, 5):
+        cache.append("s", _message(n))
+    assert _contents(cache.get("s")) == ["m2", "m3", "m4"]
+
+
+def test_unknown_sessions_are_not_cached_by_appends():
+    cache = SessionHistoryCache(window=3, max_sessions=10)
+    cache.append("s", _message(1))  # earlier messages are only in the database
+    assert cache.get("s") is None
+
+
+def test_least_recently_used_session_is_evicted():
+    cache = SessionHistoryCache(window=3, max_sessions=2)
+    for session in ("a", "b"):
+        cache.append(session, _message(0), new_session=True)
+    cache.get("a")
+    cache.append("c", _message(0), new_session=True)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_zero_sessions_disables_the_cache():
+    cache = SessionHistoryCache(window=3, max_sessions=0)
+    cache.append("s", _message(0), new_session=True)
+    cache.begin_load("s")
+    cache.finish_load("s", [_message(0)])
+    assert cache.get("s") is None and len(cache) == 0
+
+
+def test_load_overtaken_by_a_write_is_not_cached():
+    cache = SessionHistoryCache(window=3, max_sessions=10)
+    cache.begin_load("s")
+    cache.append("s", _message(2))  # lands while the database read is in flight
+    cache.finish_load("s", [_message(1)])
+    assert cache.get("s") is None
+
+    cache.begin_load("s")
+    cache.finish_load("s", [_message(1), _message(2)])
+    assert _contents(cache.get("s")) == ["m1", "m2"]
+
+
+def test_discard_during_load():
+    cache = SessionHistoryCache(window=3, max_sessions=10)
+    cache.begin_load("s")
+    cache.discard("s")
+    cache.finish_load("s", [_message(1)])
+    assert cache.get("s") is None
+
+
+async def test_recent_messages_read_through_the_cache(database, settings_env):
+    settings_env(HISTORY_WINDOW=3)
+    await database.save_message("s", "user", "m0", new_session=True)
+    for n in range(1, 5):
+        await database.save_message("s", "user", f"m{n}")
+    assert _contents(await database.get_recent_messages("s")) == ["m2", "m3", "m4"]
+
+    cache = database.get_history_cache()
+    cache.discard("s")
+    assert _contents(await database.get_recent_messages("s")) == ["m2", "m3", "m4"]  # from SQLite
+    assert _contents(cache.get("s")) == ["m2", "m3", "m4"]
+
+    await database.delete_conversation("s")
+    assert await database.get_recent_messages("s") == []
@@ -0,0 +1,161 @@
+import asyncio
+import os
+import sqlite3
+import time
+import uuid
+
+import pytest
+
+from src.rag import jobs, pipeline
+from src.rag.chunker import iter_document_chunks, read_file
+from src.rag.jobs import IngestJobRunner
+
+
+@pytest.fixture
+async def runner(local_rag, settings_env, monkeypatch):
+    """A runner polling every 20 ms; documents are embedded two chunks at a time."""
+    settings_env(CHUNK_SIZE=100, CHUNK_OVERLAP=0)
+    monkeypatch.setattr(pipeline, "EMBED_BATCH_SIZE", 2)
+    runner = IngestJobRunner(concurrency=1, poll_interval=0.02, stale_after=60)
+    yield runner
+    await runner.close()
+
+
+async def _queue(database, tmp_path, text: str, ext: str = ".txt") -> tuple[str, str]:
+    job_id = uuid.uuid4().hex
+    path = tmp_path / f"{job_id}{ext}"
+    path.write_text(text, encoding="utf-8")
+    await database.create_ingest_job(job_id, job_id[:12], f"upload{ext}", ext, str(path))
+    return job_id, str(path)
+
+
+async def _finished(database, job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while (job := await database.get_ingest_job(job_id))["status"] not in ("done", "failed"):
+        assert time.monotonic() < deadline, job
+        await asyncio.sleep(0.01)
+    return job
+
+
+TEXT = "\n\n".join(f"Step {i}: restart the router and wait for the status light to turn green." for i in range(9))
+
+
+async def test_each_job_is_claimed_once(database, tmp_path):
+    queued = {(await _queue(database, tmp_path, TEXT))[0] for _ in range(2)}
+
+    claimed = await asyncio.gather(*(database.claim_ingest_job(f"worker-{i}") for i in range(3)))
+    assert claimed.count(None) == 1
+    assert sorted(job["id"] for job in claimed if job) == sorted(queued)
+    assert all(job["status"] == "running" for job in claimed if job)
+    assert await database.count_queued_ingest_jobs() == 0
+
+
+async def test_runner_ingests_a_job_and_records_progress(runner, database, tmp_path, monkeypatch):
+    job_id, path = await _queue(database, tmp_path, TEXT)
+    total = sum(1 for _ in iter_document_chunks(read_file(path), ".txt"))
+    assert total > 4
+
+    progress = []
+    update = jobs.update_ingest_job
+
+    async def recording_update(job_id, **fields):
+        if set(fields) == {"chunks_done"}:
+            progress.append(fields["chunks_done"])
+        await update(job_id, **fields)
+
+    monkeypatch.setattr(jobs, "update_ingest_job", recording_update)
+    runner.start()
+    runner.notify()
+    job = await _finished(database, job_id)
+
+    assert job["status"] == "done" and job["error"] is None
+    assert job["chunks_done"] == job["chunks_total"] == total
+    assert progress == list(range(2, total, 2)) + [total]
+    assert [d["chunk_count"] for d in await database.get_documents()] == [total]
+    assert await (await pipeline.get_async_collection()).count() == total
+    assert not os.path.exists(path)
+
+
+async def test_stale_job_resumes_after_its_stored_chunks(runner, database, tmp_path, monkeypatch):
+    job_id, path = await _queue(database, tmp_path, TEXT)
+    total = sum(1 for _ in iter_document_chunks(read_file(path), ".txt"))
+    # Claimed by a worker that stored four chunks and crashed.
+    await database.claim_ingest_job("crashed")
+    await database.update_ingest_job(job_id, chunks_done=4, chunks_total=total, heartbeat_at=0)
+
+    starts = []
+    ingest = jobs.ingest_chunks_async
+
+    async def recording_ingest(doc_id, filename, chunks, start=0, progress=None):
+        starts.append(start)
+        return await ingest(doc_id, filename, chunks, start, progress)
+
+    monkeypatch.setattr(jobs, "ingest_chunks_async", recording_ingest)
+    runner.start()
+    job = await _finished(database, job_id)
+
+    assert starts == [4]
+    assert job["status"] == "done" and job["chunks_done"] == total
+    assert job["owner"] == runner.owner
+
+
+async def test_failed_job_records_its_error(runner, database, tmp_path):
+    job_id, path = await _queue(database, tmp_path, '[{"q": "vpn"', ext=".json")
+    runner.start()
+    job = await _finished(database, job_id)
+
+    assert job["status"] == "failed"
+    assert "Invalid JSON" in job["error"]
+    assert job["finished_at"] is not None
+    assert await database.get_documents() == []
+
+
+async def test_dispatch_survives_database_errors(runner, database, tmp_path, monkeypatch, caplog):
+    claim = jobs.claim_ingest_job
+    failures = [sqlite3.OperationalError("database is locked")]
+
+    async def flaky_claim(owner):
+        if failures:
+            raise failures.pop()
+        return await claim(owner)
+
+    monkeypatch.setattr(jobs, "claim_ingest_job", flaky_claim)
+    job_id, _ = await _queue(database, tmp_path, TEXT)
+    runner.start()
+    # The runner has one slot: had the failed claim kept it, the job would stay queued.
+    job = await _finished(database, job_id)
+
+    assert job["status"] == "done"
+    assert "dispatch failed" in caplog.text
+
+
+async def test_heartbeat_survives_database_errors(database, monkeypatch, caplog):
+    calls = []
+
+    async def flaky_heartbeat(owner, job_ids):
+        calls.append(job_ids)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(jobs, "heartbeat_ingest_jobs", flaky_heartbeat)
+    runner = IngestJobRunner(concurrency=1, poll_interval=0.02, stale_after=0.04)
+    runner.start()
+    await asyncio.sleep(0.1)
+    try:
+        assert len(calls) >= 2
+        assert not any(task.done() for task in runner._tasks)
+        assert "heartbeat failed" in caplog.text
+    finally:
+        await runner.close()
+
+
+async def test_close_right_after_a_wake_up(database):
+    runner = IngestJobRunner(concurrency=1, poll_interval=60, stale_after=60)
+    runner.start()
+    await asyncio.sleep(0.05)  # idle, waiting to be notified
+    runner.notify()
+    await asyncio.sleep(0)  # the wake-up is delivered, the dispatcher not yet resumed
+    start = time.monotonic()
+    async with asyncio.timeout(1):  # bounds a hang: cancelling close() also cancels what it awaits
+        await runner.close()
+    assert time.monotonic() - start < 0.5
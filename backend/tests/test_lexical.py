@@ -0,0 +1,102 @@
+import pytest
+
+from src.rag import lexical, pipeline, retriever
+from src.rag.lexical import BM25Index, tokenize
+
+CHUNKS = {
+    "a_chunk_0": ("a", "Error ERR-4012 means the VPN certificate expired; renew it in the portal."),
+    "b_chunk_0": ("b", "Printers on floor 3 need the new driver package from the portal."),
+    "c_chunk_0": ("c", "Reset your password in the self-service portal."),
+}
+
+
+def _index(index: BM25Index | None = None) -> BM25Index:
+    index = index or BM25Index()
+    ids = list(CHUNKS)
+    index.add(
+        ids,
+        [text for _, text in CHUNKS.values()],
+        [{"doc_id": doc, "source": f"{doc}.md", "chunk_index": 0} for doc, _ in CHUNKS.values()],
+    )
+    return index
+
+
+def test_tokenize_keeps_identifiers_whole():
+    assert tokenize("What does ERR-4012 mean on host10.corp?") == ["err-4012", "mean", "host10.corp"]
+
+
+def test_rare_terms_rank_first():
+    hits, max_score = _index().search("portal ERR-4012", k=2)
+    assert hits[0]["id"] == "a_chunk_0" and len(hits) == 2
+    assert hits[0]["source"] == "a.md" and hits[0]["chunk_index"] == 0
+    assert 0 < hits[0]["bm25"] <= max_score
+
+
+def test_no_match_and_stopword_queries():
+    index = _index()
+    assert index.search("kubernetes", k=3)[0] == []
+    assert index.search("what is the", k=3) == ([], 0.0)
+    assert BM25Index().search("portal", k=3) == ([], 0.0)
+
+
+def test_remove_and_replace():
+    index = _index()
+    index.remove_documents(["a"])
+    assert index.search("ERR-4012", k=3)[0] == []
+    index.remove_chunks(["b_chunk_0", "missing"])
+    assert [h["id"] for h in index.search("portal", k=3)[0]] == ["c_chunk_0"]
+    index.add(["c_chunk_0"], ["Printers are managed centrally."], [{"doc_id": "c"}])
+    assert len(index) == 1
+    assert index.search("password", k=3)[0] == []
+    assert [h["id"] for h in index.search("printers", k=3)[0]] == ["c_chunk_0"]
+
+
+def _doc(chunk_id: str, score: float) -> dict:
+    return {"id": chunk_id, "text": chunk_id, "score": score, "source": "s", "doc_id": None, "chunk_index": 0}
+
+
+def test_fuse_rewards_agreement_and_keeps_vector_scores(settings_env):
+    settings_env(RRF_K=60)
+    vector = [_doc("v1", 0.9), _doc("both", 0.8)]
+    lexical_docs = [_doc("both", 1.0), _doc("l1", 0.7)]
+    fused = retriever._fuse(vector, lexical_docs, top_k=3)
+    assert [d["id"] for d in fused] == ["both", "v1", "l1"]
+    assert fused[0]["score"] == 0.8  # the cosine similarity, not the BM25 score
+    assert len(retriever._fuse(vector, lexical_docs, top_k=1)) == 1
+
+
+@pytest.fixture
+def hybrid(local_rag, settings_env):
+    settings_env(RETRIEVAL_MODE="lexical_first", LEXICAL_FIRST_MIN_SCORE=0.3, LEXICAL_FIRST_MARGIN=1.5)
+    return local_rag
+
+
+async def test_lexical_fast_path(hybrid):
+    for doc, text in CHUNKS.values():
+        await pipeline.ingest_document_async(doc, f"{doc}.md", text)
+    decisive = retriever.lexical_fast_path("ERR-4012")
+    assert decisive is not None and decisive[0]["source"] == "a.md"
+    assert set(decisive[0]) == set(retriever._CONTEXT_KEYS)
+    assert retriever.lexical_fast_path("portal") is None  # three close matches
+    assert retriever.lexical_fast_path("kubernetes") is None
+
+
+async def test_index_follows_ingest_delete_and_rebuild(hybrid):
+    await pipeline.ingest_document_async("a", "a.md", CHUNKS["a_chunk_0"][1])
+    assert len(lexical.get_lexical_index()) == 1
+    await pipeline.delete_document_chunks_async("a")
+    assert len(lexical.get_lexical_index()) == 0
+
+    await pipeline.ingest_document_async("c", "c.md", CHUNKS["c_chunk_0"][1])
+    lexical.get_lexical_index().clear()
+    await lexical.rebuild_lexical_index()
+    hits, _ = lexical.get_lexical_index().search("password", k=1)
+    assert [h["doc_id"] for h in hits] == ["c"]
+
+
+async def test_hybrid_retrieval_finds_exact_identifiers(hybrid, settings_env):
+    settings_env(RETRIEVAL_MODE="hybrid")
+    for doc, text in CHUNKS.values():
+        await pipeline.ingest_document_async(doc, f"{doc}.md", text)
+    docs = await retriever.retrieve_async("ERR-4012")
+    assert docs[0]["doc_id"] == "a"
@@ -0,0 +1,93 @@
+import types
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from pydantic import ValidationError
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from src.config import Settings
+from src.guardrails import rate_limit
+from src.guardrails.rate_limit import Budget, MemoryRateLimiter, SQLiteRateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake ``time`` for the rate limiter module; advance with ``clock.now += seconds``."""
+    fake = types.SimpleNamespace(now=1000.0)
+    fake.monotonic = fake.time = lambda: fake.now
+    monkeypatch.setattr(rate_limit, "time", fake)
+    return fake
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def limiter(request, tmp_path):
+    limiter = MemoryRateLimiter() if request.param == "memory" else SQLiteRateLimiter(str(tmp_path / "rl.db"))
+    yield limiter
+    limiter.close()
+
+
+@pytest.mark.parametrize("field", ["rate_limit_rpm", "rate_limit_ingest_rpm", "rate_limit_window"])
+def test_settings_reject_empty_budgets(field):
+    with pytest.raises(ValidationError):
+        Settings(**{field: 0})
+
+
+def test_burst_then_steady_rate(limiter, clock):
+    budget = Budget("chat", rpm=6, window=60)  # one request per 10 s, bursts of 6
+    assert [limiter.acquire("a", budget) for _ in range(6)] == [0.0] * 6
+    assert limiter.acquire("a", budget) == pytest.approx(10.0)
+
+    clock.now += 4
+    assert limiter.acquire("a", budget) == pytest.approx(6.0)
+    clock.now += 6
+    assert limiter.acquire("a", budget) == 0.0
+    assert limiter.acquire("a", budget) == pytest.approx(10.0)
+
+
+def test_keys_and_budgets_are_separate(limiter, clock):
+    chat, ingest = Budget("chat", rpm=1, window=60), Budget("ingest", rpm=1, window=60)
+    assert limiter.acquire("chat:a", chat) == 0.0
+    assert limiter.acquire("chat:a", chat) > 0
+    assert limiter.acquire("chat:b", chat) == 0.0
+    assert limiter.acquire("ingest:a", ingest) == 0.0
+
+
+def test_bucket_refills_after_idle(limiter, clock):
+    budget = Budget("chat", rpm=3, window=30)
+    for _ in range(3):
+        limiter.acquire("a", budget)
+    clock.now += 1000
+    assert [limiter.acquire("a", budget) for _ in range(3)] == [0.0] * 3
+    assert limiter.acquire("a", budget) > 0
+
+
+async def test_endpoint_budget_is_per_forwarded_client(settings_env, clock):
+    settings_env(RATE_LIMIT_ENABLED="true", RATE_LIMIT_BACKEND="memory", RATE_LIMIT_INGEST_RPM=2,
+                 RATE_LIMIT_WINDOW=60)
+    app = FastAPI()
+
+    @app.post("/upload", dependencies=[Depends(rate_limit.limit_ingest)])
+    async def upload():
+        return {"ok": True}
+
+    # As src/serve.py runs it: X-Forwarded-For is trusted from the proxy only.
+    proxied = ProxyHeadersMiddleware(app, trusted_hosts="10.0.0.2")
+    rate_limit.close_rate_limiter()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(proxied, client=("10.0.0.2", 5000)),
+                                     base_url="http://test") as proxy:
+            alice, bob = {"X-Forwarded-For": "203.0.113.1"}, {"X-Forwarded-For": "203.0.113.2"}
+            assert [(await proxy.post("/upload", headers=alice)).status_code for _ in range(3)] == [200, 200, 429]
+            rejected = await proxy.post("/upload", headers=alice)
+            assert rejected.headers["Retry-After"] == "30"
+            assert (await proxy.post("/upload", headers=bob)).status_code == 200
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(proxied, client=("198.51.100.7", 5000)),
+                                     base_url="http://test") as direct:
+            # An untrusted peer cannot pick its key with the header.
+            spoofed = {"X-Forwarded-For": "203.0.113.9"}
+            assert [(await direct.post("/upload", headers=spoofed)).status_code for _ in range(3)] == [200, 200, 429]
+            assert (await direct.post("/upload", headers={"X-Forwarded-For": "203.0.113.10"})).status_code == 429
+    finally:
+        rate_limit.close_rate_limiter()
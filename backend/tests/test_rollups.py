@@ -0,0 +1,65 @@
+import json
+
+from src.db import backfill
+
+
+async def _audit(database, tokens: int, latency_ms: float, confidence: float, guardrails=()):
+    await database.save_audit("s1", "q", "a", tokens, latency_ms, ["faq.md"], list(guardrails), confidence)
+
+
+async def _legacy_row(database, day: str, tokens: int, guardrails=()):
+    """An audit row written before the rollups existed."""
+    async with database.transaction() as db:
+        await db.execute(
+            """INSERT INTO audit_log (session_id, query, response, tokens_used, latency_ms,
+                                      sources, guardrails_triggered, confidence, timestamp)
+               VALUES ('old', 'q', 'a', ?, 100, '[]', ?, 0.5, ?)""",
+            (tokens, json.dumps(list(guardrails)), f"{day} 12:00:00"),
+        )
+
+
+async def test_summary_follows_each_audit_record(database):
+    assert (await database.get_analytics_summary())["total_queries"] == 0
+    await _audit(database, 30, 100.0, 0.5, ["pii_email"])
+    await _audit(database, 10, 300.0, 1.0, ["pii_email", "prompt_injection"])
+
+    summary = await database.get_analytics_summary()
+    assert summary["total_queries"] == summary["queries_today"] == 2
+    assert summary["avg_latency_ms"] == 200.0
+    assert summary["avg_confidence"] == 0.75
+    assert summary["total_tokens"] == 40
+    assert summary["guardrail_triggers"] == {"pii_email": 2, "prompt_injection": 1}
+
+    series = await database.get_token_usage_timeseries()
+    assert [(d["tokens"], d["queries"]) for d in series] == [(40, 2)]
+
+
+async def test_rebuild_counts_rows_that_predate_the_rollups(database):
+    await _legacy_row(database, "2024-01-02", 5, ["pii_ssn"])
+    await _legacy_row(database, "2024-01-02", 7)
+    await _audit(database, 10, 100.0, 0.5)
+    assert (await database.get_analytics_summary())["total_queries"] == 1
+
+    await database.rebuild_rollups()
+    summary = await database.get_analytics_summary()
+    assert summary["total_queries"] == 3
+    assert summary["total_tokens"] == 22
+    assert summary["guardrail_triggers"] == {"pii_ssn": 1}
+    series = await database.get_token_usage_timeseries()
+    assert [(d["date"], d["tokens"], d["queries"]) for d in series][0] == ("2024-01-02", 12, 2)
+
+
+async def test_rebuild_is_idempotent(database):
+    await _audit(database, 10, 100.0, 0.5, ["pii_email"])
+    before = await database.get_analytics_summary()
+    await database.rebuild_rollups()
+    await database.rebuild_rollups()
+    assert await database.get_analytics_summary() == before
+
+
+async def test_backfill_command(database):
+    await _legacy_row(database, "2024-01-02", 5)
+    await database.close_db()
+    await backfill.main()
+    await database.init_db()
+    assert (await database.get_analytics_summary())["total_queries"] == 1
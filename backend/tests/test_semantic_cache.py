@@ -0,0 +1,75 @@
+import types
+
+import pytest
+
+from src.rag import cache
+from src.rag.cache import SemanticCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = types.SimpleNamespace(now=100.0)
+    fake.monotonic = lambda: fake.now
+    monkeypatch.setattr(cache, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def answers(clock):
+    return SemanticCache(threshold=0.95, max_entries=2, ttl_seconds=60)
+
+
+DOCS = [{"text": "Refunds take 5 days", "source": "faq.md"}]
+
+
+def test_similar_query_hits(answers):
+    answers.store([1.0, 0.0, 0.0], "five days", DOCS, answers.generation)
+    hit = answers.lookup([0.99, 0.05, 0.0])
+    assert hit is not None
+    assert (hit.answer, hit.context_docs) == ("five days", DOCS)
+    assert 0.95 <= hit.similarity <= 1.0
+    assert answers.lookup([0.0, 1.0, 0.0]) is None
+
+
+def test_best_match_wins(answers):
+    answers.store([1.0, 0.0], "x", [], answers.generation)
+    answers.store([0.98, 0.2], "xy", [], answers.generation)
+    assert answers.lookup([0.97, 0.24]).answer == "xy"
+
+
+def test_lru_eviction(answers):
+    for i, vec in enumerate(([1.0, 0.0, 0.0], [0.0, 1.0, 0.0])):
+        answers.store(vec, f"a{i}", [], answers.generation)
+    answers.lookup([1.0, 0.0, 0.0])  # a0 becomes most recently used
+    answers.store([0.0, 0.0, 1.0], "a2", [], answers.generation)
+    assert len(answers) == 2
+    assert answers.lookup([0.0, 1.0, 0.0]) is None
+    assert answers.lookup([1.0, 0.0, 0.0]).answer == "a0"
+
+
+def test_entries_expire(answers, clock):
+    answers.store([1.0, 0.0], "old", [], answers.generation)
+    clock.now += 61
+    assert answers.lookup([1.0, 0.0]) is None
+    assert len(answers) == 0
+
+
+def test_invalidate_drops_entries_and_stale_stores(answers):
+    generation = answers.generation
+    answers.store([1.0, 0.0], "before", [], generation)
+    answers.invalidate()
+    assert answers.lookup([1.0, 0.0]) is None
+    # An answer computed against the old corpus arrives after the ingest.
+    answers.store([1.0, 0.0], "stale", [], generation)
+    assert answers.lookup([1.0, 0.0]) is None
+    answers.store([1.0, 0.0], "fresh", [], answers.generation)
+    assert answers.lookup([1.0, 0.0]).answer == "fresh"
+
+
+def test_zero_vectors_and_dimension_changes_are_ignored(answers):
+    answers.store([0.0, 0.0], "zero", [], answers.generation)
+    assert len(answers) == 0
+    assert answers.lookup([0.0, 0.0]) is None
+    answers.store([1.0, 0.0], "2d", [], answers.generation)
+    assert answers.lookup([1.0, 0.0, 0.0]) is None
+    assert len(answers) == 0
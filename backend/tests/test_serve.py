@@ -0,0 +1,23 @@
+import logging
+
+import pytest
+
+from src.config import Settings
+from src.serve import multi_worker_env
+
+
+def test_numpy_backend_is_refused():
+    with pytest.raises(ValueError, match="numpy"):
+        multi_worker_env(Settings(vector_backend="numpy"))
+
+
+def test_per_process_state_is_switched_off(caplog):
+    with caplog.at_level(logging.WARNING, logger="src.serve"):
+        env = multi_worker_env(Settings(vector_backend="chroma", retrieval_mode="hybrid"))
+    assert env == {"SEMANTIC_CACHE_ENABLED": "false", "HISTORY_CACHE_SESSIONS": "0", "RETRIEVAL_MODE": "vector"}
+    assert len(caplog.records) == 3
+
+    workers = Settings(**{name.lower(): value for name, value in env.items()})
+    assert not workers.semantic_cache_enabled
+    assert workers.history_cache_sessions == 0 and workers.retrieval_mode == "vector"
+    assert multi_worker_env(workers) == {}
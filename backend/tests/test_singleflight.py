@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from src.rag import pipeline
+from src.rag.singleflight import SingleFlight
+
+
+class Call:
+    """An awaitable stand-in for a retrieval or generation, released by the test."""
+
+    def __init__(self, result="answer", error: Exception | None = None):
+        self.result, self.error = result, error
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def _started(*tasks: asyncio.Task):
+    await asyncio.sleep(0)  # let the tasks reach the flight
+    assert not any(task.done() for task in tasks)
+
+
+async def test_concurrent_callers_share_one_call():
+    flight, call = SingleFlight("test"), Call()
+    tasks = [asyncio.create_task(flight.do("vpn", call)) for _ in range(3)]
+    await _started(*tasks)
+    call.release.set()
+
+    assert await asyncio.gather(*tasks) == [("answer", False), ("answer", True), ("answer", True)]
+    assert call.calls == 1
+
+
+async def test_finished_calls_are_not_reused():
+    flight, call = SingleFlight("test"), Call()
+    call.release.set()
+    assert await flight.do("vpn", call) == ("answer", False)
+    assert await flight.do("vpn", call) == ("answer", False)
+    assert call.calls == 2 and not flight._flights
+
+
+async def test_none_and_different_keys_are_not_shared():
+    flight, call = SingleFlight("test"), Call()
+    tasks = [asyncio.create_task(flight.do(key, call)) for key in (None, None, "vpn", "printer")]
+    await _started(*tasks)
+    call.release.set()
+
+    assert [shared for _, shared in await asyncio.gather(*tasks)] == [False] * 4
+    assert call.calls == 4
+
+
+async def test_a_failure_reaches_every_waiter():
+    flight, call = SingleFlight("test"), Call(error=TimeoutError("model overloaded"))
+    tasks = [asyncio.create_task(flight.do("vpn", call)) for _ in range(3)]
+    await _started(*tasks)
+    call.release.set()
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(r, TimeoutError) for r in results)
+    assert call.calls == 1 and not flight._flights
+
+
+@pytest.mark.parametrize("cancelled", [0, 1])
+async def test_a_cancelled_waiter_does_not_cancel_the_call(cancelled):
+    flight, call = SingleFlight("test"), Call()
+    tasks = [asyncio.create_task(flight.do("vpn", call)) for _ in range(2)]
+    await _started(*tasks)
+    tasks[cancelled].cancel()
+    await asyncio.sleep(0)
+    call.release.set()
+
+    with pytest.raises(asyncio.CancelledError):
+        await tasks[cancelled]
+    assert (await tasks[1 - cancelled])[0] == "answer"
+    assert call.calls == 1
+
+
+async def test_concurrent_chats_share_one_generation(local_rag, gemini, database, monkeypatch):
+    await pipeline.ingest_document_async("vpn", "vpn.md", "If the VPN shows error 809, restart the router.")
+    generate = gemini.aio.models.generate_content
+
+    async def slow_generate(**kwargs):
+        await asyncio.sleep(0.05)  # long enough for every request to join
+        return await generate(**kwargs)
+
+    monkeypatch.setattr(gemini.aio.models, "generate_content", slow_generate)
+    questions = ["How do I fix VPN error 809?", "how do i fix vpn error 809", "  How do I fix VPN error 809 ?"]
+    responses = await asyncio.gather(*(pipeline.chat(q) for q in questions))
+
+    assert len(gemini.calls) == 1
+    assert {r.response for r in responses} == {gemini.reply}
+    assert sorted(r.tokens_used for r in responses) == [0, 0, 50]
+    assert len({r.session_id for r in responses}) == 3
+    for question, response in zip(questions, responses):
+        history = await database.get_conversation(response.session_id)
+        assert [m["content"] for m in history] == [question, gemini.reply]
+
+
+async def test_follow_ups_are_not_shared_by_default(local_rag, gemini, database):
+    await pipeline.ingest_document_async("vpn", "vpn.md", "If the VPN shows error 809, restart the router.")
+    sessions = [(await pipeline.chat(f"Hello from desk {i}")).session_id for i in range(2)]
+    gemini.calls.clear()
+
+    await asyncio.gather(*(pipeline.chat("And error 809?", session_id) for session_id in sessions))
+    assert len(gemini.calls) == 2
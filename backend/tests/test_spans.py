@@ -0,0 +1,173 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.observability import spans
+from src.observability.spans import current_trace, finish_trace, otlp_trace_id, span, start_trace
+from src.observability.tracer import TracingMiddleware
+
+
+@pytest.fixture
+def exported(monkeypatch, settings_env, tmp_path):
+    """Traces are exported to a fresh file; returns a function reading back its lines."""
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(spans, "_exporter", None)
+    settings_env(TRACE_EXPORT_PATH=path)
+    yield lambda: [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+    spans.close_exporter()
+
+
+def test_span_without_a_trace_is_a_shared_noop():
+    assert current_trace() is None
+    assert span("embed") is span("retrieve", k=5)
+    with span("embed") as s:
+        assert s is None
+
+
+def test_spans_nest_and_sum_by_name():
+    token = start_trace("abc", "GET", sampled=True)
+    trace = current_trace()
+    with span("retrieve") as outer:
+        with span("embed", chunks=1) as inner:
+            pass
+        with span("embed"):
+            pass
+    with pytest.raises(KeyError):
+        with span("generate"):
+            raise KeyError("model")
+    finish_trace(token, "GET /api/chat", status=200)
+
+    assert current_trace() is None
+    assert inner.parent_id == outer.span_id and outer.parent_id == trace.root.span_id
+    assert inner.attributes == {"chunks": 1}
+    assert trace.spans[-1].attributes == {"error": "KeyError"}
+    assert list(trace.stages()) == ["embed", "retrieve", "generate"]  # first finished, first listed
+    assert trace.stages()["embed"] == round(sum(s.duration_ms for s in trace.spans if s.name == "embed"), 2)
+    assert (trace.root.name, trace.root.attributes) == ("GET /api/chat", {"status": 200})
+    assert trace.root.end_ns >= trace.spans[-1].end_ns
+
+
+async def test_concurrent_tasks_get_their_own_parents():
+    token = start_trace("abc", "POST", sampled=True)
+    trace = current_trace()
+
+    async def stage(name: str):
+        with span(name) as parent:
+            await asyncio.sleep(0.01)
+            with span(f"{name}.inner") as child:
+                await asyncio.sleep(0)
+        return parent, child
+
+    with span("retrieve") as top:
+        results = await asyncio.gather(stage("vector"), stage("lexical"))
+    finish_trace(token)
+
+    for parent, child in results:
+        assert parent.parent_id == top.span_id
+        assert child.parent_id == parent.span_id
+    assert len(trace.spans) == 5
+
+
+def test_server_timing_header_value():
+    token = start_trace("abc", "GET", sampled=True)
+    trace = current_trace()
+    with span("embed"):
+        pass
+    with span("generate"):
+        pass
+    finish_trace(token)
+
+    stages = trace.stages()
+    assert trace.server_timing() == f"embed;dur={stages['embed']}, generate;dur={stages['generate']}"
+    assert trace.server_timing(12.5).endswith(", total;dur=12.5")
+
+
+def test_sampling(settings_env):
+    settings_env(TRACE_SAMPLE_RATE=0)
+    assert start_trace("abc", "GET") is None
+    assert current_trace() is None
+    finish_trace(None)
+
+    settings_env(TRACE_SAMPLE_RATE=1)
+    token = start_trace("abc", "GET")
+    assert current_trace().trace_id == "abc"
+    finish_trace(token)
+
+
+def test_otlp_trace_ids():
+    assert otlp_trace_id("00F1e2d3c4b5a697") == "0" * 16 + "00f1e2d3c4b5a697"
+    assert otlp_trace_id("a" * 32) == "a" * 32
+    for request_id in ("client-supplied", "a" * 33):
+        trace_id = otlp_trace_id(request_id)
+        assert len(trace_id) == 32 and int(trace_id, 16) >= 0
+        assert otlp_trace_id(request_id) == trace_id
+
+
+def test_traces_are_exported_as_otlp_json(exported):
+    token = start_trace("1234abcd", "GET", sampled=True)
+    with span("embed", chunks=2, cached=False, score=0.5):
+        pass
+    finish_trace(token, "GET /api/chat")
+    token = start_trace("5678", "GET", sampled=True)
+    finish_trace(token)
+
+    first, second = exported()
+    root, child = first["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert root["traceId"] == child["traceId"] == otlp_trace_id("1234abcd")
+    assert root["name"] == "GET /api/chat" and "parentSpanId" not in root
+    assert {"key": "request_id", "value": {"stringValue": "1234abcd"}} in root["attributes"]
+    assert child["parentSpanId"] == root["spanId"]
+    assert child["attributes"] == [
+        {"key": "chunks", "value": {"intValue": "2"}},
+        {"key": "cached", "value": {"boolValue": False}},
+        {"key": "score", "value": {"doubleValue": 0.5}},
+    ]
+    assert int(child["startTimeUnixNano"]) <= int(child["endTimeUnixNano"])
+    assert len(second["resourceSpans"][0]["scopeSpans"][0]["spans"]) == 1
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        with span("lookup"):
+            await asyncio.sleep(0)
+        return {"id": item_id}
+
+    app.add_middleware(TracingMiddleware)
+    return app
+
+
+async def _get(path: str, **headers) -> httpx.Response:
+    transport = httpx.ASGITransport(app=_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers=headers)
+
+
+async def test_middleware_sends_server_timing(settings_env, exported):
+    settings_env(TRACE_SAMPLE_RATE=1)
+    response = await _get("/items/42", **{"X-Request-ID": "feedbeef"})
+
+    assert response.headers["X-Request-ID"] == "feedbeef"
+    timing = response.headers["Server-Timing"].split(", ")
+    assert timing[0].startswith("lookup;dur=")
+    assert timing[-1] == f"total;dur={response.headers['X-Latency-Ms']}"
+
+    (line,) = exported()
+    root = line["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert root["name"] == "GET /items/{item_id}"
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in root["attributes"]
+
+
+async def test_unsampled_requests_have_no_server_timing(settings_env, exported):
+    settings_env(TRACE_SAMPLE_RATE=0)
+    response = await _get("/items/42")
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+    assert len(response.headers["X-Request-ID"]) == 16
+    assert exported() == []
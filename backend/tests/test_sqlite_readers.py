@@ -0,0 +1,39 @@
+import asyncio
+import sqlite3
+
+import pytest
+from pydantic import ValidationError
+
+from src.config import Settings
+
+
+def test_read_pool_needs_a_connection():
+    with pytest.raises(ValidationError):
+        Settings(sqlite_read_pool_size=0)
+
+
+async def test_more_readers_than_connections(database):
+    await database.save_message("s1", "user", "hi", new_session=True)
+
+    async def read():
+        async with database.read_connection() as db:
+            await asyncio.sleep(0.01)
+            return (await (await db.execute("SELECT COUNT(*) FROM conversation_history")).fetchone())[0]
+
+    size = database.get_settings().sqlite_read_pool_size
+    assert await asyncio.wait_for(asyncio.gather(*(read() for _ in range(size * 3))), 5) == [1] * size * 3
+
+
+async def test_readers_are_read_only(database):
+    async with database.read_connection() as db:
+        with pytest.raises(sqlite3.OperationalError):
+            await db.execute("DELETE FROM conversation_history")
+
+
+async def test_readers_see_commits_while_a_write_is_open(database):
+    await database.save_message("s1", "user", "hi", new_session=True)
+    async with database.transaction() as writer:
+        await writer.execute("DELETE FROM conversation_history")
+        async with database.read_connection() as db:
+            count = (await (await db.execute("SELECT COUNT(*) FROM conversation_history")).fetchone())[0]
+    assert count == 1
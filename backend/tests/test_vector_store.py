@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from src.db.vector_store import NumpyVectorStore
+
+
+def _add(store, ids, vectors, source="a"):
+    store.upsert(
+        ids=ids,
+        embeddings=vectors,
+        documents=[f"doc {i}" for i in ids],
+        metadatas=[{"source": source, "id": i} for i in ids],
+    )
+
+
+@pytest.fixture
+def store():
+    store = NumpyVectorStore()
+    _add(store, ["x", "y", "z"], [[1, 0, 0], [0, 1, 0], [0, 0, 1]])
+    return store
+
+
+def test_query_orders_by_cosine_similarity(store):
+    result = store.query(query_embeddings=[[0.9, 0.1, 0]], n_results=2)
+    assert result["ids"] == [["x", "y"]]
+    assert result["documents"] == [["doc x", "doc y"]]
+    distances = result["distances"][0]
+    assert distances[0] < distances[1]
+    assert distances[0] == pytest.approx(1 - 0.9 / np.hypot(0.9, 0.1), abs=1e-6)
+
+
+def test_query_filters_with_where(store):
+    _add(store, ["w"], [[1, 0.1, 0]], source="b")
+    result = store.query(query_embeddings=[[1, 0, 0]], n_results=5, where={"source": "b"})
+    assert result["ids"] == [["w"]]
+    assert store.query(query_embeddings=[[1, 0, 0]], where={"source": "none"})["ids"] == [[]]
+
+
+def test_upsert_replaces_by_id(store):
+    _add(store, ["y"], [[1, 0, 0]], source="b")
+    assert store.count() == 3
+    assert store.get(ids=["y"])["metadatas"] == [{"source": "b", "id": "y"}]
+    assert set(store.query(query_embeddings=[[1, 0, 0]], n_results=2)["ids"][0]) == {"x", "y"}
+
+
+def test_replacing_upsert_leaves_earlier_views_unchanged(store):
+    matrix, size, ids, documents, metadatas = store._view()
+    before = matrix.copy()
+    store.upsert(ids=["x", "new"], embeddings=[[0, 1, 0], [1, 1, 0]],
+                 documents=["changed", "new"], metadatas=[{}, {}])
+    np.testing.assert_array_equal(matrix, before)
+    assert documents[:size] == ["doc x", "doc y", "doc z"]
+    assert metadatas[0] == {"source": "a", "id": "x"}
+    assert store.get(ids=["x"])["documents"] == ["changed"]
+    assert store.count() == 4
+
+
+def test_delete_by_id_and_where(store):
+    _add(store, ["w"], [[1, 1, 1]], source="b")
+    view = store._view()[0]
+    store.delete(ids=["x"])
+    store.delete(where={"source": "b"})
+    assert store.get()["ids"] == ["y", "z"]
+    assert store.query(query_embeddings=[[1, 0, 0]], n_results=5)["ids"][0][0] in {"y", "z"}
+    assert len(view) == 4  # readers keep the rows they were given
+    _add(store, ["x"], [[1, 0, 0]])
+    assert store.query(query_embeddings=[[1, 0, 0]], n_results=1)["ids"] == [["x"]]
+
+
+def test_dimension_mismatch(store):
+    with pytest.raises(ValueError):
+        _add(store, ["bad"], [[1, 0]])
+
+
+def test_snapshot_round_trip(store, tmp_path):
+    store.path = tmp_path / "vectors"
+    store.snapshot()
+    for mmap in (False, True):
+        loaded = NumpyVectorStore(str(tmp_path / "vectors"), mmap=mmap)
+        assert loaded.get() == store.get()
+        assert loaded.query(query_embeddings=[[0, 0, 1]], n_results=1)["ids"] == [["z"]]
+    _add(loaded, ["w"], [[1, 1, 0]])  # a read-only mmap is copied before writing
+    assert loaded.count() == 4
+
+
+def test_failed_snapshot_stays_dirty(store, tmp_path, monkeypatch):
+    store.path = tmp_path / "vectors"
+
+    def disk_full(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(np, "save", disk_full)
+        with pytest.raises(OSError):
+            store.snapshot_if_dirty()
+    assert store.dirty
+    store.snapshot_if_dirty()
+    assert not store.dirty
+    assert NumpyVectorStore(str(store.path)).count() == 3
+
+
+def test_write_during_snapshot_stays_dirty(store, tmp_path, monkeypatch):
+    store.path = tmp_path / "vectors"
+    save = np.save
+
+    def save_after_a_write(*args, **kwargs):
+        _add(store, ["late"], [[1, 1, 1]])
+        save(*args, **kwargs)
+
+    monkeypatch.setattr(np, "save", save_after_a_write)
+    store.snapshot()
+    assert store.dirty
+    assert NumpyVectorStore(str(store.path)).count() == 3
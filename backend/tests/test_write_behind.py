@@ -0,0 +1,99 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from src.db import sqlite as db
+
+
+@pytest.fixture
+async def queue(settings_env, tmp_path):
+    """A database whose write-behind queue batches for 50 ms after each flush."""
+    settings_env(SQLITE_PATH=tmp_path / "audit.db", SQLITE_FLUSH_INTERVAL_MS=50, SQLITE_WRITE_DURABILITY="flush")
+    await db.init_db()
+    yield db._writer
+    await db.close_db()
+
+
+async def _count(table: str) -> int:
+    async with db.read_connection() as conn:
+        return (await (await conn.execute(f"SELECT COUNT(*) FROM {table}")).fetchone())[0]
+
+
+async def test_idle_queue_commits_at_once(queue):
+    await asyncio.sleep(0.06)
+    start = time.perf_counter()
+    await db.save_message("s1", "user", "hi", new_session=True)
+    assert time.perf_counter() - start < 0.04
+    assert await _count("conversation_history") == 1
+
+
+async def test_busy_queue_groups_records(queue):
+    await db.save_message("s1", "user", "first", new_session=True)
+    # Within the interval of that flush: these wait and share one commit.
+    await asyncio.gather(*(db.save_message("s1", "user", f"m{i}") for i in range(5)))
+    assert await _count("conversation_history") == 6
+
+
+async def test_answer_and_audit_are_one_group(queue):
+    await db.save_answer(
+        "s1", query="vpn?", response="restart it", citations=[], tokens_used=12, latency_ms=3.5,
+        sources=["vpn.md"], guardrails_triggered=["pii_email"], confidence=0.8,
+    )
+    assert await _count("conversation_history") == 1
+    assert await _count("audit_log") == 1
+    assert await _count("audit_guardrail_counts") == 1
+
+
+async def test_failed_flush_is_rolled_back(queue):
+    records = [
+        ("session", ("s1",)),
+        ("message", ("s1", "user", "hi", "[]", 0.0)),
+        ("audit", ("wrong number of parameters",)),
+    ]
+    with pytest.raises(sqlite3.Error):
+        await queue.submit(records, wait=True)
+
+    # A later transaction on the shared writer connection must not commit
+    # what is left of the failed batch.
+    await db.set_guardrail_config("pii_enabled", False)
+    assert await db.get_guardrail_config() == {"pii_enabled": False}
+    assert await _count("sessions") == 0
+    assert await _count("conversation_history") == 0
+
+
+async def test_failed_flush_reaches_every_waiter(queue):
+    results = await asyncio.gather(
+        queue.submit([("session", ("s1",))], wait=True),
+        queue.submit([("audit", ("bad",))], wait=True),
+        return_exceptions=True,
+    )
+    assert all(isinstance(r, sqlite3.Error) for r in results)
+
+    await queue.submit([("session", ("s2",))], wait=True)
+    assert await _count("sessions") == 1
+
+
+async def test_unawaited_writes_are_committed_by_flush_writes(queue, settings_env):
+    settings_env(SQLITE_WRITE_DURABILITY="async")
+    await db.save_message("s1", "user", "first", new_session=True)
+    await db.save_message("s1", "user", "second")
+    await db.flush_writes()
+    assert len(queue) == 0
+    assert await _count("conversation_history") == 2
+
+
+async def test_close_as_the_queue_fills(settings_env, tmp_path):
+    settings_env(SQLITE_PATH=tmp_path / "audit.db", SQLITE_FLUSH_INTERVAL_MS=60_000, SQLITE_FLUSH_MAX_RECORDS=2)
+    await db.init_db()
+    await db.save_message("s1", "user", "first", new_session=True)
+    record = ("message", ("s1", "user", "next", "[]", 0.0))
+    await db._writer.submit([record], wait=False)
+    await asyncio.sleep(0.01)  # the writer waits out the interval
+    await db._writer.submit([record], wait=False)
+    await asyncio.sleep(0)  # the queue is full, the writer not yet resumed
+    start = time.monotonic()
+    async with asyncio.timeout(1):  # bounds a hang: cancelling close_db() also cancels what it awaits
+        await db.close_db()
+    assert time.monotonic() - start < 0.5
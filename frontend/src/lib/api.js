@@ -39,6 +39,18 @@ export const uploadDocument = async (file) => {
   return res.json();
 };
 
+export const getIngestJob = (jobId) => request(`/documents/jobs/${jobId}`);
+
+// Uploads are ingested in the background; poll the job until it finishes.
+export const waitForIngestJob = async (jobId, intervalMs = 1000) => {
+  for (;;) {
+    const job = await getIngestJob(jobId);
+    if (job.status === "done") return job;
+    if (job.status === "failed") throw new Error(job.error || "Ingestion failed");
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
+
 export const ingestSamples = () =>
   request("/documents/ingest-samples", { method: "POST" });
 
@@ -1,6 +1,6 @@
 import { useState, useEffect, useRef } from "react";
 import { Upload, Trash2, FileText, Database, Loader2, CheckCircle, AlertCircle, HardDrive, Layers, File } from "lucide-react";
-import { listDocuments, uploadDocument, ingestSamples, deleteDocument } from "../lib/api";
+import { listDocuments, uploadDocument, waitForIngestJob, ingestSamples, deleteDocument } from "../lib/api";
 
 const FILE_ICONS = {
   ".md": "📝",
@@ -40,8 +40,9 @@ export default function DocumentsPage() {
     if (!file) return;
     setUploading(true);
     try {
-      const result = await uploadDocument(file);
-      showToast(`Uploaded ${result.filename} — ${result.chunks_created} chunks created`);
+      const job = await uploadDocument(file);
+      const result = await waitForIngestJob(job.id);
+      showToast(`Uploaded ${result.filename} — ${result.chunks_done} chunks created`);
       fetchDocs();
     } catch (e) {
       showToast(e.message, "error");